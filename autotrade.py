@@ -2,8 +2,8 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 import pyupbit
-import pandas as pd
-import pandas_ta as ta
+import ohlcv_store
+from indicators import add_indicators
 import json
 from openai import OpenAI
 import schedule
@@ -33,44 +33,15 @@ def get_current_status():
 
 def fetch_and_prepare_data():
     # Fetch data
-    df_daily = pyupbit.get_ohlcv("KRW-BTC", "day", count=30)
-    df_hourly = pyupbit.get_ohlcv("KRW-BTC", interval="minute60", count=24)
-
-    # Define a helper function to add indicators
-    def add_indicators(df):
-        # Moving Averages
-        df['SMA_10'] = ta.sma(df['close'], length=10)
-        df['EMA_10'] = ta.ema(df['close'], length=10)
-
-        # RSI
-        df['RSI_14'] = ta.rsi(df['close'], length=14)
-
-        # Stochastic Oscillator
-        stoch = ta.stoch(df['high'], df['low'], df['close'], k=14, d=3, smooth_k=3)
-        df = df.join(stoch)
-
-        # MACD
-        ema_fast = df['close'].ewm(span=12, adjust=False).mean()
-        ema_slow = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema_fast - ema_slow
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
-
-        # Bollinger Bands
-        df['Middle_Band'] = df['close'].rolling(window=20).mean()
-        # Calculate the standard deviation of closing prices over the last 20 days
-        std_dev = df['close'].rolling(window=20).std()
-        # Calculate the upper band (Middle Band + 2 * Standard Deviation)
-        df['Upper_Band'] = df['Middle_Band'] + (std_dev * 2)
-        # Calculate the lower band (Middle Band - 2 * Standard Deviation)
-        df['Lower_Band'] = df['Middle_Band'] - (std_dev * 2)
-
-        return df
+    df_daily = ohlcv_store.get_ohlcv("KRW-BTC", "day", count=30)
+    df_hourly = ohlcv_store.get_ohlcv("KRW-BTC", interval="minute60", count=24)
 
     # Add indicators to both dataframes
     df_daily = add_indicators(df_daily)
     df_hourly = add_indicators(df_hourly)
 
+    # pandas is only needed here, so don't load it at startup
+    import pandas as pd
     combined_df = pd.concat([df_daily, df_hourly], keys=['daily', 'hourly'])
     combined_data = combined_df.to_json(orient='split')
 
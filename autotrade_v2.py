@@ -2,96 +2,37 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 import pyupbit
-import pandas as pd
-import pandas_ta as ta
+import ohlcv_store
+from indicators import add_indicators
 import json
 from openai import OpenAI
 import schedule
 import time
-import requests
+import http_client
 from datetime import datetime
-import sqlite3
+import decision_store
 
 # Setup
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=http_client.openai_timeout(),
+                http_client=http_client.openai_http_client())
+http_client.install_pyupbit()
 upbit = pyupbit.Upbit(os.getenv("UPBIT_ACCESS_KEY"), os.getenv("UPBIT_SECRET_KEY"))
 
 def initialize_db(db_path='trading_decisions.sqlite'):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS decisions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME,
-                decision TEXT,
-                percentage REAL,
-                reason TEXT,
-                btc_balance REAL,
-                krw_balance REAL,
-                btc_avg_buy_price REAL,
-                btc_krw_price REAL
-            );
-        ''')
-        conn.commit()
+    decision_store.initialize_db(db_path)
 
 def save_decision_to_db(decision, current_status):
-    db_path = 'trading_decisions.sqlite'
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-    
-        # Parsing current_status from JSON to Python dict
-        status_dict = json.loads(current_status)
-        current_price = pyupbit.get_orderbook(ticker="KRW-BTC")['orderbook_units'][0]["ask_price"]
-        
-        # Preparing data for insertion
-        data_to_insert = (
-            decision.get('decision'),
-            decision.get('percentage', 100),  # Defaulting to 100 if not provided
-            decision.get('reason', ''),  # Defaulting to an empty string if not provided
-            status_dict.get('btc_balance'),
-            status_dict.get('krw_balance'),
-            status_dict.get('btc_avg_buy_price'),
-            current_price
-        )
-        
-        # Inserting data into the database
-        cursor.execute('''
-            INSERT INTO decisions (timestamp, decision, percentage, reason, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price)
-            VALUES (datetime('now', 'localtime'), ?, ?, ?, ?, ?, ?, ?)
-        ''', data_to_insert)
-    
-        conn.commit()
+    # Parsing current_status from JSON to Python dict
+    status_dict = json.loads(current_status)
+    current_price = pyupbit.get_orderbook(ticker="KRW-BTC")['orderbook_units'][0]["ask_price"]
+    decision_store.save_decision(decision, status_dict, current_price)
 
 def fetch_last_decisions(db_path='trading_decisions.sqlite', num_decisions=10):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT timestamp, decision, percentage, reason, btc_balance, krw_balance, btc_avg_buy_price FROM decisions
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (num_decisions,))
-        decisions = cursor.fetchall()
-
-        if decisions:
-            formatted_decisions = []
-            for decision in decisions:
-                # Converting timestamp to milliseconds since the Unix epoch
-                ts = datetime.strptime(decision[0], "%Y-%m-%d %H:%M:%S")
-                ts_millis = int(ts.timestamp() * 1000)
-                
-                formatted_decision = {
-                    "timestamp": ts_millis,
-                    "decision": decision[1],
-                    "percentage": decision[2],
-                    "reason": decision[3],
-                    "btc_balance": decision[4],
-                    "krw_balance": decision[5],
-                    "btc_avg_buy_price": decision[6]
-                }
-                formatted_decisions.append(str(formatted_decision))
-            return "\n".join(formatted_decisions)
-        else:
-            return "No decisions found."
+    decisions = decision_store.load_last_decisions(num_decisions, db_path)
+    if decisions:
+        return "\n".join(str(decision) for decision in decisions)
+    else:
+        return "No decisions found."
 
 def get_current_status():
     orderbook = pyupbit.get_orderbook(ticker="KRW-BTC")
@@ -113,44 +54,15 @@ def get_current_status():
 
 def fetch_and_prepare_data():
     # Fetch data
-    df_daily = pyupbit.get_ohlcv("KRW-BTC", "day", count=30)
-    df_hourly = pyupbit.get_ohlcv("KRW-BTC", interval="minute60", count=24)
-
-    # Define a helper function to add indicators
-    def add_indicators(df):
-        # Moving Averages
-        df['SMA_10'] = ta.sma(df['close'], length=10)
-        df['EMA_10'] = ta.ema(df['close'], length=10)
-
-        # RSI
-        df['RSI_14'] = ta.rsi(df['close'], length=14)
-
-        # Stochastic Oscillator
-        stoch = ta.stoch(df['high'], df['low'], df['close'], k=14, d=3, smooth_k=3)
-        df = df.join(stoch)
-
-        # MACD
-        ema_fast = df['close'].ewm(span=12, adjust=False).mean()
-        ema_slow = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema_fast - ema_slow
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
-
-        # Bollinger Bands
-        df['Middle_Band'] = df['close'].rolling(window=20).mean()
-        # Calculate the standard deviation of closing prices over the last 20 days
-        std_dev = df['close'].rolling(window=20).std()
-        # Calculate the upper band (Middle Band + 2 * Standard Deviation)
-        df['Upper_Band'] = df['Middle_Band'] + (std_dev * 2)
-        # Calculate the lower band (Middle Band - 2 * Standard Deviation)
-        df['Lower_Band'] = df['Middle_Band'] - (std_dev * 2)
-
-        return df
+    df_daily = ohlcv_store.get_ohlcv("KRW-BTC", "day", count=30)
+    df_hourly = ohlcv_store.get_ohlcv("KRW-BTC", interval="minute60", count=24)
 
     # Add indicators to both dataframes
     df_daily = add_indicators(df_daily)
     df_hourly = add_indicators(df_hourly)
 
+    # pandas is only needed here, so don't load it at startup
+    import pandas as pd
     combined_df = pd.concat([df_daily, df_hourly], keys=['daily', 'hourly'])
     combined_data = combined_df.to_json(orient='split')
 
@@ -163,7 +75,7 @@ def get_news_data():
     result = "No news data available."
 
     try:
-        response = requests.get(url)
+        response = http_client.get(url)
         news_results = response.json()['news_results']
 
         simplified_news = []
@@ -202,7 +114,7 @@ def fetch_fear_and_greed_index(limit=1, date_format=''):
         'format': 'json',
         'date_format': date_format
     }
-    response = requests.get(base_url, params=params)
+    response = http_client.get(base_url, params=params)
     myData = response.json()['data']
     resStr = ""
     for data in myData:
@@ -2,196 +2,293 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 import pyupbit
-import pandas as pd
-import pandas_ta as ta
+import ohlcv_store
+import indicator_engine
 import json
 from openai import OpenAI
-import schedule
 import time
-import requests
+import threading
+import http_client
 from datetime import datetime
-import sqlite3
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import base64
+import decision_store
+import tracing
+import performance
+from concurrent.futures import ThreadPoolExecutor
+from chart_browser import get_default_pool
+from chart_renderer import render_chart, start_pool as start_render_pool
+from image_payload import ImageCache
+from data_gather import gather_data, print_timings, REQUIRED
+from market_feed import MarketFeed, get_orderbook, get_orderbooks
+from event_scheduler import EventScheduler
+from daemon import Daemon, SLOTS
+from prompt_payload import LABELS, build_payload, encode_market_data, print_token_report, prompt_messages
+from llm_response import request_decision, repair_messages
+from llm_cache import LLMCache
+from signal_cache import SignalCache
+from execution import Executor, Snapshot, currency, print_records
 
 # Setup
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Retries are handled by llm_response.request_decision, so the client doesn't retry on its own.
+# All outbound HTTP goes through http_client's pooled connections with per-host timeouts.
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, timeout=http_client.openai_timeout(),
+                http_client=http_client.openai_http_client())
+http_client.install_pyupbit()
 upbit = pyupbit.Upbit(os.getenv("UPBIT_ACCESS_KEY"), os.getenv("UPBIT_SECRET_KEY"))
 
+# Markets traded each cycle, e.g. 'KRW-BTC,KRW-ETH'; they share the KRW balance
+MARKETS = [market.strip() for market in os.getenv("MARKETS", "KRW-BTC").split(",") if market.strip()]
+
+# Chart image source: 'selenium' screenshots the Upbit web chart, 'local' draws it from the OHLCV data
+CHART_RENDERER = os.getenv("CHART_RENDERER", "selenium")
+CHART_IMAGE_SIZE = os.getenv("CHART_IMAGE_SIZE", "1280x720")
+
+# The chart image sent to the model is trimmed to the chart, scaled to what the model sees at IMAGE_DETAIL
+# ('low' is 512px for a fixed 85 tokens, 'high' up to 768px on the short side) and encoded as IMAGE_FORMAT.
+# It is prepared once per cycle and the same message part is reused by every retry.
+# WebP is the smallest for the chart's flat colours and thin lines; JPEG encodes faster, PNG is lossless
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_DETAIL = os.getenv("IMAGE_DETAIL", "high")
+image_cache = ImageCache()
+
+# Market data source: 'websocket' keeps a live orderbook in memory, 'rest' calls the API every time
+MARKET_FEED = os.getenv("MARKET_FEED", "websocket")
+feed = None
+
+# Maximum tokens for the text sections of the prompt; the least important sections are trimmed to fit
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "8000"))
+
+# Give up on the model after this many seconds so a decision isn't held back far past its slot
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "90"))
+
+# Model response cache: 'passthrough' (default) always calls the model, 'record' also stores the responses,
+# 'replay' answers only from stored responses, for network-free reruns of recorded decisions
+llm_cache = LLMCache(os.getenv("LLM_CACHE_DIR", "llm_cache"), os.getenv("LLM_CACHE_MODE", "passthrough"),
+                     int(os.getenv("LLM_CACHE_MAX_MB", "100")) * 1024 * 1024)
+
+# News and the Fear and Greed Index change slowly, so they are kept on disk between cycles and restarts.
+# Past its TTL a value is still used for up to the max-stale window while a fresh copy is fetched in the background.
+signal_cache = SignalCache(os.getenv("SIGNAL_CACHE_DIR", "signal_cache"))
+NEWS_TTL_SECONDS = int(os.getenv("NEWS_TTL_SECONDS", "7200"))
+NEWS_MAX_STALE_SECONDS = int(os.getenv("NEWS_MAX_STALE_SECONDS", "21600"))
+# One news search covers every traded coin, e.g. 'btc OR eth'; it is cached under its own name per set of coins
+NEWS_COINS = [currency(market).lower() for market in MARKETS]
+NEWS_QUERY = " OR ".join(NEWS_COINS)
+NEWS_CACHE_NAME = "news" if NEWS_COINS == ["btc"] else "news-" + "-".join(NEWS_COINS)
+FEAR_AND_GREED_DAYS = 30
+FEAR_AND_GREED_MAX_STALE_SECONDS = 3600
+
+# Order execution: 'market', 'limit' at the touch (the rest at market after a timeout),
+# or 'twap'/'iceberg' slices sized by orderbook depth
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "market")
+# Set when the daemon starts stopping: the running cycle then sends no new model requests or orders
+shutdown = threading.Event()
+executor = Executor(upbit, lambda market: get_orderbook(market, feed), mode=EXECUTION_MODE, stopping=shutdown)
+
+# Per-stage spans go to TRACE_FILE as JSON Lines, rotated to TRACE_FILE.1 past TRACE_MAX_MB; stage metrics in
+# Prometheus format are written to METRICS_FILE after every cycle and served at http://127.0.0.1:METRICS_PORT/metrics
+# when those are set
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_MAX_MB = float(os.getenv("TRACE_MAX_MB", "8"))
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+tracing.configure(TRACE_FILE, tracing.parse_budgets(os.getenv("STAGE_BUDGETS")), int(TRACE_MAX_MB * 1024 * 1024))
+
+# 'slots' runs at 00:01/08:01/16:01, 'event' runs when a market trigger fires (requires the websocket feed)
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "slots")
+# The triggers are tuned on hourly candles, so the feed builds hourly candles, seeded with this many stored ones
+EVENT_CANDLE_COUNT = 200
+# Triggered cycles allowed in any 24 hours. Each cycle makes one model request per market in MARKETS,
+# plus any retries and repairs, so the daily model spend is a multiple of this
+EVENT_MAX_CYCLES_PER_DAY = int(os.getenv("EVENT_MAX_CYCLES_PER_DAY", "6"))
+
+# A cycle due while the previous one is still running is skipped, or with 'queue' run right after it.
+# SIGTERM stops the running cycle from sending new model requests or orders and waits up to
+# SHUTDOWN_TIMEOUT_SECONDS for the orders it already sent; /healthz and /readyz
+# are served at http://127.0.0.1:HEALTH_PORT when it is set
+OVERLAP_POLICY = os.getenv("OVERLAP_POLICY", "skip")
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "300"))
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "0"))
+# Worker processes drawing the local chart; 0 draws it on the cycle's own thread
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "1"))
+render_pool = None
+
 def initialize_db(db_path='trading_decisions.sqlite'):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS decisions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME,
-                decision TEXT,
-                percentage REAL,
-                reason TEXT,
-                btc_balance REAL,
-                krw_balance REAL,
-                btc_avg_buy_price REAL,
-                btc_krw_price REAL
-            );
-        ''')
-        conn.commit()
-
-def save_decision_to_db(decision, current_status):
-    db_path = 'trading_decisions.sqlite'
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-    
-        # Parsing current_status from JSON to Python dict
-        status_dict = json.loads(current_status)
-        current_price = pyupbit.get_orderbook(ticker="KRW-BTC")['orderbook_units'][0]["ask_price"]
-        
-        # Preparing data for insertion
-        data_to_insert = (
-            decision.get('decision'),
-            decision.get('percentage', 100),  # Defaulting to 100 if not provided
-            decision.get('reason', ''),  # Defaulting to an empty string if not provided
-            status_dict.get('btc_balance'),
-            status_dict.get('krw_balance'),
-            status_dict.get('btc_avg_buy_price'),
-            current_price
-        )
-        
-        # Inserting data into the database
-        cursor.execute('''
-            INSERT INTO decisions (timestamp, decision, percentage, reason, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price)
-            VALUES (datetime('now', 'localtime'), ?, ?, ?, ?, ?, ?, ?)
-        ''', data_to_insert)
-    
-        conn.commit()
+    decision_store.initialize_db(db_path)
 
-def fetch_last_decisions(db_path='trading_decisions.sqlite', num_decisions=10):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT timestamp, decision, percentage, reason, btc_balance, krw_balance, btc_avg_buy_price FROM decisions
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (num_decisions,))
-        decisions = cursor.fetchall()
-
-        if decisions:
-            formatted_decisions = []
-            for decision in decisions:
-                # Converting timestamp to milliseconds since the Unix epoch
-                ts = datetime.strptime(decision[0], "%Y-%m-%d %H:%M:%S")
-                ts_millis = int(ts.timestamp() * 1000)
-                
-                formatted_decision = {
-                    "timestamp": ts_millis,
-                    "decision": decision[1],
-                    "percentage": decision[2],
-                    "reason": decision[3],
-                    "btc_balance": decision[4],
-                    "krw_balance": decision[5],
-                    "btc_avg_buy_price": decision[6]
-                }
-                formatted_decisions.append(str(formatted_decision))
-            return "\n".join(formatted_decisions)
-        else:
-            return "No decisions found."
-
-def get_current_status():
-    orderbook = pyupbit.get_orderbook(ticker="KRW-BTC")
-    current_time = orderbook['timestamp']
-    btc_balance = 0
-    krw_balance = 0
-    btc_avg_buy_price = 0
-    balances = upbit.get_balances()
-    for b in balances:
-        if b['currency'] == "BTC":
-            btc_balance = b['balance']
-            btc_avg_buy_price = b['avg_buy_price']
-        if b['currency'] == "KRW":
-            krw_balance = b['balance']
-
-    current_status = {'current_time': current_time, 'orderbook': orderbook, 'btc_balance': btc_balance, 'krw_balance': krw_balance, 'btc_avg_buy_price': btc_avg_buy_price}
-    return json.dumps(current_status)
+def save_decision_to_db(decision, current_status, market="KRW-BTC"):
+    save_decisions_to_db({market: decision}, {market: current_status})
 
+def save_decisions_to_db(decisions, current_statuses):
+    """
+    Saves the decisions of one cycle in a single transaction, priced with one orderbook request for all markets.
+    Parameters:
+    - decisions (dict): market -> decision.
+    - current_statuses (dict): market -> current status JSON, as returned by get_current_statuses.
+    """
+    orderbooks = get_orderbooks(list(decisions), feed)
+    # One timestamp for the cycle, so the performance summary values the account once all its markets are saved
+    timestamp = decision_store.now_millis()
+    rows = [decision_store.decision_row(decision, json.loads(current_statuses[market]),
+                                        orderbooks[market]['orderbook_units'][0]["ask_price"], timestamp, market)
+            for market, decision in decisions.items()]
+    with tracing.span("db", rows=len(rows)):
+        decision_store.save_decisions(rows)
+    # Extend the performance summary with this decision so the dashboard doesn't have to
+    try:
+        performance.update()
+    except Exception as e:
+        print(f"Error updating performance summary: {e}")
 
-def fetch_and_prepare_data():
-    # Fetch data
-    df_daily = pyupbit.get_ohlcv("KRW-BTC", "day", count=30)
-    df_hourly = pyupbit.get_ohlcv("KRW-BTC", interval="minute60", count=24)
+def load_last_decisions(db_path='trading_decisions.sqlite', num_decisions=10, market="KRW-BTC"):
+    # Timestamps are stored as epoch milliseconds, so rows are returned as they are
+    with tracing.span("last_decisions", market=market) as attributes:
+        decisions = decision_store.load_last_decisions(num_decisions, db_path, market)
+        attributes["rows"] = len(decisions)
+        return decisions
 
-    # Define a helper function to add indicators
-    def add_indicators(df):
-        # Moving Averages
-        df['SMA_10'] = ta.sma(df['close'], length=10)
-        df['EMA_10'] = ta.ema(df['close'], length=10)
+def fetch_last_decisions(db_path='trading_decisions.sqlite', num_decisions=10):
+    decisions = load_last_decisions(db_path, num_decisions)
+    if decisions:
+        return "\n".join(str(decision) for decision in decisions)
+    else:
+        return "No decisions found."
 
-        # RSI
-        df['RSI_14'] = ta.rsi(df['close'], length=14)
+def get_current_status(market="KRW-BTC"):
+    return get_current_statuses([market])[market]
 
-        # Stochastic Oscillator
-        stoch = ta.stoch(df['high'], df['low'], df['close'], k=14, d=3, smooth_k=3)
-        df = df.join(stoch)
+def get_current_statuses(markets):
+    """
+    Current status JSON by market, from one orderbook request and one balances request for all of them.
+    The btc_* keys hold the balance and average buy price of the market's own coin.
+    """
+    with tracing.span("status", markets=len(markets)) as attributes:
+        orderbooks = get_orderbooks(markets, feed)
+        balances = {b['currency']: b for b in upbit.get_balances()}
+        krw_balance = balances["KRW"]['balance'] if "KRW" in balances else 0
+        statuses = {}
+        for market in markets:
+            orderbook = orderbooks[market]
+            coin = balances.get(currency(market), {})
+            current_status = {'current_time': orderbook['timestamp'], 'orderbook': orderbook, 'btc_balance': coin.get('balance', 0),
+                              'krw_balance': krw_balance, 'btc_avg_buy_price': coin.get('avg_buy_price', 0)}
+            statuses[market] = json.dumps(current_status)
+        attributes["bytes"] = sum(len(status) for status in statuses.values())
+        return statuses
+
+
+def fetch_candles(market="KRW-BTC"):
+    # Fetch data
+    with tracing.span("ohlcv", market=market) as attributes:
+        df_daily = ohlcv_store.get_ohlcv(market, "day", count=30)
+        df_hourly = ohlcv_store.get_ohlcv(market, interval="minute60", count=24)
+        attributes["rows"] = len(df_daily) + len(df_hourly)
+    return df_daily, df_hourly
 
-        # MACD
-        ema_fast = df['close'].ewm(span=12, adjust=False).mean()
-        ema_slow = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema_fast - ema_slow
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
+def add_market_indicators(candles):
+    """
+    Adds indicators to the candles of every market after they are all downloaded, updating the saved indicator
+    state with newly closed candles.
+    Parameters:
+    - candles (dict): market -> (df_daily, df_hourly).
+    Returns:
+    - dict: market -> (df_daily, df_hourly) with the indicator columns.
+    """
+    with tracing.span("indicators", markets=len(candles)):
+        return {market: (indicator_engine.add_indicators(df_daily, market, "day"),
+                         indicator_engine.add_indicators(df_hourly, market, "minute60"))
+                for market, (df_daily, df_hourly) in candles.items()}
 
-        # Bollinger Bands
-        df['Middle_Band'] = df['close'].rolling(window=20).mean()
-        # Calculate the standard deviation of closing prices over the last 20 days
-        std_dev = df['close'].rolling(window=20).std()
-        # Calculate the upper band (Middle Band + 2 * Standard Deviation)
-        df['Upper_Band'] = df['Middle_Band'] + (std_dev * 2)
-        # Calculate the lower band (Middle Band - 2 * Standard Deviation)
-        df['Lower_Band'] = df['Middle_Band'] - (std_dev * 2)
+def fetch_market_data(market="KRW-BTC"):
+    return add_market_indicators({market: fetch_candles(market)})[market]
 
-        return df
+def prepare_data_json(df_daily, df_hourly):
+    # Column-oriented with rounded values, encoded once
+    return encode_market_data(df_daily, df_hourly)
 
-    # Add indicators to both dataframes
-    df_daily = add_indicators(df_daily)
-    df_hourly = add_indicators(df_hourly)
+def fetch_and_prepare_data():
+    df_daily, df_hourly = fetch_market_data()
+    return prepare_data_json(df_daily, df_hourly)
 
-    combined_df = pd.concat([df_daily, df_hourly], keys=['daily', 'hourly'])
-    combined_data = combined_df.to_json(orient='split')
+def request_news_items(previous=None):
+    ### Get news data from SERPAPI as (title, source, timestamp) tuples
+    url = "https://serpapi.com/search.json"
+    params = {"engine": "google_news", "q": NEWS_QUERY, "api_key": os.getenv("SERPAPI_API_KEY")}
 
-    return json.dumps(combined_data)
+    simplified_news = []
 
-def get_news_data():
-    ### Get news data from SERPAPI
-    url = "https://serpapi.com/search.json?engine=google_news&q=btc&api_key=" + os.getenv("SERPAPI_API_KEY")
+    response = http_client.get(url, params=params)
+    news_results = response.json()['news_results']
 
-    result = "No news data available."
+    for news_item in news_results:
+        # Check if this news item contains 'stories'
+        if 'stories' in news_item:
+            for story in news_item['stories']:
+                timestamp = int(datetime.strptime(story['date'], '%m/%d/%Y, %H:%M %p, %z %Z').timestamp() * 1000)
+                simplified_news.append((story['title'], story.get('source', {}).get('name', 'Unknown source'), timestamp))
+        else:
+            # Process news items that are not categorized under stories but check date first
+            if news_item.get('date'):
+                timestamp = int(datetime.strptime(news_item['date'], '%m/%d/%Y, %H:%M %p, %z %Z').timestamp() * 1000)
+                simplified_news.append((news_item['title'], news_item.get('source', {}).get('name', 'Unknown source'), timestamp))
+            else:
+                simplified_news.append((news_item['title'], news_item.get('source', {}).get('name', 'Unknown source'), 'No timestamp provided'))
+
+    return simplified_news
 
+def fetch_news_items():
+    # SerpAPI calls are paid, so news is fetched at most once per NEWS_TTL_SECONDS
     try:
-        response = requests.get(url)
-        news_results = response.json()['news_results']
-
-        simplified_news = []
-        
-        for news_item in news_results:
-            # Check if this news item contains 'stories'
-            if 'stories' in news_item:
-                for story in news_item['stories']:
-                    timestamp = int(datetime.strptime(story['date'], '%m/%d/%Y, %H:%M %p, %z %Z').timestamp() * 1000)
-                    simplified_news.append((story['title'], story.get('source', {}).get('name', 'Unknown source'), timestamp))
-            else:
-                # Process news items that are not categorized under stories but check date first
-                if news_item.get('date'):
-                    timestamp = int(datetime.strptime(news_item['date'], '%m/%d/%Y, %H:%M %p, %z %Z').timestamp() * 1000)
-                    simplified_news.append((news_item['title'], news_item.get('source', {}).get('name', 'Unknown source'), timestamp))
-                else:
-                    simplified_news.append((news_item['title'], news_item.get('source', {}).get('name', 'Unknown source'), 'No timestamp provided'))
-        result = str(simplified_news)
+        with tracing.span("news") as attributes:
+            news = signal_cache.get(NEWS_CACHE_NAME, request_news_items, NEWS_TTL_SECONDS, NEWS_MAX_STALE_SECONDS)
+            attributes["items"] = len(news)
+            attributes["bytes"] = len(json.dumps(news, ensure_ascii=False))
+        return [tuple(item) for item in news]
     except Exception as e:
         print(f"Error fetching news data: {e}")
+        return []
 
-    return result
+def get_news_data():
+    simplified_news = fetch_news_items()
+    return str(simplified_news) if simplified_news else "No news data available."
+
+def fetch_fear_and_greed_data(limit=1, date_format=''):
+    # The raw Fear and Greed Index entries, newest first
+    base_url = "https://api.alternative.me/fng/"
+    params = {
+        'limit': limit,
+        'format': 'json',
+        'date_format': date_format
+    }
+    response = http_client.get(base_url, params=params)
+    return response.json()['data']
+
+def update_fear_and_greed(previous, days=FEAR_AND_GREED_DAYS, now=None):
+    """
+    The latest days of Fear and Greed Index entries, newest first, fetching only the days missing from previous.
+    Parameters:
+    - previous (list): Entries from an earlier call, newest first, or None.
+    - now (float): Current time in seconds. Default is time.time().
+    """
+    # The index is published once a day, so an entry never changes once fetched
+    limit = days
+    if previous:
+        missing_days = int(((now or time.time()) - int(previous[0]['timestamp'])) // 86400)
+        limit = min(days, missing_days + 1)
+    entries = {entry['timestamp']: entry for entry in previous or []}
+    entries.update((entry['timestamp'], entry) for entry in fetch_fear_and_greed_data(limit=limit))
+    return sorted(entries.values(), key=lambda entry: int(entry['timestamp']), reverse=True)[:days]
+
+def fear_and_greed_ttl(entries):
+    # Fresh until the next daily value is published
+    return max(60, int(entries[0].get('time_until_update') or 3600)) if entries else 60
+
+def get_fear_and_greed():
+    with tracing.span("fear_and_greed") as attributes:
+        entries = signal_cache.get("fear_and_greed", lambda previous: update_fear_and_greed(previous, now=signal_cache.clock()),
+                                   fear_and_greed_ttl, FEAR_AND_GREED_MAX_STALE_SECONDS)
+        attributes["items"] = len(entries)
+        return entries
 
 def fetch_fear_and_greed_index(limit=1, date_format=''):
     """
@@ -202,188 +299,325 @@ def fetch_fear_and_greed_index(limit=1, date_format=''):
     Returns:
     - dict or str: The Fear and Greed Index data in the specified format.
     """
-    base_url = "https://api.alternative.me/fng/"
-    params = {
-        'limit': limit,
-        'format': 'json',
-        'date_format': date_format
-    }
-    response = requests.get(base_url, params=params)
-    myData = response.json()['data']
+    myData = fetch_fear_and_greed_data(limit, date_format)
     resStr = ""
     for data in myData:
         resStr += str(data)
     return resStr
 
-def get_current_base64_image():
-    screenshot_path = "screenshot.png"
-    try:
-        # Set up Chrome options for headless mode
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920x1080")
-
-        service = Service('/usr/local/bin/chromedriver')  # Specify the path to the ChromeDriver executable
-
-        # Initialize the WebDriver with the specified options
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-
-        # Navigate to the desired webpage
-        driver.get("https://upbit.com/full_chart?code=CRIX.UPBIT.KRW-BTC")
-
-        # Wait for the page to load completely
-        wait = WebDriverWait(driver, 10)  # 10 seconds timeout
-
-        # Wait for the first menu item to be clickable and click it
-        first_menu_item = wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='fullChartiq']/div/div/div[1]/div/div/cq-menu[1]")))
-        first_menu_item.click()
-
-        # Wait for the "1 Hour" option to be clickable and click it
-        one_hour_option = wait.until(EC.element_to_be_clickable((By.XPATH, "//cq-item[@stxtap=\"Layout.setPeriodicity(1,60,'minute')\"]")))
-        one_hour_option.click()
-
-        # Wait for the indicators menu item to be clickable and click it
-        indicators_menu_item = wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='fullChartiq']/div/div/div[1]/div/div/cq-menu[3]")))
-        indicators_menu_item.click()
-
-        # Wait for the indicators container to be present
-        indicators_container = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "cq-scroll.ps-container")))
-
-        # Scroll the container to make the "MACD" indicator visible
-        driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight / 2.5", indicators_container)
+def prepare_chart_image(data):
+    # Returns an image_payload.ChartImage; the same capture is only encoded once per cycle
+    with tracing.span("image", format=IMAGE_FORMAT, detail=IMAGE_DETAIL) as attributes:
+        image = image_cache.prepare(data, image_format=IMAGE_FORMAT, quality=IMAGE_QUALITY, detail=IMAGE_DETAIL)
+        attributes["bytes"] = len(image)
+        attributes["tokens"] = image.tokens
+    return image
 
-        # Wait for the "MACD" indicator to be clickable and click it
-        macd_indicator = wait.until(EC.element_to_be_clickable((By.XPATH, "//cq-item[translate[@original='MACD']]")))
-        macd_indicator.click()
-
-        # Take a screenshot to verify the actions
-        driver.save_screenshot(screenshot_path)
+def get_current_chart_image():
+    try:
+        # Capture from a warm browser that already sits on the chart with the layout applied
+        with tracing.span("screenshot", renderer="selenium") as attributes:
+            png = get_default_pool().capture_png()
+            attributes["bytes"] = len(png)
+        return prepare_chart_image(png)
     except Exception as e:
         print(f"Error making current image: {e}")
-        return ""
-    finally:
-        # Close the browser
-        driver.quit()
-        with open(screenshot_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        return None
+
+def render_chart_image(df_hourly, market="KRW-BTC"):
+    try:
+        width, height = (int(v) for v in CHART_IMAGE_SIZE.split("x"))
+        with tracing.span("screenshot", renderer="local", market=market) as attributes:
+            # Drawn lossless; prepare_chart_image does the final encoding
+            options = {"width": width, "height": height, "image_format": "png", "title": f"{market} 1H"}
+            if render_pool is not None:
+                png = render_pool.submit(df_hourly, **options).result(timeout=tracing.budget("screenshot"))
+            else:
+                png = render_chart(df_hourly, **options)
+            attributes["bytes"] = len(png)
+        return prepare_chart_image(png)
+    except Exception as e:
+        print(f"Error rendering chart image: {e}")
+        return None
+
+# Instructions are kept in memory and only re-read when the file changes
+instructions_cache = {}
 
 def get_instructions(file_path):
     try:
+        mtime = os.stat(file_path).st_mtime_ns
+        cached = instructions_cache.get(file_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
         with open(file_path, "r", encoding="utf-8") as file:
             instructions = file.read()
+        instructions_cache[file_path] = (mtime, instructions)
         return instructions
     except FileNotFoundError:
         print("File not found.")
     except Exception as e:
         print("An error occurred while reading the file:", e)
 
-def analyze_data_with_gpt4(news_data, data_json, last_decisions, fear_and_greed, current_status, current_base64_image):
+# Running totals of prompt tokens and how many of them the provider served from its prompt cache
+prompt_cache_stats = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+def record_prompt_cache_usage(usage):
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+    prompt_cache_stats["calls"] += 1
+    prompt_cache_stats["prompt_tokens"] += usage.prompt_tokens
+    prompt_cache_stats["cached_tokens"] += cached_tokens
+    total_ratio = prompt_cache_stats["cached_tokens"] / max(1, prompt_cache_stats["prompt_tokens"])
+    print(f"Prompt tokens: {usage.prompt_tokens} ({cached_tokens} cached); "
+          f"{total_ratio:.0%} cached over {prompt_cache_stats['calls']} calls")
+
+def request_analysis(news_data, data_json, last_decisions, fear_and_greed, current_status, chart_image):
+    # Sends the full prompt and returns the response content; errors are raised so the caller can decide whether to retry
     instructions_path = "instructions_v3.md"
+    instructions = get_instructions(instructions_path)
+    if not instructions:
+        raise ValueError("No instructions found.")
+
+    # The static instructions come first and the sections follow in PROMPT_ORDER, from slowest- to fastest-changing,
+    # so the longest possible prefix is byte-identical between calls and eligible for prompt caching
+    messages = prompt_messages(instructions, {"news": news_data, "market_data": data_json, "last_decisions": last_decisions,
+                                              "fear_and_greed": fear_and_greed, "current_status": current_status})
+    # The chart image is optional; skip it when the capture failed. Its content part, with the data URL
+    # already built, comes from the ChartImage, so a retry doesn't encode it again
+    if chart_image:
+        messages.append({"role": "user", "content": [{"type": "text", "text": LABELS["chart_image"]}, chart_image.content]})
+
+    with tracing.span("llm", model="gpt-4o") as attributes:
+        attributes["bytes"] = sum(len(message["content"]) for message in messages if isinstance(message["content"], str))
+        if chart_image:
+            attributes["bytes"] += len(LABELS["chart_image"]) + len(chart_image.content["image_url"]["url"])
+            attributes["image_tokens"] = chart_image.tokens
+
+        def call():
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                response_format={"type":"json_object"},
+                # Route calls with the same instructions to the same cache
+                extra_body={"prompt_cache_key": instructions_path}
+            )
+            if response.usage:
+                record_prompt_cache_usage(response.usage)
+                attributes["prompt_tokens"] = response.usage.prompt_tokens
+                attributes["completion_tokens"] = response.usage.completion_tokens
+                attributes["tokens"] = response.usage.total_tokens
+            return response.choices[0].message.content
+
+        return llm_cache.complete("gpt-4o", messages, call, response_format="json_object")
+
+def analyze_data_with_gpt4(news_data, data_json, last_decisions, fear_and_greed, current_status, chart_image):
     try:
-        instructions = get_instructions(instructions_path)
-        if not instructions:
-            print("No instructions found.")
-            return None
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": instructions},
-                {"role": "user", "content": news_data},
-                {"role": "user", "content": data_json},
-                {"role": "user", "content": last_decisions},
-                {"role": "user", "content": fear_and_greed},
-                {"role": "user", "content": current_status},
-                {"role": "user", "content": [{"type": "image_url","image_url": {"url": f"data:image/jpeg;base64,{current_base64_image}"}}]}
-            ],
-            response_format={"type":"json_object"}
-        )
-        advice = response.choices[0].message.content
-        return advice
+        return request_analysis(news_data, data_json, last_decisions, fear_and_greed, current_status, chart_image)
     except Exception as e:
         print(f"Error in analyzing data with GPT-4: {e}")
         return None
 
-def execute_buy(percentage):
-    print("Attempting to buy BTC with a percentage of KRW balance...")
+def repair_decision(content, error_message):
+    # Only the broken answer and the schema are sent, not the whole prompt and image
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=repair_messages(content, error_message),
+        response_format={"type":"json_object"}
+    )
+    return response.choices[0].message.content
+
+def execute_buy(percentage, market="KRW-BTC", snapshot=None):
+    print(f"Attempting to buy {currency(market)} with a percentage of KRW balance...")
     try:
-        krw_balance = upbit.get_balance("KRW")
-        amount_to_invest = krw_balance * (percentage / 100)
-        if amount_to_invest > 5000:  # Ensure the order is above the minimum threshold
-            result = upbit.buy_market_order("KRW-BTC", amount_to_invest * 0.9995)  # Adjust for fees
-            print("Buy order successful:", result)
+        # The snapshot's balance and orderbook are reused when fresh, saving the round trips before the order
+        with tracing.span("order", market=market, side="buy", mode=executor.mode) as attributes:
+            record = executor.buy(market, percentage, snapshot)
+            if record:
+                attributes["slippage_bps"] = record["slippage_bps"]
+        if record:
+            print("Buy order successful:", record)
     except Exception as e:
         print(f"Failed to execute buy order: {e}")
 
-def execute_sell(percentage):
-    print("Attempting to sell a percentage of BTC...")
+def execute_sell(percentage, market="KRW-BTC", snapshot=None):
+    print(f"Attempting to sell a percentage of {currency(market)}...")
     try:
-        btc_balance = upbit.get_balance("BTC")
-        amount_to_sell = btc_balance * (percentage / 100)
-        current_price = pyupbit.get_orderbook(ticker="KRW-BTC")['orderbook_units'][0]["ask_price"]
-        if current_price * amount_to_sell > 5000:  # Ensure the order is above the minimum threshold
-            result = upbit.sell_market_order("KRW-BTC", amount_to_sell)
-            print("Sell order successful:", result)
+        with tracing.span("order", market=market, side="sell", mode=executor.mode) as attributes:
+            record = executor.sell(market, percentage, snapshot)
+            if record:
+                attributes["slippage_bps"] = record["slippage_bps"]
+        if record:
+            print("Sell order successful:", record)
     except Exception as e:
         print(f"Failed to execute sell order: {e}")
 
-def make_decision_and_execute():
-    print("Making decision and executing...")
+def decide_market(market, results, current_status, chart_image):
+    # Builds one market's prompt from the gathered data and asks the model; returns the decision or None
+    df_daily, df_hourly = results[f"market_data:{market}"]
+    sections, tokens = build_payload(results["news"], df_daily, df_hourly, results[f"last_decisions:{market}"],
+                                     results["fear_and_greed"], json.loads(current_status), PROMPT_TOKEN_BUDGET)
+    print(f"Prompt sections for {market}:")
+    print_token_report(tokens)
+    # The web chart only shows KRW-BTC, so other markets always get a locally drawn chart,
+    # as does KRW-BTC when the capture failed
+    chart_image = chart_image if chart_image is not None else render_chart_image(df_hourly, market)
+    # Transient API errors are retried with backoff; malformed answers get a short repair request instead
+    return request_decision(
+        lambda: request_analysis(sections["news"], sections["market_data"], sections["last_decisions"],
+                                 sections["fear_and_greed"], sections["current_status"], chart_image),
+        repair_decision,
+        deadline_seconds=LLM_DEADLINE_SECONDS
+    )
+
+def stored_hourly_candles(market, count=EVENT_CANDLE_COUNT):
+    # The recent hourly candles as MarketFeed candles, with ts in epoch seconds instead of naive KST
+    df = ohlcv_store.get_ohlcv(market, interval="minute60", count=count)
+    if df is None:
+        return []
+    ts = (df.index.values.astype('datetime64[s]').astype('int64')
+          - int(ohlcv_store.KST.utcoffset(None).total_seconds())).tolist()
+    return [{"ts": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for t, o, h, l, c, v in zip(ts, *(df[column].tolist() for column in ['open', 'high', 'low', 'close', 'volume']))]
+
+def make_decision_and_execute(markets=None):
+    markets = markets or MARKETS
+    tracing.start_trace()
+    # Images are only reused within a cycle
+    image_cache.clear()
     try:
-        news_data = get_news_data()
-        data_json = fetch_and_prepare_data()
-        last_decisions = fetch_last_decisions()
-        fear_and_greed = fetch_fear_and_greed_index(limit=30)
-        current_status = get_current_status()
-        current_base64_image = get_current_base64_image()
-    except Exception as e:
-        print(f"Error: {e}")
-    else:
-        max_retries = 5
-        retry_delay_seconds = 5
-        decision = None
-        for attempt in range(max_retries):
+        with tracing.span("cycle", markets=len(markets)):
+            run_cycle(markets)
+    finally:
+        print("Stage timings:")
+        tracing.print_spans(tracing.current_spans())
+        if METRICS_FILE:
             try:
-                advice = analyze_data_with_gpt4(news_data, data_json, last_decisions, fear_and_greed, current_status, current_base64_image)
-                decision = json.loads(advice)
-                break
-            except Exception as e:
-                print(f"JSON parsing failed: {e}. Retrying in {retry_delay_seconds} seconds...")
-                time.sleep(retry_delay_seconds)
-                print(f"Attempt {attempt + 2} of {max_retries}")
-        if not decision:
-            print("Failed to make a decision after maximum retries.")
+                tracing.write_metrics(METRICS_FILE)
+            except OSError as e:
+                print(f"Error writing metrics: {e}")
+
+def run_cycle(markets):
+    print(f"Making decisions for {', '.join(markets)} and executing...")
+    try:
+        # Every source is I/O-bound, so fetch them concurrently; the slowest one sets the pace.
+        # News and the Fear and Greed Index are shared, and balances and orderbooks come in one request each.
+        # Each source's timeout is its stage budget from tracing.BUDGETS.
+        budget = tracing.budget
+        sources = {
+            "news": (fetch_news_items, [], budget("news")),
+            "fear_and_greed": (get_fear_and_greed, [], budget("fear_and_greed")),
+            "current_status": (lambda: get_current_statuses(markets), REQUIRED, budget("status")),
+        }
+        for market in markets:
+            # A market whose candles can't be fetched sits this cycle out instead of stopping the others
+            sources[f"candles:{market}"] = (lambda market=market: fetch_candles(market), None, budget("ohlcv"))
+            sources[f"last_decisions:{market}"] = (lambda market=market: load_last_decisions(market=market), [],
+                                                   budget("last_decisions"))
+        if CHART_RENDERER == "selenium" and "KRW-BTC" in markets:
+            sources["chart_image"] = (get_current_chart_image, None, budget("screenshot") + budget("image"))
+        results, timings = gather_data(sources)
+        print("Data sources fetched:")
+        print_timings(timings)
+        if shutdown.is_set():
+            print("Stopping: no decisions this cycle")
             return
-        else:
+        current_statuses = results["current_status"]
+        markets = [market for market in markets if results[f"candles:{market}"] is not None]
+        if not markets:
+            raise RuntimeError("No market data available")
+        # Indicators are CPU-bound, so they run for all markets at once after the downloads instead of on their threads
+        market_data = add_market_indicators({market: results[f"candles:{market}"] for market in markets})
+        results.update((f"market_data:{market}", data) for market, data in market_data.items())
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+
+    # One model call per market, all in flight at once, so more markets don't add up in latency
+    with ThreadPoolExecutor(max_workers=len(markets), thread_name_prefix="decide") as pool:
+        futures = {
+            market: pool.submit(decide_market, market, results, current_statuses[market],
+                                    results["chart_image"] if market == "KRW-BTC" and "chart_image" in results else None)
+            for market in markets
+        }
+        decisions = {}
+        for market, future in futures.items():
             try:
-                percentage = decision.get('percentage', 100)
-
-                if decision.get('decision') == "buy":
-                    execute_buy(percentage)
-                elif decision.get('decision') == "sell":
-                    execute_sell(percentage)
-                
-                save_decision_to_db(decision, current_status)
+                decision = future.result()
             except Exception as e:
-                print(f"Failed to execute the decision or save to DB: {e}")
+                print(f"Error deciding {market}: {e}")
+                decision = None
+            if decision:
+                decisions[market] = decision
+            else:
+                print(f"Failed to make a decision for {market} after maximum retries.")
+    if llm_cache.mode != "passthrough":
+        llm_cache.print_stats()
+    signal_cache.print_stats()
+    print("HTTP latency since start:")
+    http_client.print_stats()
+    if not decisions:
+        return
+    if shutdown.is_set():
+        # Orders are only waited for once sent; the decisions weren't acted on, so they aren't saved either
+        print("Stopping: decisions not executed")
+        return
+
+    try:
+        # Orders start from the balances and orderbooks fetched with the data; the executor refreshes what is stale
+        snapshot = Snapshot.from_statuses(current_statuses)
+        executed = len(executor.records)
+        # Sells go first so the KRW they free up is available to the buys
+        for market, decision in decisions.items():
+            if decision.get('decision') == "sell" and not shutdown.is_set():
+                execute_sell(decision.get('percentage', 100), market, snapshot)
+        for market, decision in decisions.items():
+            if decision.get('decision') == "buy" and not shutdown.is_set():
+                execute_buy(decision.get('percentage', 100), market, snapshot)
+        print_records(executor.records[executed:])
+
+        save_decisions_to_db(decisions, current_statuses)
+    except Exception as e:
+        print(f"Failed to execute the decisions or save to DB: {e}")
 
 if __name__ == "__main__":
+    if SCHEDULER_MODE == "event" and MARKET_FEED != "websocket":
+        raise SystemExit("SCHEDULER_MODE=event needs MARKET_FEED=websocket: its triggers read candles from the live feed")
     initialize_db()
-    # testing
-    # schedule.every().minute.do(make_decision_and_execute)
-
-    # Schedule the task to run at 00:01
-    schedule.every().day.at("00:01").do(make_decision_and_execute)
-
-    # Schedule the task to run at 08:01
-    schedule.every().day.at("08:01").do(make_decision_and_execute)
-
-    # Schedule the task to run at 16:01
-    schedule.every().day.at("16:01").do(make_decision_and_execute)
-
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
\ No newline at end of file
+    # Chart rendering is CPU-bound, so it runs in worker processes where it can't hold up the control loop
+    if CHART_RENDERER == "local" and RENDER_WORKERS:
+        render_pool = start_render_pool(RENDER_WORKERS)
+    if METRICS_PORT:
+        tracing.serve_metrics(METRICS_PORT)
+    if MARKET_FEED == "websocket":
+        feed = MarketFeed(MARKETS, candle_seconds=3600, max_candles=EVENT_CANDLE_COUNT).start()
+    # Start the chart browser now so the first decision doesn't pay the cold start
+    if CHART_RENDERER == "selenium":
+        try:
+            get_default_pool().warm_up()
+        except Exception as e:
+            print(f"Error starting chart browser: {e}")
+
+    daemon = Daemon(make_decision_and_execute, slots=SLOTS if SCHEDULER_MODE == "slots" else (), overlap=OVERLAP_POLICY,
+                    health_port=HEALTH_PORT, shutdown_timeout=SHUTDOWN_TIMEOUT_SECONDS, stop_event=shutdown)
+    if SCHEDULER_MODE == "event":
+        # Wake up on closed candles from the feed instead of fixed wall-clock slots
+        # Start with the stored history so the triggers don't wait days for enough candles from trades
+        for market in MARKETS:
+            feed.seed_candles(market, stored_hourly_candles(market))
+        # A trigger on any market runs one cycle, which decides for all of them
+        scheduler = EventScheduler(feed.get_candles, lambda: daemon.request_cycle("trigger"), codes=MARKETS,
+                                   max_cycles_per_day=EVENT_MAX_CYCLES_PER_DAY)
+        feed.add_listener(scheduler.on_message)
+        threading.Thread(target=scheduler.run, name="event-scheduler", daemon=True).start()
+    try:
+        daemon.run()
+    finally:
+        if SCHEDULER_MODE == "event":
+            scheduler.stop()
+        if feed is not None:
+            feed.stop()
+        if render_pool is not None:
+            render_pool.shutdown(cancel_futures=True)
+        signal_cache.wait_for_refreshes()
+        decision_store.close()
+        print("Stopped.")
@@ -0,0 +1,307 @@
+import json
+import time
+import numpy as np
+import decision_store
+import indicators
+from execution import FEE_RATE, Executor
+from fake_upbit import FakeUpbit, make_orderbook
+from llm_response import request_decision
+from prompt_payload import build_payload, prompt_messages
+
+KST_OFFSET_SECONDS = 9 * 3600
+MARKET = "KRW-BTC"
+# Depth of the one-level book the simulated orders fill against, far more than any backtest account trades
+BOOK_SIZE = 1e12
+
+class SimulatedExchange:
+    """
+    The backtest account. Orders go through execution.Executor, the bot's order path, to a fake_upbit.FakeUpbit
+    whose book is a single level at the decision price, so the Executor's minimum order and fee adjustment and the
+    exchange's fee apply exactly as they do live.
+    """
+
+    def __init__(self, krw_balance=2_000_000, fee_rate=FEE_RATE):
+        self.exchange = FakeUpbit({"KRW": float(krw_balance)}, {MARKET: self._book(1)}, fee_rate=fee_rate,
+                                  replenish_seconds=0)
+        self.executor = Executor(self.exchange, self.exchange.get_orderbook, poll_interval=0, db_path=None,
+                                 sleep=lambda seconds: None)
+        self.btc_avg_buy_price = 0.0
+        self.fees_paid = 0.0
+
+    @staticmethod
+    def _book(price):
+        return make_orderbook(MARKET, price, tick=0, size=BOOK_SIZE, levels=1)
+
+    @property
+    def krw_balance(self):
+        return self.exchange.balances.get("KRW", 0.0)
+
+    @property
+    def btc_balance(self):
+        return self.exchange.balances.get("BTC", 0.0)
+
+    def buy(self, percentage, price):
+        self.exchange.orderbooks[MARKET] = self._book(price)
+        held = self.btc_balance
+        record = self.executor.buy(MARKET, percentage)
+        if record is None or not record["volume"]:
+            return None
+        volume, fee = record["volume"], record["fee"]
+        cost = volume * record["average_price"]
+        self.btc_avg_buy_price = (self.btc_avg_buy_price * held + cost) / (held + volume)
+        self.fees_paid += fee
+        return {"side": "buy", "price": price, "volume": volume, "krw": cost, "fee": fee}
+
+    def sell(self, percentage, price):
+        self.exchange.orderbooks[MARKET] = self._book(price)
+        record = self.executor.sell(MARKET, percentage)
+        if record is None or not record["volume"]:
+            return None
+        volume, fee = record["volume"], record["fee"]
+        proceeds = volume * record["average_price"]
+        pnl = (record["average_price"] - self.btc_avg_buy_price) * volume - fee
+        if self.btc_balance <= 1e-12:
+            self.exchange.balances["BTC"] = 0.0
+            self.btc_avg_buy_price = 0.0
+        self.fees_paid += fee
+        return {"side": "sell", "price": price, "volume": volume, "krw": proceeds, "fee": fee, "pnl": pnl}
+
+    def status(self):
+        return {"btc_balance": self.btc_balance, "krw_balance": self.krw_balance, "btc_avg_buy_price": self.btc_avg_buy_price}
+
+def precompute(df, indicator_options=None):
+    """Adds the indicators once for the whole history and returns (timestamps in seconds, column -> array)."""
+    df = indicators.add_indicators(df, **(indicator_options or {}))
+    times = df.index.values.astype('datetime64[s]').astype(np.int64)
+    return times, {column: df[column].to_numpy(dtype=np.float64) for column in df.columns}
+
+def daily_from_hourly(df_hourly):
+    # Upbit day candles start at 09:00 KST
+    daily = df_hourly.resample("24h", offset="9h").agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum", "value": "sum"})
+    return daily.dropna()
+
+class Window:
+    """The latest `rows` closed candles of a precomputed series, as array views; nothing is copied."""
+
+    def __init__(self, times, columns, end, rows):
+        self.times = times
+        self.columns = columns
+        self.start = max(0, end - rows)
+        self.end = end
+
+    def __getitem__(self, column):
+        return self.columns[column][self.start:self.end]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def to_frame(self):
+        import pandas as pd
+        index = pd.to_datetime(self.times[self.start:self.end], unit="s")
+        return pd.DataFrame({column: values[self.start:self.end] for column, values in self.columns.items()}, index=index)
+
+class MarketView:
+    """What a decision function sees at one decision time: closed candles up to now and the simulated account."""
+
+    def __init__(self, time, price, hourly, daily, status):
+        self.time = time
+        self.price = price
+        self.hourly = hourly
+        self.daily = daily
+        self.status = status
+
+def run_backtest(df_hourly, decide, df_daily=None, krw_balance=2_000_000, decision_hours=(0, 8, 16),
+                 hourly_rows=24, daily_rows=30, fee_rate=FEE_RATE, indicator_options=None):
+    """
+    Replays hourly candles through a decision function and the bot's order path against a simulated exchange.
+    Parameters:
+    - df_hourly (DataFrame): Hourly OHLCV like pyupbit.get_ohlcv, oldest first.
+    - decide (callable): MarketView -> {'decision': 'buy'|'sell'|'hold', 'percentage': float, ...} or None.
+    - df_daily (DataFrame): Daily OHLCV. Default is built from the hourly candles.
+    - krw_balance (float): Starting KRW. Default is 2,000,000 like the dashboard.
+    - decision_hours (tuple): Hours of the day (KST) to decide at, like the 00:01/08:01/16:01 slots. None decides every hour.
+    - hourly_rows, daily_rows (int): Candles visible to the decision function, like fetch_market_data.
+    - indicator_options (dict): Indicator windows passed to indicators.add_indicators, e.g. {'rsi_length': 21}.
+    Returns:
+    - dict: 'equity' (Series), 'trades' (list), 'decisions' (list) and 'metrics' (dict, see compute_metrics).
+    Decisions see only candles closed before the decision time and fill at the open of the candle that starts then.
+    """
+    if df_daily is None:
+        df_daily = daily_from_hourly(df_hourly)
+    hourly_times, hourly = precompute(df_hourly, indicator_options)
+    daily_times, daily = precompute(df_daily, indicator_options)
+    opens, closes = hourly["open"], hourly["close"]
+    # A day candle is closed once the next one has started
+    daily_closed = np.searchsorted(daily_times + 86400, hourly_times, side="right")
+
+    if decision_hours is None:
+        decision_bars = np.arange(1, len(hourly_times))
+    else:
+        hours = (hourly_times // 3600) % 24
+        decision_bars = np.flatnonzero(np.isin(hours, decision_hours))
+        decision_bars = decision_bars[decision_bars > 0]
+
+    exchange = SimulatedExchange(krw_balance, fee_rate)
+    krw_held = np.full(len(hourly_times), np.nan)
+    btc_held = np.full(len(hourly_times), np.nan)
+    krw_held[0], btc_held[0] = exchange.krw_balance, 0.0
+    trades = []
+    decisions = []
+    for bar in decision_bars:
+        price = float(opens[bar])
+        view = MarketView(int(hourly_times[bar]), price, Window(hourly_times, hourly, bar, hourly_rows),
+                          Window(daily_times, daily, daily_closed[bar], daily_rows), exchange.status())
+        decision = decide(view)
+        if not decision:
+            continue
+        decisions.append({"time": view.time, **decision})
+        trade = None
+        if decision.get("decision") == "buy":
+            trade = exchange.buy(decision.get("percentage", 100), price)
+        elif decision.get("decision") == "sell":
+            trade = exchange.sell(decision.get("percentage", 100), price)
+        if trade:
+            trades.append({"time": view.time, **trade})
+            krw_held[bar], btc_held[bar] = exchange.krw_balance, exchange.btc_balance
+
+    # Holdings only change on trades: carry them forward and value them at every close
+    filled = np.maximum.accumulate(np.where(np.isnan(krw_held), 0, np.arange(len(krw_held))))
+    equity = krw_held[filled] + btc_held[filled] * closes
+
+    import pandas as pd
+    equity = pd.Series(equity, index=df_hourly.index, name="equity")
+    return {"equity": equity, "trades": trades, "decisions": decisions,
+            "metrics": compute_metrics(equity, trades, closes, krw_balance, exchange.fees_paid)}
+
+def compute_metrics(equity, trades, closes, start_value, fees_paid=0.0):
+    values = equity.to_numpy()
+    peaks = np.maximum.accumulate(values)
+    sells = [trade for trade in trades if trade["side"] == "sell"]
+    period = equity.index[-1] - equity.index[0]
+    return {
+        "start_value": start_value,
+        "final_value": float(values[-1]),
+        "return_pct": (values[-1] - start_value) / start_value * 100,
+        "buy_and_hold_pct": (closes[-1] - closes[0]) / closes[0] * 100,
+        "max_drawdown_pct": float(((values - peaks) / peaks).min() * 100),
+        "trades": len(trades),
+        "win_rate_pct": sum(trade["pnl"] > 0 for trade in sells) / len(sells) * 100 if sells else None,
+        "fees_paid": fees_paid,
+        "days": period.days,
+        "hours": period.seconds // 3600,
+    }
+
+def print_metrics(metrics):
+    print(f"Return: {metrics['return_pct']:.2f}% (buy and hold {metrics['buy_and_hold_pct']:.2f}%)")
+    print(f"Period: {metrics['days']} days {metrics['hours']} hours")
+    print(f"Start value: {metrics['start_value']:,.0f} KRW, final value: {metrics['final_value']:,.0f} KRW")
+    print(f"Max drawdown: {metrics['max_drawdown_pct']:.2f}%")
+    win_rate = "n/a" if metrics['win_rate_pct'] is None else f"{metrics['win_rate_pct']:.1f}%"
+    print(f"Trades: {metrics['trades']}, win rate: {win_rate}, fees: {metrics['fees_paid']:,.0f} KRW")
+
+# Decision functions
+
+def rsi_strategy(oversold=30, overbought=70, percentage=50):
+    """Buys when hourly RSI is oversold and sells when it is overbought. Useful as a baseline."""
+    def decide(view):
+        rsi = view.hourly["RSI_14"]
+        if len(rsi) == 0 or np.isnan(rsi[-1]):
+            return None
+        if rsi[-1] < oversold:
+            return {"decision": "buy", "percentage": percentage, "reason": f"RSI {rsi[-1]:.1f}"}
+        if rsi[-1] > overbought:
+            return {"decision": "sell", "percentage": percentage, "reason": f"RSI {rsi[-1]:.1f}"}
+        return {"decision": "hold", "percentage": 0, "reason": f"RSI {rsi[-1]:.1f}"}
+    return decide
+
+def band_rsi_strategy(sma_length=10, ema_length=10, rsi_length=14, oversold=30, overbought=70,
+                      buy_percentage=50, sell_percentage=50):
+    """
+    Buys on an oversold RSI or a close below the lower Bollinger Band while EMA is above SMA,
+    and sells on an overbought RSI or a close above the upper band. Uses every indicator window add_indicators takes.
+    """
+    sma_column, ema_column, rsi_column = f"SMA_{sma_length}", f"EMA_{ema_length}", f"RSI_{rsi_length}"
+    def decide(view):
+        hourly = view.hourly
+        if len(hourly) == 0:
+            return None
+        close, rsi = hourly["close"][-1], hourly[rsi_column][-1]
+        if np.isnan(rsi) or np.isnan(hourly["Lower_Band"][-1]):
+            return None
+        if (rsi > overbought or close > hourly["Upper_Band"][-1]) and view.status["btc_balance"] > 0:
+            return {"decision": "sell", "percentage": sell_percentage, "reason": f"RSI {rsi:.1f}"}
+        if (rsi < oversold or close < hourly["Lower_Band"][-1]) and hourly[ema_column][-1] >= hourly[sma_column][-1]:
+            return {"decision": "buy", "percentage": buy_percentage, "reason": f"RSI {rsi:.1f}"}
+        return {"decision": "hold", "percentage": 0, "reason": f"RSI {rsi:.1f}"}
+    return decide
+
+def recorded_decisions(db_path='trading_decisions.sqlite', market='KRW-BTC'):
+    """Replays the decisions saved by autotrade in the decisions table, by time; a decision is used once."""
+    rows = [row[1:5] for row in decision_store.load_decisions(db_path=db_path, market=market)]
+    # Decisions are stored in epoch milliseconds; candle times are naive KST
+    times = np.array([row[0] for row in rows], dtype=np.int64) // 1000 + KST_OFFSET_SECONDS
+    state = {"next": 0}
+    def decide(view):
+        position = np.searchsorted(times, view.time + 3600, side="left")
+        if position <= state["next"]:
+            return None
+        # Use the latest decision made in the hour before this candle
+        state["next"] = position
+        _, decision, percentage, reason = rows[position - 1]
+        return {"decision": decision, "percentage": percentage, "reason": reason}
+    return decide
+
+def prompt_decider(call, token_budget=None, **options):
+    """
+    Builds the same text sections as autotrade_v3 for each decision and gets a validated decision.
+    Parameters:
+    - call (callable): sections dict -> response content, e.g. a model request or a recorded-response cache.
+    - token_budget (int): Passed to build_payload.
+    - options: Passed to request_decision, e.g. repair.
+    """
+    history = []
+    def decide(view):
+        price = view.price
+        status = view.status
+        current_status = {"current_time": view.time * 1000,
+                          "orderbook": {"market": "KRW-BTC", "timestamp": view.time * 1000, "orderbook_units":
+                                        [{"ask_price": price, "bid_price": price, "ask_size": 0, "bid_size": 0}]},
+                          **status}
+        sections, _ = build_payload([], view.daily.to_frame(), view.hourly.to_frame(), history[:10], [],
+                                    current_status, token_budget)
+        decision = request_decision(lambda: call(sections), **options)
+        if decision:
+            history.insert(0, {"timestamp": view.time * 1000, **decision, **status})
+        return decision
+    return decide
+
+def model_call(cache, client, instructions, model="gpt-4o"):
+    """
+    A call for prompt_decider that sends the sections like request_analysis, through an LLMCache.
+    With the cache in 'replay' mode no client is needed and a backtest over recorded periods makes no requests.
+    """
+    def call(sections):
+        messages = prompt_messages(instructions, sections)
+        def request():
+            response = client.chat.completions.create(model=model, messages=messages, response_format={"type": "json_object"})
+            return response.choices[0].message.content
+        return cache.complete(model, messages, request, response_format="json_object")
+    return call
+
+if __name__ == "__main__":
+    # Backtest the RSI baseline over the stored hourly candles: python backtest.py [result.json]
+    import sys
+    import ohlcv_store
+    df = ohlcv_store.load_candles("KRW-BTC", "minute60")
+    if df.empty:
+        print("No stored hourly candles; run autotrade_v3 or ohlcv_store.get_ohlcv first.")
+        sys.exit(1)
+    started = time.perf_counter()
+    result = run_backtest(df, rsi_strategy())
+    print(f"Backtested {len(df)} hourly candles in {time.perf_counter() - started:.2f} seconds")
+    print_metrics(result["metrics"])
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "w", encoding="utf-8") as file:
+            json.dump({"metrics": result["metrics"], "trades": result["trades"],
+                       "equity": {str(k): v for k, v in result["equity"].items()}}, file, indent=2)
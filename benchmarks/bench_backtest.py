@@ -0,0 +1,52 @@
+# Times the backtest over years of synthetic hourly candles and checks it against a naive per-bar DataFrame replay.
+# Usage: python -m benchmarks.bench_backtest
+import time
+import numpy as np
+import indicators
+from backtest import SimulatedExchange, prompt_decider, rsi_strategy, run_backtest
+from fake_openai_server import VALID_DECISION
+from benchmarks.synthetic import make_ohlcv
+
+def naive_backtest(df, decision_hours=(0, 8, 16)):
+    # Recomputes indicators on a copy of the history at every decision, like running fetch_market_data per bar
+    exchange = SimulatedExchange()
+    decide = rsi_strategy()
+    for bar in range(1, len(df)):
+        if df.index[bar].hour not in decision_hours:
+            continue
+        history = indicators.add_indicators(df.iloc[:bar].copy())
+        rsi = history["RSI_14"].to_numpy()[-24:]
+        view = type("View", (), {"hourly": {"RSI_14": rsi}})
+        decision = decide(view)
+        if decision and decision["decision"] == "buy":
+            exchange.buy(decision["percentage"], df["open"].iloc[bar])
+        elif decision and decision["decision"] == "sell":
+            exchange.sell(decision["percentage"], df["open"].iloc[bar])
+    return exchange.krw_balance + exchange.btc_balance * df["close"].iloc[-1]
+
+if __name__ == "__main__":
+    df = make_ohlcv(3000)
+    started = time.perf_counter()
+    naive_value = naive_backtest(df)
+    naive_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    result = run_backtest(df, rsi_strategy())
+    seconds = time.perf_counter() - started
+    same = np.isclose(naive_value, result["metrics"]["final_value"])
+    print(f"3000 candles: naive {naive_seconds:.2f} s, backtest {seconds * 1000:.1f} ms, "
+          f"final value {'matches' if same else 'MISMATCH'} ({result['metrics']['final_value']:,.0f} KRW)")
+
+    for years in (1, 3, 5):
+        df = make_ohlcv(years * 365 * 24)
+        for label, hours in (("3 slots/day", (0, 8, 16)), ("every hour", None)):
+            started = time.perf_counter()
+            result = run_backtest(df, rsi_strategy(), decision_hours=hours)
+            metrics = result["metrics"]
+            print(f"{years} years, {label:<11}: {time.perf_counter() - started:6.2f} s, {len(result['decisions']):6d} decisions, "
+                  f"{metrics['trades']:5d} trades, return {metrics['return_pct']:7.2f}%, max drawdown {metrics['max_drawdown_pct']:6.2f}%")
+
+    # The prompt path builds every section per decision; a stub stands in for the model
+    df = make_ohlcv(365 * 24)
+    started = time.perf_counter()
+    result = run_backtest(df, prompt_decider(lambda sections: VALID_DECISION))
+    print(f"1 year through the prompt builder: {time.perf_counter() - started:.2f} s for {len(result['decisions'])} decisions")
@@ -0,0 +1,44 @@
+# Compares the local matplotlib chart renderer with the Selenium screenshot path.
+# Usage: python -m benchmarks.bench_chart_render [--selenium]
+import sys
+import time
+from chart_renderer import render_chart
+from benchmarks.synthetic import make_ohlcv, add_chart_indicators
+
+SETTINGS = [
+    ("png", 1920, 1080),
+    ("png", 1280, 720),
+    ("jpeg", 1280, 720),
+    ("jpeg", 1024, 576),
+]
+RUNS = 10
+
+def bench_local(df):
+    render_chart(df)  # Warm up matplotlib's font cache
+    for image_format, width, height in SETTINGS:
+        started = time.perf_counter()
+        for _ in range(RUNS):
+            image = render_chart(df, width=width, height=height, image_format=image_format)
+        elapsed = (time.perf_counter() - started) / RUNS
+        print(f"local    {image_format:<5} {width}x{height}  {elapsed * 1000:8.1f} ms  {len(image) / 1024:8.1f} KB")
+
+def bench_selenium():
+    from chart_browser import ChartSession
+    started = time.perf_counter()
+    session = ChartSession()
+    cold_start = time.perf_counter() - started
+    try:
+        started = time.perf_counter()
+        for _ in range(RUNS):
+            image = session.capture_png()
+        elapsed = (time.perf_counter() - started) / RUNS
+    finally:
+        session.close()
+    print(f"selenium cold start {cold_start * 1000:8.1f} ms")
+    print(f"selenium png   1920x1080  {elapsed * 1000:8.1f} ms  {len(image) / 1024:8.1f} KB")
+
+if __name__ == "__main__":
+    df = add_chart_indicators(make_ohlcv(48)).iloc[-24:]
+    bench_local(df)
+    if "--selenium" in sys.argv:
+        bench_selenium()
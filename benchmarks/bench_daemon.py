@@ -0,0 +1,129 @@
+# Runs daemon.Daemon with stand-in cycles: health endpoint latency while a cycle draws charts on its own thread
+# and in a worker process, overlapping cycle requests under 'skip' and 'queue', and SIGTERM before and during an order.
+# Usage: python -m benchmarks.bench_daemon
+import io
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from chart_renderer import render_chart
+from daemon import Daemon
+from benchmarks.synthetic import make_ohlcv, add_chart_indicators
+
+PORT = 18765
+CHARTS = 6
+# Stand-in for the model call
+LLM_SECONDS = 0.5
+
+def health_latency(port, stop, samples):
+    while not stop.is_set():
+        started = time.perf_counter()
+        with socket.create_connection(("127.0.0.1", port)) as connection:
+            connection.sendall(b"GET /healthz HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            while connection.recv(65536):
+                pass
+        samples.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+def run_daemon(daemon, actions):
+    # Runs the daemon on this (main) thread while actions() drives it from another
+    def drive():
+        while daemon._loop is None or daemon.status["state"] == "starting":
+            time.sleep(0.01)
+        actions()
+    threading.Thread(target=drive, daemon=True).start()
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        daemon.run()
+    return time.perf_counter() - started
+
+def bench_health(df, pool):
+    def cycle():
+        for _ in range(CHARTS):
+            pool.submit(render_chart, df).result() if pool else render_chart(df)
+        time.sleep(LLM_SECONDS)
+
+    samples = []
+    stop = threading.Event()
+    daemon = Daemon(cycle, slots=(), health_port=PORT)
+
+    def actions():
+        daemon.request_cycle()
+        threading.Thread(target=health_latency, args=(PORT, stop, samples), daemon=True).start()
+        while daemon.status["runs"] < 1:
+            time.sleep(0.01)
+        stop.set()
+        daemon.stop()
+    run_daemon(daemon, actions)
+    samples.sort()
+    at = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    print(f"{'worker process' if pool else 'cycle thread':<15} {len(samples):>7} {at(0.5):8.1f} {at(0.99):8.1f} "
+          f"{samples[-1] * 1000:8.1f} {daemon.status['max_loop_lag'] * 1000:9.1f}")
+
+def bench_overlap(policy):
+    active = []
+    most = [0]
+
+    def cycle():
+        active.append(1)
+        most[0] = max(most[0], len(active))
+        time.sleep(0.5)
+        active.pop()
+
+    daemon = Daemon(cycle, slots=(), overlap=policy)
+
+    def actions():
+        # A cycle due every 0.2 s for 2 s, each taking 0.5 s
+        for _ in range(10):
+            daemon.request_cycle()
+            time.sleep(0.2)
+        while daemon.status["state"] == "running":
+            time.sleep(0.01)
+        daemon.stop()
+    seconds = run_daemon(daemon, actions)
+    status = daemon.status
+    print(f"{policy:<6} runs {status['runs']:>2}, skipped {status['skipped']:>2}, queued {status['queued']:>2}, "
+          f"at most {most[0]} running at once, {seconds:.1f}s")
+
+def bench_shutdown(signal_at):
+    placed = []
+    filled = []
+    daemon = Daemon(lambda: None, slots=(), shutdown_timeout=5)
+
+    def cycle():
+        time.sleep(0.3)  # Data and model
+        if daemon.stopping.is_set():
+            return  # As run_cycle: no new orders once stopping
+        placed.append(True)
+        time.sleep(0.7)  # The order, waiting for its fill
+        filled.append(True)
+    daemon.cycle = cycle
+
+    def actions():
+        daemon.request_cycle()
+        time.sleep(signal_at)
+        signalled.append(time.perf_counter())
+        os.kill(os.getpid(), signal.SIGTERM)
+    signalled = []
+    run_daemon(daemon, actions)
+    phase = "before the order" if signal_at < 0.3 else "mid-order"
+    print(f"SIGTERM {phase:<16}: exited {time.perf_counter() - signalled[0]:.2f}s after the signal, "
+          f"order {'completed' if filled else 'placed, abandoned' if placed else 'not placed'}, state {daemon.status['state']}")
+
+if __name__ == "__main__":
+    df = add_chart_indicators(make_ohlcv(24))
+    print(f"Health checks during a cycle drawing {CHARTS} charts:")
+    print(f"{'rendering on':<15} {'checks':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'loop lag':>9}")
+    bench_health(df, None)
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pool.submit(render_chart, df).result()  # Start the worker and import matplotlib
+        bench_health(df, pool)
+    print("Overlapping cycles:")
+    for policy in ("skip", "queue"):
+        bench_overlap(policy)
+    bench_shutdown(0.1)
+    bench_shutdown(0.5)
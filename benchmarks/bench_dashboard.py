@@ -0,0 +1,45 @@
+# Time and memory of the dashboard's data loading as the decision history grows, against reading the whole table.
+# Usage: python -m benchmarks.bench_dashboard
+import os
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+import decision_store
+import streamlit_app
+from benchmarks.bench_decision_store import make_rows
+
+def full_load(path):
+    # The original load_data: every row on every render
+    rows = decision_store.load_decisions(db_path=path)
+    return pd.DataFrame([row[1:] for row in rows], columns=decision_store.FIELDS)
+
+def dashboard_load(path):
+    # What main() reads per render, apart from the cached price
+    daily = streamlit_app.load_daily_summary(path)
+    decision_store.load_decisions(0, limit=1, db_path=path)
+    decision_store.load_decision_page(0, 1, path)
+    streamlit_app.load_page(0, 20, path)
+    return daily
+
+def measure(function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    function()
+    elapsed = (time.perf_counter() - started) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+if __name__ == "__main__":
+    print(f"{'rows':>9} {'full load ms':>13} {'MB':>7} {'first render ms':>16} {'rerun ms':>9} {'MB':>6}")
+    for count in (1_000, 10_000, 100_000, 1_000_000):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "decisions.sqlite")
+            decision_store.save_decisions(make_rows(count), path)
+            full_ms, full_mb = measure(lambda: full_load(path))
+            first_ms, _ = measure(lambda: dashboard_load(path))
+            decision_store.save_decisions(make_rows(3, start_ms=1_600_000_000_000 + count * 60_000), path)
+            rerun_ms, rerun_mb = measure(lambda: dashboard_load(path))
+            decision_store.close(path)
+        print(f"{count:>9,} {full_ms:13.1f} {full_mb:7.1f} {first_ms:16.1f} {rerun_ms:9.2f} {rerun_mb:6.2f}")
@@ -0,0 +1,73 @@
+# Insert and read latency of the decision store on a million-row table, against the original per-call connections.
+# Usage: python -m benchmarks.bench_decision_store [rows]
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+import decision_store
+
+def make_rows(count, start_ms=1_600_000_000_000):
+    decisions = ("buy", "sell", "hold")
+    reason = "RSI near oversold with price on the lower Bollinger Band; partial buy."
+    return [(start_ms + i * 60_000, decisions[i % 3], 30.0, reason, 0.01 + i * 1e-9, 1_000_000.0, 9e7, 9.1e7, "KRW-BTC")
+            for i in range(count)]
+
+def original_tables(path, rows):
+    with sqlite3.connect(path) as conn:
+        conn.execute('''CREATE TABLE decisions (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp DATETIME, decision TEXT,
+                        percentage REAL, reason TEXT, btc_balance REAL, krw_balance REAL, btc_avg_buy_price REAL, btc_krw_price REAL)''')
+        conn.executemany("INSERT INTO decisions (timestamp, decision, percentage, reason, btc_balance, krw_balance, "
+                         "btc_avg_buy_price, btc_krw_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         ((datetime.fromtimestamp(row[0] / 1000).strftime("%Y-%m-%d %H:%M:%S"), *row[1:8]) for row in rows))
+
+def original_insert(path, row):
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO decisions (timestamp, decision, percentage, reason, btc_balance, krw_balance, "
+                     "btc_avg_buy_price, btc_krw_price) VALUES (datetime('now', 'localtime'), ?, ?, ?, ?, ?, ?, ?)", row[1:8])
+        conn.commit()
+
+def original_read(path):
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT timestamp, decision, percentage, reason, btc_balance, krw_balance, btc_avg_buy_price "
+                            "FROM decisions ORDER BY timestamp DESC LIMIT 10").fetchall()
+        return [int(datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timestamp() * 1000) for row in rows]
+
+def latencies_ms(function, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rows = make_rows(count)
+    with tempfile.TemporaryDirectory() as directory:
+        original_path = os.path.join(directory, "original.sqlite")
+        store_path = os.path.join(directory, "store.sqlite")
+
+        started = time.perf_counter()
+        original_tables(original_path, rows)
+        print(f"original: {count:,} rows written in {time.perf_counter() - started:.1f} s")
+        started = time.perf_counter()
+        for i in range(0, count, 10_000):
+            decision_store.save_decisions(rows[i:i + 10_000], store_path)
+        print(f"store:    {count:,} rows written in batches of 10,000 in {time.perf_counter() - started:.1f} s")
+
+        print(f"{'operation':<34} {'p50 ms':>8} {'p99 ms':>8}")
+        def report(name, function, runs):
+            p50, p99 = latencies_ms(function, runs)
+            print(f"{name:<34} {p50:8.3f} {p99:8.3f}")
+        report("original insert (new connection)", lambda: original_insert(original_path, rows[0]), 200)
+        report("store save_decision", lambda: decision_store.save_decision(
+            {"decision": "hold", "percentage": 0, "reason": "x"},
+            {"btc_balance": 0.01, "krw_balance": 1e6, "btc_avg_buy_price": 9e7}, 9.1e7, db_path=store_path), 200)
+        report("original last 10 (text sort)", lambda: original_read(original_path), 5)
+        report("store load_last_decisions(10)", lambda: decision_store.load_last_decisions(10, store_path), 200)
+        report("store load_decisions(new rows)", lambda: decision_store.load_decisions(count - 10, db_path=store_path), 200)
+        decision_store.close(store_path)
@@ -0,0 +1,24 @@
+# Replays a year of hourly candles through the event scheduler on a simulated clock.
+# Usage: python -m benchmarks.bench_event_scheduler
+import contextlib
+import io
+import time
+from collections import Counter
+from event_scheduler import simulate
+from benchmarks.synthetic import make_ohlcv
+
+if __name__ == "__main__":
+    df = make_ohlcv(24 * 365)
+    ts = df.index.values.astype('datetime64[s]').astype('int64').tolist()
+    candles = [{"ts": t, "open": o, "high": h, "low": l, "close": c}
+               for t, o, h, l, c in zip(ts, df['open'], df['high'], df['low'], df['close'])]
+
+    for cooldown, budget in ((3600, 6), (4 * 3600, 3), (8 * 3600, 3)):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            scheduler = simulate(candles, cooldown_seconds=cooldown, max_cycles_per_day=budget)
+        elapsed = time.perf_counter() - started
+        outcomes = Counter("ran" if e["ran"] else e["skipped"] for e in scheduler.log)
+        days = (candles[-1]["ts"] - candles[0]["ts"]) / 86400
+        print(f"cooldown {cooldown // 3600}h budget {budget}/day: {len(scheduler.runs) / days:.2f} cycles/day "
+              f"(fixed slots: 3.00), outcomes {dict(outcomes)}, simulated {days:.0f} days in {elapsed:.2f}s")
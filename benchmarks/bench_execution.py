@@ -0,0 +1,63 @@
+# Executes a large buy and sell against the stand-in exchange with a thin orderbook: the old execute_buy/execute_sell
+# path (balance and orderbook fetched again before each order) against execution.Executor in each mode,
+# reporting round trips before the first order, slippage against the touch and fill latency.
+# Usage: python -m benchmarks.bench_execution
+import io
+import json
+import time
+from contextlib import redirect_stdout
+from execution import Executor, Snapshot, MODES, summarize_fills
+from fake_upbit import FakeUpbit, make_orderbook
+
+# One REST round trip to Upbit
+LATENCY = 0.03
+BALANCES = {"KRW": 100_000_000, "BTC": 1.0}
+PERCENTAGE = 30
+
+def exchange():
+    return FakeUpbit(dict(BALANCES), {"KRW-BTC": make_orderbook(size=0.02, levels=30)}, latency=LATENCY,
+                     limit_fill_seconds=0.3, replenish_seconds=0.5)
+
+def old_path(upbit, side):
+    # execute_buy/execute_sell before this change
+    if side == "buy":
+        krw_balance = upbit.get_balance("KRW")
+        result = upbit.buy_market_order("KRW-BTC", krw_balance * (PERCENTAGE / 100) * 0.9995)
+    else:
+        btc_balance = upbit.get_balance("BTC")
+        upbit.get_orderbook("KRW-BTC")['orderbook_units'][0]["ask_price"]
+        result = upbit.sell_market_order("KRW-BTC", btc_balance * (PERCENTAGE / 100))
+    return upbit.get_order(result["uuid"])
+
+def rounds_before_order(calls):
+    return next(i for i, name in enumerate(calls) if name.endswith("_order"))
+
+def report(label, side, upbit, orders, arrival, latency_ms):
+    volume, funds, _ = summarize_fills(orders)
+    average = funds / volume
+    slippage = (average - arrival) / arrival * 10000 * (1 if side == "buy" else -1)
+    print(f"{label:<8} {side:<4} {rounds_before_order(upbit.calls):>9} {len(orders):>6} {volume:10.5f} "
+          f"{slippage:+9.1f} {latency_ms:10.0f}")
+
+if __name__ == "__main__":
+    print(f"{'path':<8} {'side':<4} {'rounds':>9} {'orders':>6} {'BTC':>10} {'slip bps':>9} {'latency ms':>10}")
+    for side in ("buy", "sell"):
+        upbit = exchange()
+        orderbook = upbit.orderbooks["KRW-BTC"]
+        arrival = orderbook['orderbook_units'][0]["ask_price" if side == "buy" else "bid_price"]
+        started = time.monotonic()
+        order = old_path(upbit, side)
+        report("old", side, upbit, [order], arrival, (time.monotonic() - started) * 1000)
+        for mode in MODES:
+            upbit = exchange()
+            # The snapshot autotrade_v3 builds from get_current_statuses, a moment old
+            status = {"krw_balance": str(BALANCES["KRW"]), "btc_balance": str(BALANCES["BTC"]),
+                      "orderbook": upbit.get_orderbook("KRW-BTC")}
+            upbit.calls.clear()
+            executor = Executor(upbit, upbit.get_orderbook, mode=mode, limit_timeout=0.5, slice_interval=0.5,
+                                poll_interval=0.05, db_path=None)
+            snapshot = Snapshot.from_statuses({"KRW-BTC": json.dumps(status)})
+            with redirect_stdout(io.StringIO()):
+                record = getattr(executor, side)("KRW-BTC", PERCENTAGE, snapshot)
+            orders = [upbit.orders[uuid] for uuid in upbit.orders]
+            report(mode, side, upbit, orders, record["arrival_price"], record["latency_ms"])
@@ -0,0 +1,50 @@
+# Compares sequential and concurrent data gathering using stub sources with realistic delays.
+# Usage: python -m benchmarks.bench_gather
+import time
+from data_gather import gather_data, print_timings, REQUIRED
+
+# Rough latencies observed for each source in autotrade_v3.py
+STUB_DELAYS = {
+    "news": 1.2,
+    "market_data": 0.6,
+    "last_decisions": 0.01,
+    "fear_and_greed": 0.4,
+    "current_status": 0.3,
+    "chart_image": 3.0,
+}
+
+def stub_source(name, delay):
+    def fetch():
+        time.sleep(delay)
+        return f"{name} data"
+    return fetch
+
+def failing_source():
+    raise ConnectionError("upstream unavailable")
+
+def run_sequential():
+    started = time.perf_counter()
+    for name, delay in STUB_DELAYS.items():
+        stub_source(name, delay)()
+    return time.perf_counter() - started
+
+def run_concurrent(sources):
+    started = time.perf_counter()
+    results, timings = gather_data(sources)
+    return time.perf_counter() - started, results, timings
+
+if __name__ == "__main__":
+    sequential = run_sequential()
+    print(f"Sequential: {sequential:.3f}s")
+
+    sources = {name: (stub_source(name, delay), REQUIRED) for name, delay in STUB_DELAYS.items()}
+    concurrent, _, timings = run_concurrent(sources)
+    print(f"Concurrent: {concurrent:.3f}s (speedup {sequential / concurrent:.1f}x)")
+    print_timings(timings)
+
+    # One hung source and one failing source should fall back without delaying the rest
+    sources["chart_image"] = (stub_source("chart_image", 5), "", 1.0)
+    sources["news"] = (failing_source, "No news data available.")
+    degraded, results, timings = run_concurrent(sources)
+    print(f"Degraded:   {degraded:.3f}s (chart_image={results['chart_image']!r}, news={results['news']!r})")
+    print_timings(timings)
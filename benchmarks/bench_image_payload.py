@@ -0,0 +1,70 @@
+# Sends the chart image to the stand-in model for each image setting: the old payload (full-size PNG labelled
+# image/jpeg) against image_payload.prepare with each format and detail, reporting encoded and request bytes,
+# encode time, image tokens and LLM latency over a 20 Mbit/s uplink, plus the cost of a retry with the cycle cache.
+# The source is a 1920x1080 local render with the screenshot's margins, as no browser runs here.
+# Usage: python -m benchmarks.bench_image_payload
+import base64
+import io
+import time
+from openai import OpenAI
+from PIL import Image
+from chart_renderer import render_chart
+from fake_openai_server import FakeOpenAIServer, VALID_DECISION
+from image_payload import ImageCache, prepare, image_tokens
+from benchmarks.synthetic import make_ohlcv, add_chart_indicators
+
+UPLINK_BYTES_PER_SECOND = 20e6 / 8
+MODEL_DELAY = 0.5
+RUNS = 3
+SETTINGS = [("jpeg", 80, "high"), ("jpeg", 80, "low"), ("webp", 80, "high"), ("webp", 80, "low"),
+            ("png", None, "high"), ("jpeg", 60, "high")]
+
+def screenshot():
+    # The chart drawn in the middle of a page-coloured 1920x1080 frame
+    chart = Image.open(io.BytesIO(render_chart(add_chart_indicators(make_ohlcv(24)), width=1800, height=960)))
+    page = Image.new("RGB", (1920, 1080), (255, 255, 255))
+    page.paste(chart, (60, 60))
+    buffer = io.BytesIO()
+    page.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def latency(client, content):
+    # content is a message content part, or text
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        messages = [{"role": "user", "content": [content] if isinstance(content, dict) else content}]
+        client.chat.completions.create(model="gpt-4o", messages=messages, response_format={"type": "json_object"})
+    return (time.perf_counter() - started) / RUNS * 1000
+
+if __name__ == "__main__":
+    png = screenshot()
+    server = FakeOpenAIServer([{"content": VALID_DECISION, "delay": MODEL_DELAY}],
+                              upload_bytes_per_second=UPLINK_BYTES_PER_SECOND).start()
+    client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+    try:
+        latency(client, "warm-up")  # Open the connection first
+        print(f"{'setting':<18} {'size':>10} {'bytes':>8} {'request':>8} {'encode ms':>9} {'tokens':>6} {'LLM ms':>7}")
+        # Before: the screenshot as is, base64-encoded again for every request
+        started = time.perf_counter()
+        url = f"data:image/jpeg;base64,{base64.b64encode(png).decode('utf-8')}"
+        encode_ms = (time.perf_counter() - started) * 1000
+        before = {"type": "image_url", "image_url": {"url": url}}
+        print(f"{'old png as jpeg':<18} {'1920x1080':>10} {len(png):8d} {len(url):8d} {encode_ms:9.1f} "
+              f"{image_tokens(1920, 1080, 'high'):6d} {latency(client, before):7.0f}")
+        for image_format, quality, detail in SETTINGS:
+            image = prepare(png, image_format=image_format, quality=quality or 80, detail=detail)
+            label = f"{image_format}{quality or ''} {detail}"
+            print(f"{label:<18} {f'{image.width}x{image.height}':>10} {len(image):8d} "
+                  f"{len(image.content['image_url']['url']):8d} {image.encode_seconds * 1000:9.1f} {image.tokens:6d} "
+                  f"{latency(client, image.content):7.0f}")
+
+        cache = ImageCache()
+        started = time.perf_counter()
+        cache.prepare(png, image_format="jpeg", quality=80, detail="high")
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        cache.prepare(png, image_format="jpeg", quality=80, detail="high")
+        again = time.perf_counter() - started
+        print(f"Cycle cache: first prepare {first * 1000:.1f} ms, again (retry or another market) {again * 1000:.2f} ms")
+    finally:
+        server.stop()
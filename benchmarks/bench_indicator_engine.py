@@ -0,0 +1,36 @@
+# Compares updating the streaming indicator engine by one candle with recomputing add_indicators from scratch.
+# Usage: python -m benchmarks.bench_indicator_engine
+import json
+import time
+from indicator_engine import IndicatorEngine, COLUMNS
+from benchmarks.synthetic import make_ohlcv, reference_indicators
+
+RUNS = 200
+
+def per_call_ms(function, runs=RUNS):
+    started = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - started) / runs * 1000
+
+if __name__ == "__main__":
+    df = make_ohlcv(5000)
+
+    # Same numbers as the pandas code when fed the same candles
+    reference = reference_indicators(df)[COLUMNS]
+    streamed = IndicatorEngine().run(df)
+    error = ((streamed - reference).abs() / reference.abs().clip(lower=1e-9)).max().max()
+    print(f"max relative error vs reference: {error:.2e}")
+
+    engine = IndicatorEngine()
+    engine.run(df.iloc[:-1])
+    last = df.iloc[-1]
+    for window in (30, 200, 1000):
+        frame = df.iloc[-window:]
+        print(f"full recompute over {window:>4} candles: {per_call_ms(lambda: reference_indicators(frame), 20):8.3f} ms")
+    print(f"engine.update (one candle):         {per_call_ms(lambda: engine.update(0, last['high'], last['low'], last['close']), 10000):8.4f} ms")
+    print(f"engine.preview (forming candle):    {per_call_ms(lambda: engine.preview(0, last['high'], last['low'], last['close'])):8.4f} ms")
+
+    state = engine.to_state()
+    print(f"state size: {len(json.dumps(state)) / 1024:.1f} KB")
+    print(f"state save+load:                    {per_call_ms(lambda: IndicatorEngine.from_state(json.loads(json.dumps(engine.to_state())))):8.3f} ms")
@@ -0,0 +1,30 @@
+# Checks the NumPy indicator kernels against pandas_ta (or its pandas equivalent) and compares their speed.
+# Exits with status 1 on a mismatch; tests/test_indicators.py asserts the same.
+# Usage: python -m benchmarks.bench_indicators
+import sys
+import time
+import indicators
+from indicator_engine import COLUMNS
+from benchmarks.synthetic import make_ohlcv, reference_indicators
+
+TOLERANCE = 1e-6
+
+def per_call_ms(function, runs=50):
+    started = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - started) / runs * 1000
+
+if __name__ == "__main__":
+    mismatches = 0
+    for count in (24, 30, 1000, 50000):
+        df = make_ohlcv(count)
+        reference = reference_indicators(df)[COLUMNS]
+        result = indicators.add_indicators(df)[COLUMNS]
+        error = ((result - reference).abs() / reference.abs().clip(lower=1e-9)).max()
+        same_nans = (result.isna() == reference.isna()).all().all()
+        status = "ok" if error.max() < TOLERANCE and same_nans else "MISMATCH"
+        mismatches += status != "ok"
+        print(f"{count:>6} candles: max relative error {error.max():.1e} ({error.idxmax()}) {status}")
+        print(f"        reference {per_call_ms(lambda: reference_indicators(df)):8.2f} ms   numpy {per_call_ms(lambda: indicators.add_indicators(df)):8.2f} ms")
+    sys.exit(1 if mismatches else 0)
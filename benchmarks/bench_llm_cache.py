@@ -0,0 +1,44 @@
+# Runs a backtest through the prompt builder against a local fake model in record mode, then replays it from the cache.
+# Usage: python -m benchmarks.bench_llm_cache
+import tempfile
+import time
+from openai import OpenAI
+from backtest import model_call, prompt_decider, run_backtest
+from fake_openai_server import FakeOpenAIServer
+from llm_cache import LLMCache
+from benchmarks.synthetic import make_ohlcv
+
+def timed_run(df, cache, client, instructions):
+    started = time.perf_counter()
+    result = run_backtest(df, prompt_decider(model_call(cache, client, instructions)))
+    return time.perf_counter() - started, result
+
+if __name__ == "__main__":
+    df = make_ohlcv(60 * 24)
+    with open("instructions_v3.md", "r", encoding="utf-8") as file:
+        instructions = file.read()
+    server = FakeOpenAIServer([{"content": '{"decision": "hold", "percentage": 0, "reason": "Stand-in."}',
+                                "delay": 0.05}]).start()
+    try:
+        client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = LLMCache(directory, "record")
+            seconds, recorded = timed_run(df, cache, client, instructions)
+            print(f"record: {seconds:6.2f} s, {len(server.requests)} requests, {len(recorded['decisions'])} decisions")
+            cache.print_stats()
+
+            cache = LLMCache(directory, "replay")
+            requests_before = len(server.requests)
+            seconds, replayed = timed_run(df, cache, None, instructions)
+            same = replayed["decisions"] == recorded["decisions"]
+            print(f"replay: {seconds:6.2f} s, {len(server.requests) - requests_before} requests, "
+                  f"decisions {'identical' if same else 'DIFFERENT'}")
+            cache.print_stats()
+
+            # Eviction keeps the directory under its size limit, dropping the least recently used responses
+            cache = LLMCache(directory, "record", max_bytes=20_000)
+            cache.put("0" * 64, {"content": "x"})
+            print(f"after shrinking to 20 KB: {sum(cache._index().values()):,} bytes in {len(cache._index())} responses, "
+                  f"{cache.stats['evictions']} evicted")
+    finally:
+        server.stop()
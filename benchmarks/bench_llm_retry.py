@@ -0,0 +1,66 @@
+# Compares the old fixed-sleep retry loop with validated retries and repair requests against a local fake OpenAI server.
+# Sleeps are counted rather than waited, so the reported latency is request time plus the backoff that would be slept.
+# Usage: python -m benchmarks.bench_llm_retry
+import io
+import json
+import time
+from contextlib import redirect_stdout
+from openai import OpenAI
+from fake_openai_server import FakeOpenAIServer, VALID_DECISION
+from llm_response import repair_messages, request_decision, validate_decision
+from prompt_payload import build_payload, prompt_messages
+from benchmarks.synthetic import make_prompt_inputs
+
+SCENARIOS = {
+    "valid": [{"content": VALID_DECISION}],
+    "server error": [{"status": 500}, {"content": VALID_DECISION}],
+    "rate limited x2": [{"status": 429}, {"status": 429}, {"content": VALID_DECISION}],
+    "invalid json": [{"content": '{"decision": "hold", "percentage": 0, "reason": "cut off'}, {"content": VALID_DECISION}],
+    "bad schema": [{"content": '{"decision": "wait", "percentage": "n/a", "reason": ""}'}, {"content": VALID_DECISION}],
+}
+
+def full_messages():
+    sections, _ = build_payload(*make_prompt_inputs())
+    with open("instructions_v3.md", "r", encoding="utf-8") as file:
+        instructions = file.read()
+    return prompt_messages(instructions, sections)
+
+def complete(client, messages):
+    response = client.chat.completions.create(model="gpt-4o", messages=messages, response_format={"type": "json_object"})
+    return response.choices[0].message.content
+
+def old_loop(client, messages, slept):
+    # Before: any failure (including a parse error) resent the whole prompt after a fixed 5 second sleep
+    for _ in range(5):
+        try:
+            return json.loads(complete(client, messages))
+        except Exception:
+            slept.append(5)
+    return None
+
+def new_loop(client, messages, slept):
+    repair = lambda content, error: complete(client, repair_messages(content, error))
+    decision = request_decision(lambda: complete(client, messages), repair, sleep=slept.append)
+    return decision and validate_decision(decision)
+
+def run(loop, script, messages):
+    server = FakeOpenAIServer(script).start()
+    try:
+        client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+        slept = []
+        started = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            decision = loop(client, messages, slept)
+        elapsed = time.perf_counter() - started + sum(slept)
+        valid = decision is not None and decision.get("decision") in ("buy", "sell", "hold")
+        return elapsed, len(server.requests), server.total_prompt_tokens(), valid
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    messages = full_messages()
+    print(f"{'scenario':<16} {'loop':<4} {'latency s':>10} {'requests':>9} {'tokens sent':>12} {'valid':>6}")
+    for name, script in SCENARIOS.items():
+        for label, loop in (("old", old_loop), ("new", new_loop)):
+            elapsed, requests, tokens, valid = run(loop, script, messages)
+            print(f"{name:<16} {label:<4} {elapsed:10.2f} {requests:9d} {tokens:12d} {str(valid):>6}")
@@ -0,0 +1,59 @@
+# Replays market data through MarketFeed offline and measures throughput and snapshot read latency.
+# Usage: python -m benchmarks.bench_market_feed [recording.jsonl]
+#   Record a real sample first with: python market_feed.py recording.jsonl 60
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from market_feed import MarketFeed, ReplaySource
+
+def write_synthetic_recording(path, count=30000, code="KRW-BTC", seed=7):
+    rng = random.Random(seed)
+    price = 90_000_000
+    timestamp = 1_700_000_000_000
+    with open(path, "w", encoding="utf-8") as file:
+        for _ in range(count):
+            timestamp += rng.randint(10, 400)
+            price = max(1000, price + rng.randint(-20, 20) * 1000)
+            stream_type = rng.choice(("ticker", "orderbook", "trade", "trade"))
+            if stream_type == "ticker":
+                message = {"type": "ticker", "code": code, "trade_price": price, "timestamp": timestamp}
+            elif stream_type == "trade":
+                message = {"type": "trade", "code": code, "trade_price": price, "trade_volume": rng.random() / 10,
+                           "trade_timestamp": timestamp, "timestamp": timestamp}
+            else:
+                units = [{"ask_price": price + 1000 * (i + 1), "bid_price": price - 1000 * i,
+                          "ask_size": rng.random(), "bid_size": rng.random()} for i in range(15)]
+                message = {"type": "orderbook", "code": code, "timestamp": timestamp, "total_ask_size": 10.0,
+                           "total_bid_size": 10.0, "orderbook_units": units}
+            file.write(json.dumps(message) + "\n")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "feed.jsonl")
+        write_synthetic_recording(path)
+
+    sources = []
+    def replay(stream_type, codes):
+        source = ReplaySource(path, stream_type)
+        sources.append(source)
+        return source
+
+    started = time.perf_counter()
+    feed = MarketFeed(["KRW-BTC"], source_factory=replay).start()
+    for source in sources:
+        source.finished.wait()
+    elapsed = time.perf_counter() - started
+    print(f"replayed {feed.message_count} messages in {elapsed:.3f}s ({feed.message_count / elapsed:,.0f} msg/s)")
+    print(f"candles built from trades: {len(feed.get_candles('KRW-BTC'))}")
+
+    reads = 100000
+    started = time.perf_counter()
+    for _ in range(reads):
+        feed.get_orderbook("KRW-BTC", max_age=None)
+    print(f"orderbook snapshot read: {(time.perf_counter() - started) / reads * 1e6:.2f} us (vs one REST round trip per read)")
+    feed.stop()
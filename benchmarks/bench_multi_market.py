@@ -0,0 +1,81 @@
+# Runs autotrade_v3 decision cycles for several markets against stub data sources and a local fake model,
+# comparing one cycle per market (the old single-market pipeline run N times) with one cycle for all markets.
+# Usage: OPENAI_API_KEY=test python -m benchmarks.bench_multi_market
+import io
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+from openai import OpenAI
+import autotrade_v3
+import market_feed
+from fake_openai_server import FakeOpenAIServer, VALID_DECISION
+from fake_upbit import FakeUpbit
+from benchmarks.synthetic import make_prompt_inputs
+
+MARKETS = ["KRW-BTC", "KRW-ETH", "KRW-XRP", "KRW-SOL"]
+# Rough latencies of each upstream call, as in bench_gather
+STUB_DELAYS = {"news": 1.2, "fear_and_greed": 0.4, "market_data": 0.6, "orderbook": 0.1, "exchange": 0.1}
+MODEL_DELAY = 1.0
+
+def install_stubs(calls, base_url):
+    news, df_daily, df_hourly, _, fear_and_greed, status = make_prompt_inputs()
+
+    def delayed(name, result):
+        def fetch(*args, **kwargs):
+            calls.append(name)
+            time.sleep(STUB_DELAYS[name])
+            return result
+        return fetch
+
+    def get_orderbook(ticker):
+        calls.append("get_orderbook")
+        time.sleep(STUB_DELAYS["orderbook"])
+        orderbook = lambda market: {**status["orderbook"], "market": market}
+        return [orderbook(t) for t in ticker] if isinstance(ticker, list) else orderbook(ticker)
+
+    autotrade_v3.fetch_news_items = delayed("news", news)
+    autotrade_v3.get_fear_and_greed = delayed("fear_and_greed", fear_and_greed)
+    # Raw candles; the indicators are computed for every market in one pass by the pipeline itself
+    columns = ['open', 'high', 'low', 'close', 'volume', 'value']
+    autotrade_v3.fetch_candles = delayed("market_data", (df_daily[columns], df_hourly[columns]))
+    autotrade_v3.render_chart_image = lambda df, market: None
+    autotrade_v3.CHART_RENDERER = "local"
+    # Balances and orders go to the stand-in exchange, which counts its own calls
+    exchange = FakeUpbit({"KRW": 1_000_000}, latency=STUB_DELAYS["exchange"])
+    autotrade_v3.upbit = exchange
+    autotrade_v3.executor.exchange = exchange
+    autotrade_v3.client = OpenAI(base_url=base_url, api_key="test", max_retries=0)
+    market_feed.pyupbit.get_orderbook = get_orderbook
+    return exchange
+
+def run(cycles, calls, exchange, server):
+    calls.clear()
+    exchange.calls.clear()
+    requests_before = len(server.requests)
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for markets in cycles:
+            autotrade_v3.make_decision_and_execute(markets)
+    return time.perf_counter() - started, len(calls) + len(exchange.calls), len(server.requests) - requests_before
+
+if __name__ == "__main__":
+    server = FakeOpenAIServer([{"content": VALID_DECISION, "delay": MODEL_DELAY}]).start()
+    directory = tempfile.mkdtemp()
+    shutil.copy("instructions_v3.md", directory)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        calls = []
+        exchange = install_stubs(calls, server.base_url)
+        print(f"{'markets':>7} {'mode':<10} {'seconds':>8} {'upstream calls':>15} {'model calls':>12}")
+        for count in (1, 2, 4):
+            markets = MARKETS[:count]
+            for mode, cycles in (("per-market", [[m] for m in markets]), ("batched", [markets])):
+                seconds, upstream, model = run(cycles, calls, exchange, server)
+                print(f"{count:7d} {mode:<10} {seconds:8.2f} {upstream:15d} {model:12d}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+        server.stop()
@@ -0,0 +1,27 @@
+# Time to build the performance summary for a long decision history, and to extend it with a few new decisions.
+# Usage: python -m benchmarks.bench_performance
+import os
+import tempfile
+import time
+import decision_store
+import performance
+from benchmarks.bench_decision_store import make_rows
+
+if __name__ == "__main__":
+    print(f"{'decisions':>10} {'full build s':>13} {'update 3 ms':>12} {'totals ms':>10}")
+    for count in (10_000, 100_000, 1_000_000):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "decisions.sqlite")
+            decision_store.save_decisions(make_rows(count), path)
+            started = time.perf_counter()
+            performance.update(path)
+            build = time.perf_counter() - started
+            decision_store.save_decisions(make_rows(3, start_ms=1_600_000_000_000 + count * 60_000), path)
+            started = time.perf_counter()
+            performance.update(path)
+            update_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            performance.totals(path)
+            totals_ms = (time.perf_counter() - started) * 1000
+            decision_store.close(path)
+        print(f"{count:>10,} {build:13.2f} {update_ms:12.2f} {totals_ms:10.1f}")
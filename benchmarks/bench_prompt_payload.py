@@ -0,0 +1,35 @@
+# Compares prompt token counts of the original section encodings with the compact payload builder.
+# Usage: python -m benchmarks.bench_prompt_payload
+import json
+import time
+import pandas as pd
+from prompt_payload import SECTIONS, build_payload, count_tokens
+from benchmarks.synthetic import make_prompt_inputs
+
+def original_sections(news, df_daily, df_hourly, last_decisions, fear_and_greed, current_status):
+    """The encodings autotrade_v3.py used before the payload builder."""
+    combined_df = pd.concat([df_daily, df_hourly], keys=['daily', 'hourly'])
+    return {
+        "news": str(news),
+        "market_data": json.dumps(combined_df.to_json(orient='split')),
+        "last_decisions": "\n".join(str(decision) for decision in last_decisions),
+        "fear_and_greed": "".join(str(data) for data in fear_and_greed),
+        "current_status": json.dumps(current_status),
+    }
+
+if __name__ == "__main__":
+    inputs = make_prompt_inputs()
+    before = {name: count_tokens(text) for name, text in original_sections(*inputs).items()}
+    started = time.perf_counter()
+    _, after = build_payload(*inputs)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{'section':<16} {'before':>8} {'after':>8}")
+    for name in SECTIONS:
+        print(f"{name:<16} {before[name]:8d} {after[name]:8d}")
+    print(f"{'total':<16} {sum(before.values()):8d} {sum(after.values()):8d}  "
+          f"({1 - sum(after.values()) / sum(before.values()):.0%} fewer tokens, built in {build_ms:.1f} ms)")
+
+    for budget in (4000, 2500, 1500):
+        _, trimmed = build_payload(*inputs, token_budget=budget)
+        print(f"budget {budget}: " + ", ".join(f"{name} {trimmed[name]}" for name in SECTIONS) + f" = {sum(trimmed.values())}")
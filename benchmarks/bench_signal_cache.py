@@ -0,0 +1,81 @@
+# Simulates a week of decision cycles at several cadences with stub news and Fear and Greed APIs on a virtual clock,
+# comparing upstream calls and the fetch latency a cycle waits for with and without the signal cache.
+# Usage: OPENAI_API_KEY=test python -m benchmarks.bench_signal_cache
+import io
+import tempfile
+import threading
+from contextlib import redirect_stdout
+import autotrade_v3
+from signal_cache import SignalCache
+
+START = 1_717_200_000 - 1_717_200_000 % 86400 + 3600
+DAYS = 7
+CADENCES = {"3 a day": 8 * 3600, "hourly": 3600, "15 min": 900}
+# Rough latencies of the real APIs, in seconds
+NEWS_DELAY = 1.2
+FEAR_AND_GREED_DELAY = 0.4
+
+class VirtualClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class Upstream:
+    """Stub APIs that count calls, entries returned and the latency charged to the decision thread."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = {"news": 0, "fear_and_greed": 0}
+        self.entries = 0
+        self.waited = 0.0
+
+    def _charge(self, delay):
+        # Background refreshes don't hold up the decision cycle
+        if threading.current_thread() is threading.main_thread():
+            self.waited += delay
+
+    def news(self, previous=None):
+        self.calls["news"] += 1
+        self._charge(NEWS_DELAY)
+        return [(f"Headline {i}", "Stub", int(self.clock() * 1000) - i * 60_000) for i in range(20)]
+
+    def fear_and_greed(self, limit=1, date_format=''):
+        self.calls["fear_and_greed"] += 1
+        self._charge(FEAR_AND_GREED_DELAY)
+        today = int(self.clock()) // 86400 * 86400
+        self.entries += limit
+        return [{"value": str(50 + i % 7), "value_classification": "Neutral", "timestamp": str(today - i * 86400),
+                 **({"time_until_update": str(today + 86400 - int(self.clock()))} if i == 0 else {})}
+                for i in range(limit)]
+
+def simulate(cached, cycle_seconds):
+    clock = VirtualClock(START)
+    upstream = Upstream(clock)
+    autotrade_v3.request_news_items = upstream.news
+    autotrade_v3.fetch_fear_and_greed_data = upstream.fear_and_greed
+    with tempfile.TemporaryDirectory() as directory:
+        autotrade_v3.signal_cache = SignalCache(directory, clock=clock)
+        with redirect_stdout(io.StringIO()):
+            for _ in range(DAYS * 86400 // cycle_seconds):
+                if cached:
+                    autotrade_v3.fetch_news_items()
+                    autotrade_v3.get_fear_and_greed()
+                    autotrade_v3.signal_cache.wait_for_refreshes()
+                else:
+                    upstream.news()
+                    upstream.fear_and_greed(limit=autotrade_v3.FEAR_AND_GREED_DAYS)
+                clock.now += cycle_seconds
+        return upstream, autotrade_v3.signal_cache
+
+if __name__ == "__main__":
+    print(f"{DAYS} days of cycles")
+    print(f"{'cadence':<8} {'mode':<9} {'news calls':>10} {'F&G calls':>10} {'F&G entries':>12} {'fetch wait s/cycle':>19}")
+    for cadence, cycle_seconds in CADENCES.items():
+        cycles = DAYS * 86400 // cycle_seconds
+        for cached in (False, True):
+            upstream, cache = simulate(cached, cycle_seconds)
+            print(f"{cadence:<8} {'cached' if cached else 'uncached':<9} {upstream.calls['news']:10d} "
+                  f"{upstream.calls['fear_and_greed']:10d} {upstream.entries:12d} {upstream.waited / cycles:19.3f}")
+        cache.print_stats()
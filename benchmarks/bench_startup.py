@@ -0,0 +1,45 @@
+# Measures cold import time and peak RSS of the indicator stack in fresh interpreters.
+# Usage: python -m benchmarks.bench_startup
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+
+CASES = {
+    "before: pandas + pandas_ta": "import pandas, pandas_ta",
+    "pandas alone": "import pandas",
+    "after: indicators (numpy only)": "import indicators",
+    "pyupbit (always imports pandas)": "import pyupbit",
+    "autotrade.py": "import autotrade",
+    "autotrade_v3.py": "import autotrade_v3",
+}
+
+PROBE = """
+import resource, time
+started = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - started
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def measure(imports):
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark"))
+    samples = []
+    for _ in range(RUNS):
+        result = subprocess.run([sys.executable, "-c", PROBE.format(imports=imports)],
+                                capture_output=True, text=True, env=env)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        elapsed, rss_kb = result.stdout.split()[-2:]
+        samples.append((float(elapsed), int(rss_kb)))
+    return (statistics.median(s[0] for s in samples), max(s[1] for s in samples)), None
+
+if __name__ == "__main__":
+    for name, imports in CASES.items():
+        result, error = measure(imports)
+        if error:
+            print(f"{name:<34} skipped ({error})")
+        else:
+            print(f"{name:<34} {result[0] * 1000:8.1f} ms  {result[1] / 1024:7.1f} MB peak RSS")
@@ -0,0 +1,16 @@
+# Reports how sweep throughput scales with worker processes, and what each task would cost to send without shared memory.
+# Usage: python -m benchmarks.bench_sweep [configurations]
+import os
+import pickle
+import sys
+from sweep import make_configs, measure_scaling, print_scaling
+from benchmarks.synthetic import make_ohlcv
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    df = make_ohlcv(2 * 365 * 24)
+    configs = make_configs()[:count]
+    print(f"{len(df)} hourly candles, {len(configs)} configurations, {os.cpu_count()} CPUs")
+    print(f"per task: {len(pickle.dumps(configs[:4])):,} bytes of configurations "
+          f"instead of {len(pickle.dumps(df)):,} bytes of candles")
+    print_scaling(measure_scaling(df, configs))
@@ -0,0 +1,52 @@
+# Measures the cost of a span with and without the trace file, then traces one stubbed two-market cycle
+# (as in bench_multi_market) and prints its stage timings, the Prometheus output and the dashboard summary.
+# Usage: OPENAI_API_KEY=test python -m benchmarks.bench_tracing
+import io
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+import autotrade_v3
+import tracing
+from fake_openai_server import FakeOpenAIServer, VALID_DECISION
+from benchmarks.bench_multi_market import install_stubs, MODEL_DELAY
+
+SPANS = 20_000
+
+def span_cost(count):
+    started = time.perf_counter()
+    for i in range(count):
+        with tracing.span("bench", i=i) as attributes:
+            attributes["bytes"] = 100
+    return (time.perf_counter() - started) / count * 1e6
+
+if __name__ == "__main__":
+    server = FakeOpenAIServer([{"content": VALID_DECISION, "delay": MODEL_DELAY}]).start()
+    directory = tempfile.mkdtemp()
+    shutil.copy("instructions_v3.md", directory)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        tracing.configure(None)
+        print(f"span, in memory:   {span_cost(SPANS):6.1f} us")
+        tracing.configure("traces.jsonl")
+        print(f"span, to file:     {span_cost(SPANS):6.1f} us")
+        os.remove("traces.jsonl")
+
+        install_stubs([], server.base_url)
+        with redirect_stdout(io.StringIO()):
+            autotrade_v3.make_decision_and_execute(["KRW-BTC", "KRW-ETH"])
+        print("Stage timings of one cycle:")
+        tracing.print_spans(tracing.current_spans())
+        print("Prometheus output (excerpt):")
+        print("\n".join(line for line in tracing.prometheus_text().splitlines()
+                        if "_count" in line or "over_budget_total{" in line))
+        print("Dashboard summary:")
+        for row in tracing.summarize(tracing.read_spans("traces.jsonl")):
+            print(f"  {row['stage']:<16} n={row['count']:<3} p50 {row['p50']:.3f}s  p95 {row['p95']:.3f}s  "
+                  f"budget {row['budget']}s  over {row['over_budget']}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+        server.stop()
@@ -0,0 +1,150 @@
+# Recorded HTTP responses of SerpAPI, alternative.me and the Upbit quotation API, replayed by benchmarks.suite
+# through http_client so the pipeline runs its real parsing code offline.
+# The shipped files are generated from benchmarks.synthetic; `record` replaces them with live responses.
+# Usage: python -m benchmarks.fixtures [--record]   (--record needs network access and SERPAPI_API_KEY)
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+import requests
+from ohlcv_store import KST
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Fixture file of each replayed endpoint, by host and path
+ROUTES = {
+    ("serpapi.com", "/search.json"): "serpapi_news.json",
+    ("api.alternative.me", "/fng/"): "fear_and_greed.json",
+    ("api.upbit.com", "/v1/candles/days"): "candles_day.json",
+    ("api.upbit.com", "/v1/candles/minutes/60"): "candles_minute60.json",
+    ("api.upbit.com", "/v1/orderbook"): "orderbook.json",
+}
+CANDLE_INTERVALS = {"/v1/candles/days": timedelta(days=1), "/v1/candles/minutes/60": timedelta(hours=1)}
+# Upbit daily candles open at 09:00 KST
+DAY_OFFSET = timedelta(hours=9)
+
+# The model's answer replayed by the stand-in OpenAI server; a buy, so the order path runs too
+COMPLETION = json.dumps({"decision": "buy", "percentage": 10,
+                         "reason": "RSI recovering from oversold with price above the lower Bollinger Band."})
+
+def load(name, directory=FIXTURE_DIR):
+    with open(os.path.join(directory, name), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def _write(name, data, directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=1)
+
+def _current_candle(interval, now):
+    # Start of the candle forming at `now`, as naive KST like pyupbit's index
+    if interval == timedelta(days=1):
+        return datetime.combine((now - DAY_OFFSET).date(), datetime.min.time()) + DAY_OFFSET
+    return now.replace(minute=0, second=0, microsecond=0)
+
+def rebase_candles(candles, interval, now=None):
+    """
+    Recorded candles (newest first, as Upbit returns them) moved so the newest one is the candle forming now.
+    ohlcv_store only downloads candles newer than the stored ones, so replayed cycles see the one or two new
+    candles a live hourly cycle would, rather than a gap of however long ago the fixture was recorded.
+    """
+    # Naive KST, the clock ohlcv_store measures the missing candles against
+    newest = _current_candle(interval, now or datetime.now(KST).replace(tzinfo=None))
+    rebased = []
+    for i, candle in enumerate(candles):
+        kst = newest - interval * i
+        rebased.append({**candle, "candle_date_time_kst": kst.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "candle_date_time_utc": (kst - DAY_OFFSET).strftime("%Y-%m-%dT%H:%M:%S")})
+    return rebased
+
+def _response(url, data, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response._content = json.dumps(data).encode("utf-8")
+    response.headers["Content-Type"] = "application/json"
+    # pyupbit parses this header on every public call
+    response.headers["Remaining-Req"] = "group=default; min=1800; sec=29"
+    return response
+
+class ReplaySession:
+    """
+    Stands in for http_client's requests.Session, answering from the fixture files by host and path.
+    A request without a fixture raises, so a new upstream call doesn't silently go to the network.
+    Parameters:
+    - directory (str): Fixture directory. Default is benchmarks/fixtures.
+    """
+
+    def __init__(self, directory=FIXTURE_DIR):
+        self.fixtures = {route: load(name, directory) for route, name in ROUTES.items()}
+        self.calls = []
+
+    def request(self, method, url, params=None, **kwargs):
+        parts = urlsplit(url)
+        route = (parts.hostname, parts.path)
+        if route not in self.fixtures:
+            raise ValueError(f"No fixture for {method} {url}")
+        self.calls.append(route)
+        params = params or {}
+        data = self.fixtures[route]
+        if parts.path in CANDLE_INTERVALS:
+            data = rebase_candles(data, CANDLE_INTERVALS[parts.path])[:int(params.get("count", 200))]
+        elif parts.path == "/v1/orderbook":
+            markets = params.get("markets", "KRW-BTC")
+            markets = [markets] if isinstance(markets, str) else markets
+            now_ms = int(datetime.now().timestamp() * 1000)
+            data = [{**data, "market": market, "timestamp": now_ms} for market in markets]
+        elif parts.path == "/fng/":
+            data = {**data, "data": data["data"][:int(params.get("limit") or 1)]}
+        return _response(url, data)
+
+def write_synthetic(directory=FIXTURE_DIR):
+    """Writes fixtures in the upstream response formats from the deterministic data in benchmarks.synthetic."""
+    from benchmarks.synthetic import make_ohlcv, make_prompt_inputs
+    news, _, _, _, fear_and_greed, status = make_prompt_inputs()
+    results = []
+    for i, (title, source, timestamp) in enumerate(news):
+        date = datetime.fromtimestamp(timestamp / 1000, timezone.utc).strftime("%m/%d/%Y, %I:%M %p, +0000 UTC")
+        item = {"position": i + 1, "title": title, "source": {"name": source}, "date": date,
+                "link": f"https://example.com/news/{i}"}
+        if i % 8 == 7:
+            # Some results are story clusters without a date of their own
+            item = {"position": i + 1, "title": title, "stories": [{**item, "position": 1}]}
+        results.append(item)
+    _write("serpapi_news.json", {"search_metadata": {"status": "Success"}, "news_results": results}, directory)
+    _write("fear_and_greed.json", {"name": "Fear and Greed Index", "data": fear_and_greed,
+                                   "metadata": {"error": None}}, directory)
+    for name, frame in (("candles_day.json", make_ohlcv(200, freq="D", seed=3)),
+                        ("candles_minute60.json", make_ohlcv(200, freq="h", seed=4))):
+        candles = [{"market": "KRW-BTC", "opening_price": row.open, "high_price": row.high, "low_price": row.low,
+                    "trade_price": row.close, "timestamp": int(index.timestamp() * 1000),
+                    "candle_acc_trade_price": round(row.value, 2), "candle_acc_trade_volume": round(row.volume, 8)}
+                   for index, row in frame.iloc[::-1].iterrows()]
+        _write(name, candles, directory)
+    _write("orderbook.json", status["orderbook"], directory)
+    _write("completion.json", {"content": COMPLETION}, directory)
+
+def record(directory=FIXTURE_DIR):
+    """Replaces the fixtures with live responses from each upstream API. completion.json is kept."""
+    import http_client
+    urls = {
+        "serpapi_news.json": ("https://serpapi.com/search.json",
+                              {"engine": "google_news", "q": "btc", "api_key": os.environ["SERPAPI_API_KEY"]}),
+        "fear_and_greed.json": ("https://api.alternative.me/fng/", {"limit": 30, "format": "json"}),
+        "candles_day.json": ("https://api.upbit.com/v1/candles/days", {"market": "KRW-BTC", "count": 200}),
+        "candles_minute60.json": ("https://api.upbit.com/v1/candles/minutes/60", {"market": "KRW-BTC", "count": 200}),
+        "orderbook.json": ("https://api.upbit.com/v1/orderbook", {"markets": "KRW-BTC"}),
+    }
+    for name, (url, params) in urls.items():
+        response = http_client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        if name == "orderbook.json":
+            data = data[0]
+        elif name == "serpapi_news.json":
+            data = {"search_metadata": {"status": "Success"}, "news_results": data["news_results"]}
+        _write(name, data, directory)
+        print(f"Recorded {name}")
+
+if __name__ == "__main__":
+    record() if "--record" in sys.argv else write_synthetic()
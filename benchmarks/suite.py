@@ -0,0 +1,241 @@
+# Offline benchmark suite for the autotrade_v3 pipeline, replaying the recorded upstream responses in
+# benchmarks/fixtures (SerpAPI, alternative.me, Upbit quotations) with FakeUpbit for balances and orders and
+# FakeOpenAIServer for the model. Each case runs in its own process and reports p50/p99 latency, the peak of
+# Python allocations during one run (tracemalloc) and the process's peak RSS, compared against benchmarks/baseline.json.
+# Exits with status 1 when a case regressed past the thresholds.
+# Usage: python -m benchmarks.suite [--save-baseline] [--repeat N] [--cases e2e,db_write] [--threshold 0.25]
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+# Settings every case runs with: no selenium browser, no websocket feed, nothing cached from a previous run
+ENVIRONMENT = {"OPENAI_API_KEY": "test", "SERPAPI_API_KEY": "fixture", "CHART_RENDERER": "local",
+               "MARKET_FEED": "rest", "LLM_CACHE_MODE": "passthrough", "METRICS_FILE": "", "STAGE_BUDGETS": ""}
+# A metric regressed when it is over the baseline by both the relative threshold and the absolute minimum,
+# so sub-millisecond jitter on fast cases isn't reported. Latency varies by 20-30% between runs on a shared
+# machine, so its thresholds are wide; allocations and RSS are close to deterministic and catch most regressions.
+THRESHOLDS = {"p50_ms": 0.4, "p99_ms": 0.75, "alloc_peak_kb": 0.1, "peak_rss_mb": 0.1}
+MIN_DELTAS = {"p50_ms": 0.5, "p99_ms": 2.0, "alloc_peak_kb": 64, "peak_rss_mb": 5}
+SEEDED_DECISIONS = 10_000
+
+CASES = {}
+
+def case(repeat):
+    """Registers a case. The decorated function sets the case up and returns the callable that is timed."""
+    def register(setup):
+        CASES[setup.__name__] = (setup, repeat)
+        return setup
+    return register
+
+def install_replay():
+    import http_client
+    from benchmarks.fixtures import ReplaySession
+    session = ReplaySession()
+    http_client._session = session
+    return session
+
+def seed_decisions(count):
+    import decision_store
+    rows = [decision_store.decision_row({"decision": ("buy", "sell", "hold")[i % 3], "percentage": 10 * (i % 5),
+                                         "reason": "Seeded decision for the benchmark suite. " * 4},
+                                        {"btc_balance": 0.01 + i / 1e6, "krw_balance": 1_000_000 - i,
+                                         "btc_avg_buy_price": 90_000_000}, 92_000_000 + i, timestamp=1_700_000_000_000 + i * 60_000)
+            for i in range(count)]
+    decision_store.save_decisions(rows)
+
+def market_data_inputs():
+    import autotrade_v3
+    return autotrade_v3.fetch_market_data("KRW-BTC")
+
+@case(repeat=30)
+def market_data():
+    # fetch_and_prepare_data: candles through ohlcv_store, indicators, then the JSON section
+    import autotrade_v3
+    install_replay()
+    return autotrade_v3.fetch_and_prepare_data
+
+@case(repeat=100)
+def indicators():
+    # Steady state: the saved indicator state covers every closed candle, so only the forming one is previewed
+    import indicator_engine
+    install_replay()
+    df_daily, df_hourly = market_data_inputs()
+    columns = ['open', 'high', 'low', 'close', 'volume', 'value']
+    df_daily, df_hourly = df_daily[columns], df_hourly[columns]
+    return lambda: (indicator_engine.add_indicators(df_daily, "KRW-BTC", "day"),
+                    indicator_engine.add_indicators(df_hourly, "KRW-BTC", "minute60"))
+
+@case(repeat=100)
+def payload():
+    import autotrade_v3
+    import decision_store
+    from benchmarks.fixtures import load
+    from prompt_payload import build_payload
+    install_replay()
+    df_daily, df_hourly = market_data_inputs()
+    news = autotrade_v3.request_news_items()
+    fear_and_greed = load("fear_and_greed.json")["data"]
+    status = {"current_time": 0, "orderbook": load("orderbook.json"), "btc_balance": "0.01234567",
+              "krw_balance": "1234567.89", "btc_avg_buy_price": "91234567"}
+    seed_decisions(10)
+    last_decisions = decision_store.load_last_decisions(10)
+    return lambda: build_payload(news, df_daily, df_hourly, last_decisions, fear_and_greed, status,
+                                 autotrade_v3.PROMPT_TOKEN_BUDGET)
+
+@case(repeat=200)
+def last_decisions():
+    # fetch_last_decisions over a database with a long history
+    import autotrade_v3
+    seed_decisions(SEEDED_DECISIONS)
+    return autotrade_v3.fetch_last_decisions
+
+@case(repeat=100)
+def db_write():
+    # One cycle's decision: priced from the orderbook, saved in one transaction, performance summary extended
+    import autotrade_v3
+    from fake_upbit import FakeUpbit
+    install_replay()
+    seed_decisions(SEEDED_DECISIONS)
+    autotrade_v3.upbit = FakeUpbit({"KRW": 1_000_000, "BTC": 0.01})
+    statuses = autotrade_v3.get_current_statuses(["KRW-BTC"])
+    decision = {"decision": "hold", "percentage": 0, "reason": "Benchmark decision."}
+    return lambda: autotrade_v3.save_decisions_to_db({"KRW-BTC": decision}, statuses)
+
+@case(repeat=20)
+def e2e():
+    # make_decision_and_execute for one market: every stage from the data sources to the saved decision
+    import atexit
+    from openai import OpenAI
+    import autotrade_v3
+    from benchmarks.fixtures import load
+    from fake_openai_server import FakeOpenAIServer
+    from fake_upbit import FakeUpbit
+    install_replay()
+    server = FakeOpenAIServer([{"content": load("completion.json")["content"]}]).start()
+    atexit.register(server.stop)
+    autotrade_v3.client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+    exchange = FakeUpbit({"KRW": 10_000_000})
+    autotrade_v3.upbit = exchange
+    autotrade_v3.executor.exchange = exchange
+    autotrade_v3.initialize_db()
+    return lambda: autotrade_v3.make_decision_and_execute(["KRW-BTC"])
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run_case(name, repeat):
+    """Runs one case in this process, in a scratch directory, and returns its metrics."""
+    setup, default_repeat = CASES[name]
+    repeat = repeat or default_repeat
+    directory = tempfile.mkdtemp(prefix="bench-suite-")
+    shutil.copy(os.path.join(ROOT, "instructions_v3.md"), directory)
+    os.chdir(directory)
+    try:
+        with redirect_stdout(io.StringIO()):
+            step = setup()
+            step()  # Warm-up: imports, first connections, cold caches
+            durations = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                step()
+                durations.append(time.perf_counter() - started)
+            tracemalloc.start()
+            step()
+            _, alloc_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(directory, ignore_errors=True)
+    return {"repeat": repeat, "p50_ms": percentile(durations, 0.5) * 1000, "p99_ms": percentile(durations, 0.99) * 1000,
+            "alloc_peak_kb": alloc_peak / 1024,
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)}
+
+def measure(name, repeat=None):
+    # A fresh interpreter per case, so peak RSS and warm caches are the case's own
+    command = [sys.executable, "-m", "benchmarks.suite", "--run-case", name] + (["--repeat", str(repeat)] if repeat else [])
+    result = subprocess.run(command, cwd=ROOT, env={**os.environ, **ENVIRONMENT}, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Case {name} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def machine():
+    return f"{platform.machine()} {platform.processor() or platform.system()}, {os.cpu_count()} CPUs, Python {platform.python_version()}"
+
+def compare(results, baseline, threshold=None):
+    """Regressions as (case, metric, value, baseline value) against the baseline cases."""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        for metric, limit in THRESHOLDS.items():
+            limit = threshold if threshold is not None else limit
+            value, reference = metrics[metric], base[metric]
+            if value > reference * (1 + limit) and value - reference > MIN_DELTAS[metric]:
+                regressions.append((name, metric, value, reference))
+    return regressions
+
+def print_results(results, baseline):
+    base_cases = baseline.get("cases", {})
+    print(f"{'case':<15} {'runs':>5} {'p50 ms':>9} {'p99 ms':>9} {'alloc KB':>10} {'RSS MB':>8}   vs baseline (p50/p99/alloc/RSS)")
+    for name, m in results.items():
+        base = base_cases.get(name)
+        change = "  ".join(f"{(m[k] - base[k]) / base[k]:+.0%}" if base and base[k] else "n/a" for k in THRESHOLDS)
+        print(f"{name:<15} {m['repeat']:>5} {m['p50_ms']:9.2f} {m['p99_ms']:9.2f} {m['alloc_peak_kb']:10.0f} "
+              f"{m['peak_rss_mb']:8.1f}   {change if base else 'no baseline'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", help="Comma-separated cases to run. Default is all of them.")
+    parser.add_argument("--repeat", type=int, help="Timed runs per case. Default is set per case.")
+    parser.add_argument("--threshold", type=float, help="One relative threshold for every metric instead of THRESHOLDS.")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(run_case(args.run_case, args.repeat)))
+        sys.exit(0)
+
+    names = args.cases.split(",") if args.cases else list(CASES)
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {}
+    if baseline.get("machine") and baseline["machine"] != machine():
+        print(f"Baseline was recorded on {baseline['machine']}, this is {machine()}; timings may not compare")
+    results = {name: measure(name, args.repeat) for name in names}
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        cases = {**baseline.get("cases", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({"machine": machine(), "cases": cases}, file, indent=1)
+            file.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        sys.exit(0)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        # Measure the regressed cases again and keep only what repeats, so one noisy run doesn't fail the suite
+        retried = {name: measure(name, args.repeat) for name in {name for name, *_ in regressions}}
+        regressions = compare(retried, baseline, args.threshold)
+    for name, metric, value, reference in regressions:
+        print(f"REGRESSION {name} {metric}: {value:.2f} vs baseline {reference:.2f}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,101 @@
+# Deterministic synthetic market data for benchmarks that must run offline.
+import numpy as np
+import pandas as pd
+
+def make_ohlcv(count, freq="h", start="2021-01-01 09:00", start_price=50_000_000, seed=42):
+    """Random-walk OHLCV candles shaped like pyupbit.get_ohlcv output."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, count)
+    closes = start_price * np.exp(np.cumsum(returns))
+    opens = np.concatenate([[start_price], closes[:-1]])
+    spread = np.abs(rng.normal(0, 0.004, count)) * closes
+    highs = np.maximum(opens, closes) + spread
+    lows = np.minimum(opens, closes) - spread
+    volumes = rng.uniform(50, 500, count)
+    index = pd.date_range(start, periods=count, freq=freq)
+    return pd.DataFrame({
+        "open": opens.round(0),
+        "high": highs.round(0),
+        "low": lows.round(0),
+        "close": closes.round(0),
+        "volume": volumes,
+        "value": volumes * closes,
+    }, index=index)
+
+def add_chart_indicators(df):
+    """The MACD and Bollinger Band columns from add_indicators, using plain pandas."""
+    ema_fast = df['close'].ewm(span=12, adjust=False).mean()
+    ema_slow = df['close'].ewm(span=26, adjust=False).mean()
+    df['MACD'] = ema_fast - ema_slow
+    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
+    df['Middle_Band'] = df['close'].rolling(window=20).mean()
+    std_dev = df['close'].rolling(window=20).std()
+    df['Upper_Band'] = df['Middle_Band'] + (std_dev * 2)
+    df['Lower_Band'] = df['Middle_Band'] - (std_dev * 2)
+    return df
+
+def reference_indicators(df):
+    """
+    The original add_indicators. Uses pandas_ta when it is installed, otherwise pandas
+    re-implementations of the pandas_ta functions it calls (sma, ema, rsi, stoch) with their default options.
+    """
+    df = df.copy()
+    try:
+        import pandas_ta as ta
+        df['SMA_10'] = ta.sma(df['close'], length=10)
+        df['EMA_10'] = ta.ema(df['close'], length=10)
+        df['RSI_14'] = ta.rsi(df['close'], length=14)
+        df = df.join(ta.stoch(df['high'], df['low'], df['close'], k=14, d=3, smooth_k=3))
+    except ImportError:
+        close = df['close']
+        df['SMA_10'] = close.rolling(10, min_periods=10).mean()
+        seeded = close.copy()
+        seeded.iloc[:9] = np.nan
+        seeded.iloc[9] = close.iloc[:10].mean()
+        df['EMA_10'] = seeded.ewm(span=10, adjust=False).mean()
+        change = close.diff()
+        gain = change.clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+        loss = (-change).clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+        df['RSI_14'] = 100 * gain / (gain + loss)
+        lowest = df['low'].rolling(14).min()
+        highest = df['high'].rolling(14).max()
+        price_range = highest - lowest
+        if price_range.eq(0).any():
+            price_range += np.finfo(float).eps
+        stoch = 100 * (close - lowest) / price_range
+        stoch_k = stoch.loc[stoch.first_valid_index():].rolling(3).mean()
+        stoch_d = stoch_k.loc[stoch_k.first_valid_index():].rolling(3).mean()
+        df['STOCHk_14_3_3'] = stoch_k
+        df['STOCHd_14_3_3'] = stoch_d
+    return add_chart_indicators(df)
+
+def make_prompt_inputs(seed=3):
+    """Realistic-sized inputs for the five text sections of the autotrade_v3 prompt."""
+    import random
+    import indicators
+    rng = random.Random(seed)
+    now_ms = 1_717_200_000_000
+    df_daily = indicators.add_indicators(make_ohlcv(30, freq="D", seed=seed))
+    df_hourly = indicators.add_indicators(make_ohlcv(24, freq="h", seed=seed + 1))
+    sources = ["CoinDesk", "Cointelegraph", "Bloomberg", "Reuters", "Decrypt", "The Block"]
+    news = [(f"Bitcoin {rng.choice(['rallies', 'slips', 'steadies', 'surges'])} as "
+             f"{rng.choice(['ETF inflows', 'miners', 'traders', 'macro data', 'whales'])} "
+             f"{rng.choice(['return', 'weigh on prices', 'drive volatility', 'signal caution'])}",
+             rng.choice(sources), now_ms - i * 3_600_000) for i in range(40)]
+    reasons = ["RSI near oversold with price on the lower Bollinger Band; fear index at 25 suggests capitulation, "
+               "so a partial buy balances the risk of further downside against the rebound potential."] * 10
+    last_decisions = [{"timestamp": now_ms - i * 28_800_000, "decision": rng.choice(["buy", "sell", "hold"]),
+                       "percentage": rng.choice([0, 20, 30, 50]), "reason": reasons[i],
+                       "btc_balance": 0.01234567 + i / 1000, "krw_balance": 1234567.891 - i * 1000,
+                       "btc_avg_buy_price": 91234567.0} for i in range(10)]
+    fear_and_greed = [{"value": str(rng.randint(10, 90)), "value_classification": rng.choice(["Fear", "Greed", "Neutral"]),
+                       "timestamp": str(now_ms // 1000 - i * 86400), **({"time_until_update": "3600"} if i == 0 else {})}
+                      for i in range(30)]
+    price = 92_000_000
+    units = [{"ask_price": price + 1000 * (i + 1), "bid_price": price - 1000 * i,
+              "ask_size": round(rng.random(), 8), "bid_size": round(rng.random(), 8)} for i in range(15)]
+    current_status = {"current_time": now_ms, "orderbook": {"market": "KRW-BTC", "timestamp": now_ms,
+                      "total_ask_size": 5.12345678, "total_bid_size": 4.87654321, "orderbook_units": units},
+                      "btc_balance": "0.01234567", "krw_balance": "1234567.89123", "btc_avg_buy_price": "91234567"}
+    return news, df_daily, df_hourly, last_decisions, fear_and_greed, current_status
@@ -0,0 +1,175 @@
+import atexit
+import queue
+import threading
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+CHART_URL = "https://upbit.com/full_chart?code=CRIX.UPBIT.KRW-BTC"
+CHROMEDRIVER_PATH = '/usr/local/bin/chromedriver'  # Specify the path to the ChromeDriver executable
+CHART_XPATH = "//*[@id='fullChartiq']"
+
+class ChartSession:
+    """A headless Chrome that stays on the chart page with the 1 hour + MACD layout applied."""
+
+    def __init__(self, url=CHART_URL, chromedriver_path=CHROMEDRIVER_PATH, window_size="1920x1080"):
+        self.url = url
+        self.created_at = time.monotonic()
+        self.captures = 0
+
+        # Set up Chrome options for headless mode
+        chrome_options = webdriver.ChromeOptions()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument(f"--window-size={window_size}")
+        service = Service(chromedriver_path)
+        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        try:
+            self.driver.get(self.url)
+            self.apply_layout()
+        except Exception:
+            self.close()
+            raise
+
+    def apply_layout(self):
+        # Wait for the page to load completely
+        wait = WebDriverWait(self.driver, 10)  # 10 seconds timeout
+
+        # Wait for the first menu item to be clickable and click it
+        first_menu_item = wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='fullChartiq']/div/div/div[1]/div/div/cq-menu[1]")))
+        first_menu_item.click()
+
+        # Wait for the "1 Hour" option to be clickable and click it
+        one_hour_option = wait.until(EC.element_to_be_clickable((By.XPATH, "//cq-item[@stxtap=\"Layout.setPeriodicity(1,60,'minute')\"]")))
+        one_hour_option.click()
+
+        # Wait for the indicators menu item to be clickable and click it
+        indicators_menu_item = wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='fullChartiq']/div/div/div[1]/div/div/cq-menu[3]")))
+        indicators_menu_item.click()
+
+        # Wait for the indicators container to be present
+        indicators_container = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "cq-scroll.ps-container")))
+
+        # Scroll the container to make the "MACD" indicator visible
+        self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight / 2.5", indicators_container)
+
+        # Wait for the "MACD" indicator to be clickable and click it
+        macd_indicator = wait.until(EC.element_to_be_clickable((By.XPATH, "//cq-item[translate[@original='MACD']]")))
+        macd_indicator.click()
+
+    def is_healthy(self, max_age_seconds, max_captures):
+        if time.monotonic() - self.created_at > max_age_seconds or self.captures >= max_captures:
+            return False
+        try:
+            # Raises if the browser died or navigated away from the chart
+            return self.driver.current_url.startswith(self.url) and bool(self.driver.find_elements(By.XPATH, CHART_XPATH))
+        except Exception:
+            return False
+
+    def capture_png(self):
+        # The chart streams live prices, so a resize is enough to force a fresh render
+        self.driver.execute_script("window.dispatchEvent(new Event('resize'))")
+        WebDriverWait(self.driver, 5).until(EC.presence_of_element_located((By.XPATH, CHART_XPATH)))
+        # Only the chart element, so the page around it is neither encoded by the browser nor sent to the model
+        png = self.driver.find_element(By.XPATH, CHART_XPATH).screenshot_as_png
+        self.captures += 1
+        return png
+
+    def close(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"Error closing chart browser: {e}")
+
+class ChartBrowserPool:
+    """
+    Keeps a small number of warm ChartSessions and recycles them when they go stale.
+    Parameters:
+    - size (int): Number of browsers to keep. Default is 1.
+    - max_age_seconds (float): Recycle a browser after this long, to bound memory growth. Default is 1 hour.
+    - max_captures (int): Recycle a browser after this many screenshots. Default is 50.
+    - session_factory (callable): Creates a new session. Default is ChartSession.
+    """
+
+    def __init__(self, size=1, max_age_seconds=3600, max_captures=50, session_factory=ChartSession):
+        self.size = size
+        self.max_age_seconds = max_age_seconds
+        self.max_captures = max_captures
+        self.session_factory = session_factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self.session_factory()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get(timeout=timeout)
+
+    def _release(self, session):
+        if self._closed:
+            self._discard(session)
+        else:
+            self._idle.put(session)
+
+    def _discard(self, session):
+        session.close()
+        with self._lock:
+            self._created -= 1
+
+    def capture_png(self, timeout=60):
+        session = self._acquire(timeout)
+        try:
+            if not session.is_healthy(self.max_age_seconds, self.max_captures):
+                print("Recycling stale chart browser...")
+                self._discard(session)
+                session = None
+                session = self._acquire(timeout)
+            png = session.capture_png()
+        except Exception:
+            # Don't hand a broken browser to the next caller
+            if session is not None:
+                self._discard(session)
+            raise
+        self._release(session)
+        return png
+
+    def warm_up(self):
+        """Starts the browsers ahead of the first capture."""
+        sessions = [self._acquire(timeout=60) for _ in range(self.size - self._idle.qsize())]
+        for session in sessions:
+            self._release(session)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def get_default_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ChartBrowserPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
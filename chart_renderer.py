@@ -0,0 +1,183 @@
+import io
+import os
+import queue
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+
+# Colors follow the Upbit chart: red for rising candles, blue for falling ones
+UP_COLOR = "#c84a31"
+DOWN_COLOR = "#1261c4"
+
+def warm_up():
+    """Imports matplotlib ahead of the first chart, e.g. in a new worker process."""
+    from matplotlib.figure import Figure  # noqa: F401
+    from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: F401
+
+class RenderPool:
+    """
+    Worker processes running chart_worker.py, each drawing one chart at a time for render_chart requests.
+    Parameters:
+    - workers (int): Number of worker processes, all started and warmed up before this returns.
+    """
+
+    def __init__(self, workers):
+        self._requests = queue.Queue()
+        # Started together, so their matplotlib imports overlap
+        processes = [self._spawn() for _ in range(workers)]
+        self._threads = []
+        for i, process in enumerate(processes):
+            self._ready(process)
+            thread = threading.Thread(target=self._serve, args=(process,), name=f"render-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @staticmethod
+    def _spawn():
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chart_worker.py")
+        return subprocess.Popen([sys.executable, path], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    @staticmethod
+    def _ready(process):
+        # Imported when used, as chart_worker imports this module
+        import chart_worker
+        if chart_worker.read_frame(process.stdout) is None:
+            raise RuntimeError(f"Chart worker exited on startup with code {process.wait()}")
+
+    def _serve(self, process):
+        import chart_worker
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            future, df, options = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                chart_worker.write_frame(process.stdin, (df, options))
+                reply = chart_worker.read_frame(process.stdout)
+                if reply is None:
+                    raise RuntimeError(f"Chart worker exited with code {process.wait()}")
+            except Exception as e:
+                future.set_exception(e)
+                # Replace the worker, whose pipes may be mid-frame
+                process.kill()
+                process.wait()
+                try:
+                    process = self._spawn()
+                    self._ready(process)
+                except Exception as e:
+                    print(f"Error restarting chart worker: {e}")
+                    return
+                continue
+            ok, value = reply
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+        # End of input stops the worker
+        process.stdin.close()
+        try:
+            process.wait(5)
+        except Exception:
+            process.kill()
+
+    def submit(self, df, **options):
+        """Queues render_chart(df, **options) for the next free worker. Returns a concurrent.futures.Future."""
+        future = Future()
+        self._requests.put((future, df, options))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        for _ in self._threads:
+            self._requests.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+def start_pool(workers):
+    """
+    Starts worker processes that load only chart_worker, this module and matplotlib. They are separate programs
+    rather than multiprocessing children, which would first re-import the parent's __main__ (for autotrade_v3,
+    its API clients, caches and tracing).
+    """
+    return RenderPool(workers)
+
+def render_chart(df, width=1280, height=720, image_format="png", quality=80, title="KRW-BTC 1H"):
+    """
+    Draws candlesticks with Bollinger Bands and a MACD panel from an indicator DataFrame.
+    Parameters:
+    - df (DataFrame): OHLCV with the Upper_Band/Middle_Band/Lower_Band and MACD/Signal_Line/MACD_Histogram
+      columns added by fetch_and_prepare_data.
+    - width, height (int): Output size in pixels.
+    - image_format (str): 'png' or 'jpeg'. Default is 'png'.
+    - quality (int): JPEG quality (1-95). Ignored for PNG.
+    - title (str): Chart title.
+    Returns:
+    - bytes: The encoded image.
+    """
+    # Imported here so the trading scripts don't pay for matplotlib unless the local renderer is used
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    dpi = 100
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    grid = fig.add_gridspec(2, 1, height_ratios=[3, 1], hspace=0.05)
+    price_ax = fig.add_subplot(grid[0])
+    macd_ax = fig.add_subplot(grid[1], sharex=price_ax)
+
+    x = list(range(len(df)))
+    opens = df['open'].to_numpy()
+    closes = df['close'].to_numpy()
+    colors = [UP_COLOR if c >= o else DOWN_COLOR for o, c in zip(opens, closes)]
+
+    # Candlesticks: wicks as lines, bodies as bars
+    price_ax.vlines(x, df['low'].to_numpy(), df['high'].to_numpy(), colors=colors, linewidth=1)
+    bodies = abs(closes - opens)
+    # Keep doji candles visible
+    bodies[bodies == 0] = (df['high'].max() - df['low'].min()) * 0.001
+    price_ax.bar(x, bodies, bottom=[min(o, c) for o, c in zip(opens, closes)], color=colors, width=0.6)
+
+    # Bollinger Bands
+    if 'Middle_Band' in df:
+        price_ax.plot(x, df['Middle_Band'].to_numpy(), color="#f0a30a", linewidth=1, label="BB Middle")
+        price_ax.plot(x, df['Upper_Band'].to_numpy(), color="#7f7f7f", linewidth=1, label="BB Upper")
+        price_ax.plot(x, df['Lower_Band'].to_numpy(), color="#7f7f7f", linewidth=1, label="BB Lower")
+        price_ax.legend(loc="upper left", fontsize=8)
+    price_ax.set_title(title, fontsize=10)
+    price_ax.ticklabel_format(axis="y", style="plain", useOffset=False)
+    price_ax.grid(alpha=0.3)
+    price_ax.tick_params(labelbottom=False)
+
+    # MACD
+    if 'MACD' in df:
+        histogram = df['MACD_Histogram'].to_numpy()
+        macd_ax.bar(x, histogram, color=[UP_COLOR if h >= 0 else DOWN_COLOR for h in histogram], width=0.6)
+        macd_ax.plot(x, df['MACD'].to_numpy(), color="#1f77b4", linewidth=1, label="MACD (12,26)")
+        macd_ax.plot(x, df['Signal_Line'].to_numpy(), color="#ff7f0e", linewidth=1, label="Signal (9)")
+        macd_ax.legend(loc="upper left", fontsize=8)
+    macd_ax.grid(alpha=0.3)
+
+    # Label a handful of timestamps on the x axis
+    step = max(1, len(df) // 8)
+    ticks = x[::step]
+    macd_ax.set_xticks(ticks)
+    macd_ax.set_xticklabels([df.index[i].strftime("%m-%d %H:%M") for i in ticks], fontsize=8)
+    fig.subplots_adjust(left=0.08, right=0.98, top=0.95, bottom=0.08)
+
+    buffer = io.BytesIO()
+    if image_format == "jpeg":
+        fig.savefig(buffer, format="jpeg", dpi=dpi, pil_kwargs={"quality": quality, "optimize": True})
+    else:
+        fig.savefig(buffer, format="png", dpi=dpi)
+    return buffer.getvalue()
@@ -0,0 +1,43 @@
+# Entry point of the chart render workers started by chart_renderer.start_pool: python chart_worker.py
+# A worker is its own program rather than a multiprocessing child, so it loads only this module, chart_renderer
+# and matplotlib, never the script that started it. Requests and replies are pickled, length-prefixed frames:
+# (df, options) on stdin, (True, png bytes) or (False, error message) on stdout.
+import pickle
+import struct
+import sys
+import chart_renderer
+
+HEADER = struct.Struct(">I")
+
+def read_frame(stream):
+    """The next pickled object on stream, or None once it is closed."""
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    return pickle.loads(stream.read(HEADER.unpack(header)[0]))
+
+def write_frame(stream, value):
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(HEADER.pack(len(data)) + data)
+    stream.flush()
+
+def main():
+    requests, replies = sys.stdin.buffer, sys.stdout.buffer
+    # Anything printed while drawing goes to stderr, so it can't corrupt the replies
+    sys.stdout = sys.stderr
+    chart_renderer.warm_up()
+    # Tells the pool this worker is ready
+    write_frame(replies, (True, None))
+    while True:
+        request = read_frame(requests)
+        if request is None:
+            return
+        df, options = request
+        try:
+            reply = (True, chart_renderer.render_chart(df, **options))
+        except Exception as e:
+            reply = (False, f"{type(e).__name__}: {e}")
+        write_frame(replies, reply)
+
+if __name__ == "__main__":
+    main()
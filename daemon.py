@@ -0,0 +1,247 @@
+import asyncio
+import concurrent.futures
+import json
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Wall-clock slots of the decision cycle, in local time like the schedule package
+SLOTS = ("00:01", "08:01", "16:01")
+# What to do when a cycle is due while the previous one is still running: drop it, or run it right after
+OVERLAP_POLICIES = ("skip", "queue")
+
+def next_slot(slots, now):
+    """The first of the 'HH:MM' slots after now, as a datetime, or None without slots."""
+    candidates = []
+    for slot in slots:
+        hour, minute = (int(part) for part in slot.split(":"))
+        at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        candidates.append(at if at > now else at + timedelta(days=1))
+    return min(candidates) if candidates else None
+
+class Daemon:
+    """
+    Runs decision cycles from an asyncio control loop: at wall-clock slots, and whenever request_cycle is called.
+    A cycle runs on its own thread, so the loop keeps serving the health endpoint and signals while it works.
+    Parameters:
+    - cycle (callable): One decision cycle, e.g. autotrade_v3.make_decision_and_execute.
+    - slots (iterable): 'HH:MM' local times to run at. Default is SLOTS; empty runs only requested cycles.
+    - overlap (str): 'skip' or 'queue' a cycle that is due while one is running. At most one cycle is queued.
+    - health_port (int): Port of the /healthz and /readyz endpoints. 0 serves none.
+    - shutdown_timeout (float): Seconds SIGTERM waits for a running cycle, and the orders it already sent, to finish.
+    - max_failures (int): Consecutive failed cycles after which /readyz reports not ready. Default is 3.
+    - stop_event (threading.Event): Set as soon as stopping begins, so the running cycle can skip starting new work
+      such as orders. Default is a new Event, available as the stopping attribute.
+    """
+
+    def __init__(self, cycle, slots=SLOTS, overlap="skip", health_port=0, health_host="127.0.0.1",
+                 shutdown_timeout=300, max_failures=3, lag_interval=1.0, stop_event=None):
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"overlap must be one of {', '.join(OVERLAP_POLICIES)}, got {overlap!r}")
+        self.cycle = cycle
+        self.slots = tuple(slots)
+        self.overlap = overlap
+        self.health_port = health_port
+        self.health_host = health_host
+        self.shutdown_timeout = shutdown_timeout
+        self.max_failures = max_failures
+        self.lag_interval = lag_interval
+        self.stopping = stop_event or threading.Event()
+        self.status = {"state": "starting", "runs": 0, "failures": 0, "consecutive_failures": 0, "skipped": 0,
+                       "queued": 0, "last_reason": None, "last_started": None, "last_finished": None,
+                       "last_duration": None, "last_error": None, "next_run": None, "loop_lag": 0.0, "max_loop_lag": 0.0}
+        self.health_server = None
+        self._loop = None
+        self._stopping = None
+        self._running = None
+        self._queued = None
+
+    def run(self):
+        """Blocks until SIGTERM/SIGINT or stop(), then waits for the running cycle before returning."""
+        asyncio.run(self.main())
+
+    async def main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                self._loop.add_signal_handler(signum, self._on_signal, signum)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not the main thread, or a platform without signal handlers
+        if self.health_port:
+            self.health_server = await asyncio.start_server(self._serve_health, self.health_host, self.health_port)
+        tasks = [asyncio.create_task(self._schedule()), asyncio.create_task(self._measure_lag())]
+        self.status["state"] = "idle"
+        try:
+            await self._stopping.wait()
+        finally:
+            self.stopping.set()
+            self.status["state"] = "stopping"
+            for task in tasks:
+                task.cancel()
+            await self._drain()
+            if self.health_server is not None:
+                self.health_server.close()
+                await self.health_server.wait_closed()
+            self.status["state"] = "stopped"
+
+    def _on_signal(self, signum):
+        print(f"Received {signal.Signals(signum).name}, stopping after the orders already sent")
+        self.stopping.set()
+        self._stopping.set()
+
+    def stop(self):
+        """Thread-safe; the running cycle is still waited for, but sees stopping set."""
+        self.stopping.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    def request_cycle(self, reason="requested", timeout=5):
+        """
+        Thread-safe: runs a cycle now, subject to the overlap policy.
+        Returns True when a cycle was started or queued for the request, False when it was skipped, merged into an
+        already queued cycle, or the daemon isn't running.
+        """
+        if self._loop is None:
+            return False
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            return self._start(reason)
+        accepted = concurrent.futures.Future()
+
+        def start():
+            try:
+                accepted.set_result(self._start(reason))
+            except BaseException as e:
+                accepted.set_exception(e)
+        try:
+            self._loop.call_soon_threadsafe(start)
+            return accepted.result(timeout)
+        except (RuntimeError, concurrent.futures.TimeoutError):
+            # The loop already closed, or is too busy to answer
+            return False
+
+    async def _schedule(self):
+        while True:
+            at = next_slot(self.slots, datetime.now())
+            self.status["next_run"] = at.isoformat() if at else None
+            # Sleep in chunks of at most a minute so clock changes (suspend, NTP steps) don't shift a slot much
+            timeout = 3600.0 if at is None else max(0.0, min(60.0, (at - datetime.now()).total_seconds()))
+            await asyncio.sleep(timeout)
+            if at is not None and datetime.now() >= at:
+                self._start(f"slot {at:%H:%M}")
+
+    def _start(self, reason):
+        # Returns whether a new cycle was started or queued
+        if self._stopping.is_set():
+            return False
+        if self._running is not None and not self._running.done():
+            if self.overlap == "queue":
+                accepted = self._queued is None
+                if accepted:
+                    self.status["queued"] += 1
+                self._queued = reason
+                print(f"Cycle ({reason}) queued behind the running one")
+                return accepted
+            self.status["skipped"] += 1
+            print(f"Cycle ({reason}) skipped: the previous one is still running")
+            return False
+        self._running = asyncio.create_task(self._run_cycle(reason))
+        return True
+
+    async def _run_cycle(self, reason):
+        status = self.status
+        status.update(state="running", last_reason=reason, last_started=time.time())
+        started = time.monotonic()
+        try:
+            await self._in_thread(self.cycle)
+            status["consecutive_failures"] = 0
+        except Exception as e:
+            # A failed cycle is reported and counted, and the next slot runs as usual
+            status["failures"] += 1
+            status["consecutive_failures"] += 1
+            status["last_error"] = f"{type(e).__name__}: {e}"[:500]
+            print(f"Decision cycle failed: {status['last_error']}")
+        finally:
+            status["runs"] += 1
+            status["last_finished"] = time.time()
+            status["last_duration"] = time.monotonic() - started
+            status["state"] = "stopping" if self._stopping.is_set() else "idle"
+        if self._queued is not None and not self._stopping.is_set():
+            reason, self._queued = self._queued, None
+            self._running = asyncio.create_task(self._run_cycle(reason))
+
+    def _in_thread(self, function):
+        # A daemon thread instead of an executor: a cycle still stuck after shutdown_timeout must not keep
+        # the process from exiting, and ThreadPoolExecutor threads are joined at interpreter exit
+        future = self._loop.create_future()
+
+        def settle(error, result):
+            if not future.done():
+                future.set_exception(error) if error else future.set_result(result)
+
+        def target():
+            error = result = None
+            try:
+                result = function()
+            except BaseException as e:
+                error = e
+            try:
+                self._loop.call_soon_threadsafe(settle, error, result)
+            except RuntimeError:
+                pass  # The loop already closed after the shutdown timeout
+        threading.Thread(target=target, name="cycle", daemon=True).start()
+        return future
+
+    async def _drain(self):
+        self._queued = None
+        running = self._running
+        if running is None or running.done():
+            return
+        print(f"Waiting up to {self.shutdown_timeout:g}s for the running cycle to finish")
+        try:
+            await asyncio.wait_for(asyncio.shield(running), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            print("The running cycle did not finish in time; exiting without it")
+
+    async def _measure_lag(self):
+        # How late the loop wakes up: anything holding it up also delays signals and health checks
+        while True:
+            expected = time.monotonic() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, time.monotonic() - expected)
+            self.status["loop_lag"] = lag
+            self.status["max_loop_lag"] = max(self.status["max_loop_lag"], lag)
+
+    def ready(self):
+        return (self.status["state"] in ("idle", "running")
+                and self.status["consecutive_failures"] < self.max_failures)
+
+    async def _serve_health(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            # Headers are read and ignored
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else ""
+            if path == "/healthz":
+                # Live as long as the loop answers
+                code = 200
+            elif path == "/readyz":
+                code = 200 if self.ready() else 503
+            else:
+                code = 404
+            body = json.dumps({**self.status, "ready": self.ready()}).encode("utf-8")
+            reasons = {200: "OK", 404: "Not Found", 503: "Service Unavailable"}
+            writer.write(f"HTTP/1.1 {code} {reasons[code]}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
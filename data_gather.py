@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# A source with this fallback has no safe default and aborts the cycle when it fails.
+REQUIRED = object()
+
+def gather_data(sources, default_timeout=30, max_workers=None):
+    """
+    Runs every data source concurrently and waits for each one up to its own timeout.
+    Parameters:
+    - sources (dict): name -> (function, fallback) or name -> (function, fallback, timeout_seconds).
+      Use REQUIRED as the fallback for sources the decision cannot be made without.
+    - default_timeout (float): Timeout in seconds for sources that don't set their own.
+    - max_workers (int): Thread pool size. Default is one thread per source.
+    Returns:
+    - (dict, dict): results by source name, and timings by source name
+      ({'seconds': float, 'status': 'ok' | 'error' | 'timeout'}).
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(sources), thread_name_prefix="gather")
+    started = time.perf_counter()
+    futures = {}
+    finished_at = {}
+    for name, spec in sources.items():
+        function = spec[0]
+        futures[name] = executor.submit(_timed_call, function, finished_at, name)
+
+    results = {}
+    timings = {}
+    failed_required = []
+    try:
+        for name, spec in sources.items():
+            fallback = spec[1]
+            timeout = spec[2] if len(spec) > 2 else default_timeout
+            remaining = max(0, started + timeout - time.perf_counter())
+            try:
+                results[name] = futures[name].result(timeout=remaining)
+                status = "ok"
+            except FutureTimeoutError:
+                futures[name].cancel()
+                print(f"Timed out fetching {name} after {timeout} seconds")
+                status = "timeout"
+            except Exception as e:
+                print(f"Error fetching {name}: {e}")
+                status = "error"
+            if status != "ok":
+                if fallback is REQUIRED:
+                    failed_required.append(name)
+                else:
+                    results[name] = fallback
+            seconds = finished_at.get(name, time.perf_counter()) - started
+            timings[name] = {"seconds": seconds, "status": status}
+    finally:
+        # Don't wait for sources that timed out; their threads finish in the background.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if failed_required:
+        raise RuntimeError(f"Required data sources failed: {', '.join(failed_required)}")
+    return results, timings
+
+def _timed_call(function, finished_at, name):
+    try:
+        return function()
+    finally:
+        finished_at[name] = time.perf_counter()
+
+def print_timings(timings):
+    total = sum(t["seconds"] for t in timings.values())
+    slowest = max((t["seconds"] for t in timings.values()), default=0)
+    for name, t in sorted(timings.items(), key=lambda item: -item[1]["seconds"]):
+        print(f"  {name:<16} {t['seconds']:7.3f}s  {t['status']}")
+    print(f"  {'slowest':<16} {slowest:7.3f}s  (sum of all sources {total:.3f}s)")
@@ -0,0 +1,268 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DB_PATH = 'trading_decisions.sqlite'
+# btc_balance, btc_avg_buy_price and btc_krw_price hold the coin of the row's market, which is not always BTC
+FIELDS = ['timestamp', 'decision', 'percentage', 'reason', 'btc_balance', 'krw_balance', 'btc_avg_buy_price', 'btc_krw_price',
+          'market']
+DEFAULT_MARKET = 'KRW-BTC'
+
+# One connection per process and database file, shared by the threads of that process
+_connections = {}
+_lock = threading.RLock()
+
+def _to_millis(value):
+    # Timestamps used to be stored as local 'YYYY-MM-DD HH:MM:SS' text from datetime('now', 'localtime')
+    if value is None or isinstance(value, int):
+        return value
+    return int(datetime.fromisoformat(str(value)).timestamp() * 1000)
+
+def _create_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS decisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME,
+            decision TEXT,
+            percentage REAL,
+            reason TEXT,
+            btc_balance REAL,
+            krw_balance REAL,
+            btc_avg_buy_price REAL,
+            btc_krw_price REAL
+        );
+    ''')
+
+def _integer_timestamps(conn):
+    columns = ['timestamp', 'decision', 'percentage', 'reason', 'btc_balance', 'krw_balance', 'btc_avg_buy_price', 'btc_krw_price']
+    conn.execute('''
+        CREATE TABLE decisions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            decision TEXT,
+            percentage REAL,
+            reason TEXT,
+            btc_balance REAL,
+            krw_balance REAL,
+            btc_avg_buy_price REAL,
+            btc_krw_price REAL
+        );
+    ''')
+    rows = conn.execute(f"SELECT id, {', '.join(columns)} FROM decisions").fetchall()
+    conn.executemany(f"INSERT INTO decisions_new (id, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 1))})",
+                     ((row[0], _to_millis(row[1]) or 0, *row[2:]) for row in rows))
+    conn.execute("DROP TABLE decisions")
+    conn.execute("ALTER TABLE decisions_new RENAME TO decisions")
+
+def _timestamp_index(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_timestamp ON decisions (timestamp)")
+
+def _performance_table(conn):
+    # Filled incrementally by performance.update, one row per decision
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS performance (
+            decision_id INTEGER PRIMARY KEY,
+            timestamp INTEGER NOT NULL,
+            equity REAL,
+            peak REAL,
+            drawdown_pct REAL,
+            pnl REAL,
+            return_pct REAL,
+            exposure_pct REAL,
+            in_market INTEGER
+        );
+    ''')
+
+def _market_column(conn):
+    # Rows from before multi-market support are all KRW-BTC
+    conn.execute("ALTER TABLE decisions ADD COLUMN market TEXT NOT NULL DEFAULT 'KRW-BTC'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_market_timestamp ON decisions (market, timestamp)")
+
+def _executions_table(conn):
+    # One row per executed decision, written by execution.Executor
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS executions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            market TEXT NOT NULL,
+            side TEXT,
+            mode TEXT,
+            requested REAL,
+            volume REAL,
+            average_price REAL,
+            arrival_price REAL,
+            slippage_bps REAL,
+            latency_ms REAL,
+            orders INTEGER,
+            fee REAL
+        );
+    ''')
+
+def _account_performance(conn):
+    # The summary now values the whole account over all markets; it is rebuilt by the next performance.update
+    conn.execute("DELETE FROM performance")
+    conn.execute("ALTER TABLE performance ADD COLUMN holdings TEXT")
+
+# Schema migrations in order; PRAGMA user_version records how many have been applied
+MIGRATIONS = [_create_table, _integer_timestamps, _timestamp_index, _performance_table, _market_column, _executions_table,
+              _account_performance]
+
+@contextmanager
+def _transaction(conn):
+    # The connection is in autocommit mode, so schema changes and batches are wrapped explicitly
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        with _transaction(conn):
+            # Another process (the bot and the dashboard starting together) may have applied it after the read above
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+
+def get_connection(db_path=DB_PATH):
+    """The process-wide connection to a decisions database, opened in WAL mode and migrated on first use."""
+    key = (os.getpid(), db_path)
+    with _lock:
+        conn = _connections.get(key)
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            # WAL lets the dashboard read while the bot writes; NORMAL sync is durable enough with WAL
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            migrate(conn)
+            _connections[key] = conn
+        return conn
+
+@contextmanager
+def transaction(db_path=DB_PATH):
+    """The process connection inside a write transaction, for writes spanning several statements."""
+    with _lock, _transaction(get_connection(db_path)) as conn:
+        yield conn
+
+def query(sql, parameters=(), db_path=DB_PATH):
+    with _lock:
+        return get_connection(db_path).execute(sql, parameters).fetchall()
+
+def close(db_path=DB_PATH):
+    with _lock:
+        conn = _connections.pop((os.getpid(), db_path), None)
+        if conn is not None:
+            conn.close()
+
+def initialize_db(db_path=DB_PATH):
+    get_connection(db_path)
+
+def now_millis():
+    return int(time.time() * 1000)
+
+def save_decisions(rows, db_path=DB_PATH):
+    """
+    Inserts decisions in one transaction.
+    Parameters:
+    - rows (iterable): Tuples in FIELDS order, with timestamp in epoch milliseconds.
+    """
+    with _lock:
+        with _transaction(get_connection(db_path)) as conn:
+            conn.executemany(f"INSERT INTO decisions ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})", rows)
+
+def save_decision(decision, status, price, timestamp=None, db_path=DB_PATH, market=DEFAULT_MARKET):
+    """
+    Saves one decision with the account status it was made with.
+    Parameters:
+    - decision (dict): 'decision', 'percentage' and 'reason'.
+    - status (dict): 'btc_balance', 'krw_balance' and 'btc_avg_buy_price'.
+    - price (float): BTC price in KRW at the time of the decision.
+    - timestamp (int): Epoch milliseconds. Default is now.
+    - market (str): The market the decision is for. Default is KRW-BTC.
+    """
+    save_decisions([decision_row(decision, status, price, timestamp, market)], db_path)
+
+def decision_row(decision, status, price, timestamp=None, market=DEFAULT_MARKET):
+    """A decision as a tuple in FIELDS order, for save_decisions."""
+    return (
+        timestamp or now_millis(),
+        decision.get('decision'),
+        decision.get('percentage', 100),  # Defaulting to 100 if not provided
+        decision.get('reason', ''),  # Defaulting to an empty string if not provided
+        status.get('btc_balance'),
+        status.get('krw_balance'),
+        status.get('btc_avg_buy_price'),
+        price,
+        market,
+    )
+
+def load_last_decisions(num_decisions=10, db_path=DB_PATH, market=DEFAULT_MARKET):
+    """The latest decisions for a market as dicts, newest first, with timestamps in epoch milliseconds."""
+    with _lock:
+        rows = get_connection(db_path).execute('''
+            SELECT timestamp, decision, percentage, reason, btc_balance, krw_balance, btc_avg_buy_price FROM decisions
+            WHERE market = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (market, num_decisions)).fetchall()
+    return [dict(zip(FIELDS, row)) for row in rows]
+
+def load_decisions(after_id=0, limit=None, db_path=DB_PATH, market=None):
+    """Rows with an id above after_id, oldest first, as tuples of (id, *FIELDS). market=None returns every market."""
+    # '+market' keeps SQLite on the primary key range instead of the market index, so only new rows are read
+    where = "id > ?" if market is None else "id > ? AND +market = ?"
+    parameters = (after_id,) if market is None else (after_id, market)
+    with _lock:
+        return get_connection(db_path).execute(
+            f"SELECT id, {', '.join(FIELDS)} FROM decisions WHERE {where} ORDER BY id LIMIT ?",
+            (*parameters, -1 if limit is None else limit)).fetchall()
+
+def count_decisions(db_path=DB_PATH):
+    with _lock:
+        return get_connection(db_path).execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+
+def load_decision_page(page, page_size, db_path=DB_PATH, market=DEFAULT_MARKET):
+    """One page of a market's rows, newest first, as tuples of (id, *FIELDS). Page 0 is the latest."""
+    with _lock:
+        return get_connection(db_path).execute(
+            f"SELECT id, {', '.join(FIELDS)} FROM decisions WHERE +market = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (market, page_size, page * page_size)).fetchall()
+
+DAILY_FIELDS = ['day', 'last_id', 'decisions', 'buys', 'sells', 'holds', 'btc_balance', 'krw_balance', 'btc_krw_price']
+
+def aggregate_daily(after_id=0, utc_offset_ms=0, db_path=DB_PATH, market=DEFAULT_MARKET):
+    """
+    Per-day counts and end-of-day balances of a market's rows with an id above after_id, computed in SQL.
+    Parameters:
+    - utc_offset_ms (int): Offset of the local day from UTC, e.g. 9 hours for KST.
+    Returns:
+    - list: Tuples in DAILY_FIELDS order, oldest day first; day is days since the epoch.
+    """
+    # The balance columns are bare columns next to MAX(id), so SQLite takes them from each day's last row
+    with _lock:
+        return get_connection(db_path).execute('''
+            SELECT (timestamp + ?) / 86400000 AS day, MAX(id), COUNT(*),
+                   SUM(decision = 'buy'), SUM(decision = 'sell'), SUM(decision = 'hold'),
+                   btc_balance, krw_balance, btc_krw_price
+            FROM decisions WHERE id > ? AND +market = ?
+            GROUP BY day ORDER BY day
+        ''', (utc_offset_ms, after_id, market)).fetchall()
+
+# requested is KRW for buys and coin volume for sells; slippage_bps is positive when the fill was worse than arrival_price
+EXECUTION_FIELDS = ['timestamp', 'market', 'side', 'mode', 'requested', 'volume', 'average_price', 'arrival_price',
+                    'slippage_bps', 'latency_ms', 'orders', 'fee']
+
+def save_execution(record, db_path=DB_PATH):
+    """Saves one execution record, a dict with the EXECUTION_FIELDS keys."""
+    with _lock:
+        get_connection(db_path).execute(
+            f"INSERT INTO executions ({', '.join(EXECUTION_FIELDS)}) VALUES ({', '.join('?' * len(EXECUTION_FIELDS))})",
+            [record[field] for field in EXECUTION_FIELDS])
@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+import indicators
+
+# Triggers take candles (dicts with ts/open/high/low/close, oldest first) and return a reason string or None.
+# They only look at closed candles, so the caller passes the candles up to the last closed one.
+
+def volatility_breakout(k=0.5):
+    """Fires when a candle closes above its open plus k times the previous candle's range."""
+    def trigger(candles):
+        if len(candles) < 2:
+            return None
+        previous, current = candles[-2], candles[-1]
+        target = current["open"] + k * (previous["high"] - previous["low"])
+        if current["close"] > target:
+            return f"volatility breakout: close {current['close']} > target {target:.0f}"
+        return None
+    return trigger
+
+def bollinger_cross(length=20, num_std=2):
+    """Fires when the close moves from inside the Bollinger Bands to outside them."""
+    def trigger(candles):
+        if len(candles) < length + 1:
+            return None
+        closes = np.array([c["close"] for c in candles[-(length + 1):]], dtype=np.float64)
+        _, upper, lower = indicators.bollinger_bands(closes, length, num_std)
+        inside_before = np.isnan(upper[-2]) or lower[-2] <= closes[-2] <= upper[-2]
+        if inside_before and closes[-1] > upper[-1]:
+            return f"close {closes[-1]:.0f} crossed above the upper band {upper[-1]:.0f}"
+        if inside_before and closes[-1] < lower[-1]:
+            return f"close {closes[-1]:.0f} crossed below the lower band {lower[-1]:.0f}"
+        return None
+    return trigger
+
+def rsi_threshold(length=14, oversold=30, overbought=70, lookback=200):
+    """Fires when RSI crosses into the oversold or overbought zone."""
+    def trigger(candles):
+        if len(candles) < length + 2:
+            return None
+        closes = np.array([c["close"] for c in candles[-lookback:]], dtype=np.float64)
+        values = indicators.rsi(closes, length)
+        before, now = values[-2], values[-1]
+        if np.isnan(before) or np.isnan(now):
+            return None
+        if before >= oversold > now:
+            return f"RSI {now:.1f} dropped below {oversold}"
+        if before <= overbought < now:
+            return f"RSI {now:.1f} rose above {overbought}"
+        return None
+    return trigger
+
+DEFAULT_TRIGGERS = (volatility_breakout(), bollinger_cross(), rsi_threshold())
+
+class SystemClock:
+    def now(self):
+        return time.time()
+
+    def wait(self, event, timeout):
+        return event.wait(timeout)
+
+class SimulatedClock:
+    """A clock that jumps forward instead of sleeping, so hours of trigger behaviour run in milliseconds."""
+
+    def __init__(self, start=0.0):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def advance_to(self, timestamp):
+        self.current = max(self.current, timestamp)
+
+    def wait(self, event, timeout):
+        if not event.is_set():
+            self.current += timeout
+        return event.is_set()
+
+class EventScheduler:
+    """
+    Runs a decision cycle when a market trigger fires on a newly closed candle of any watched market, subject to a
+    cooldown and a cycle budget.
+    Parameters:
+    - get_candles (callable): code -> list of candles, e.g. MarketFeed.get_candles.
+    - action (callable): Runs one decision cycle, e.g. make_decision_and_execute, or hands it to a runner such as
+      Daemon.request_cycle. Returning False means no cycle was run, so it doesn't count against the budget.
+    - codes (iterable): Markets whose candles are checked. Default is ["KRW-BTC"].
+    - triggers (iterable): Trigger functions. Default is volatility breakout, Bollinger cross and RSI threshold.
+    - cooldown_seconds (float): Minimum time between cycles. Default is 1 hour.
+    - max_cycles_per_day (int): Budget of cycles in any rolling 24 hours. Default is 6. This counts cycles, not model
+      requests: an autotrade_v3 cycle makes one request per market, plus any retries and repairs.
+    - max_idle_seconds (float): Run a cycle anyway after this long without one. Default is 8 hours, like the fixed slots.
+    - clock: SystemClock (default) or SimulatedClock.
+    """
+
+    def __init__(self, get_candles, action, codes=("KRW-BTC",), triggers=DEFAULT_TRIGGERS, cooldown_seconds=3600,
+                 max_cycles_per_day=6, max_idle_seconds=8 * 3600, clock=None):
+        self.get_candles = get_candles
+        self.action = action
+        self.codes = list(codes)
+        self.triggers = list(triggers)
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cycles_per_day = max_cycles_per_day
+        self.max_idle_seconds = max_idle_seconds
+        self.clock = clock or SystemClock()
+        self.cycles = deque()
+        self.started = self.clock.now()
+        self.last_run = None
+        # Last closed candle checked, by market
+        self.last_checked_ts = {}
+        self.log = []
+        self._candle_closed = threading.Event()
+        self._stopped = False
+        self._last_trade_candle = {}
+
+    def on_message(self, stream_type, message):
+        """MarketFeed listener: wakes the scheduler when a trade opens a new candle (so the previous one closed)."""
+        code = message.get("code")
+        if stream_type != "trade" or code not in self.codes:
+            return
+        candles = self.get_candles(code)
+        if candles and candles[-1]["ts"] != self._last_trade_candle.get(code):
+            self._last_trade_candle[code] = candles[-1]["ts"]
+            self._candle_closed.set()
+
+    def _budget_left(self, now):
+        while self.cycles and now - self.cycles[0] >= 86400:
+            self.cycles.popleft()
+        return self.max_cycles_per_day - len(self.cycles)
+
+    def step(self):
+        """Checks the triggers once against each market's closed candles and runs the action if allowed. Returns the log entry."""
+        now = self.clock.now()
+        reasons = []
+        for code in self.codes:
+            closed = self.get_candles(code)[:-1]
+            if closed and closed[-1]["ts"] != self.last_checked_ts.get(code):
+                self.last_checked_ts[code] = closed[-1]["ts"]
+                # One cycle decides for every market, so the reasons name the market that fired
+                reasons += [f"{code}: {reason}" for reason in (trigger(closed) for trigger in self.triggers) if reason]
+        if not reasons and now - (self.last_run or self.started) >= self.max_idle_seconds:
+            reasons = ["no trigger for max_idle_seconds"]
+        if not reasons:
+            return None
+
+        entry = {"time": now, "reasons": reasons, "ran": False}
+        if self.last_run is not None and now - self.last_run < self.cooldown_seconds:
+            entry["skipped"] = "cooldown"
+        elif self._budget_left(now) <= 0:
+            entry["skipped"] = "budget"
+        else:
+            print(f"Trigger fired: {'; '.join(reasons)}")
+            try:
+                entry["ran"] = self.action() is not False
+            except Exception as e:
+                # The cycle started and may have called the model, so it still counts
+                entry["ran"] = True
+                print(f"Error in triggered decision: {e}")
+            if entry["ran"]:
+                self.last_run = now
+                self.cycles.append(now)
+            else:
+                entry["skipped"] = "not accepted"
+        self.log.append(entry)
+        return entry
+
+    def run(self):
+        """Blocks until stop(); sleeps until a candle closes or the idle limit is reached, never busy-polling."""
+        while not self._stopped:
+            timeout = max(1.0, self.max_idle_seconds - (self.clock.now() - (self.last_run or self.started)))
+            self.clock.wait(self._candle_closed, timeout)
+            self._candle_closed.clear()
+            if not self._stopped:
+                self.step()
+
+    def stop(self):
+        self._stopped = True
+        self._candle_closed.set()
+
+def simulate(candles, triggers=DEFAULT_TRIGGERS, **options):
+    """
+    Replays candles through an EventScheduler on a simulated clock.
+    Returns the scheduler, whose log records every fired trigger and whether it ran or was skipped.
+    """
+    clock = SimulatedClock(start=candles[0]["ts"])
+    visible = []
+    runs = []
+    scheduler = EventScheduler(lambda code: visible, lambda: runs.append(clock.now()), triggers=triggers,
+                               clock=clock, **options)
+    for candle in candles:
+        visible.append(candle)
+        # A new candle opening means the previous one closed
+        clock.advance_to(candle["ts"])
+        scheduler.step()
+    scheduler.runs = runs
+    return scheduler
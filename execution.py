@@ -0,0 +1,252 @@
+import json
+import math
+import time
+import decision_store
+
+FEE_RATE = 0.0005
+MIN_ORDER_KRW = 5000
+# Market buys spend slightly less than the balance so the fee fits
+BUY_FEE_ADJUSTMENT = 0.9995
+# Upbit reports market buys whose leftover funds were returned as 'cancel', so both mean the order is over
+FINAL_STATES = ("done", "cancel")
+MODES = ("market", "limit", "twap", "iceberg")
+
+def currency(market):
+    # 'KRW-ETH' -> 'ETH'
+    return market.split("-")[1]
+
+class Snapshot:
+    """
+    Balances and orderbooks fetched at the start of a decision cycle, reused by the orders that follow.
+    Parameters:
+    - balances (dict): currency -> balance.
+    - orderbooks (dict): market -> orderbook in pyupbit.get_orderbook format.
+    - taken_at (float): When the balances were fetched, in clock seconds. Default is now.
+    """
+
+    def __init__(self, balances, orderbooks, taken_at=None, clock=time.time):
+        self.balances = {name: float(value) for name, value in balances.items()}
+        self.orderbooks = dict(orderbooks)
+        self.taken_at = clock() if taken_at is None else taken_at
+        # Currencies whose balance an order has changed since the snapshot was taken
+        self.changed = set()
+
+    @classmethod
+    def from_statuses(cls, statuses, clock=time.time):
+        """A snapshot of the current status of each market, as returned by autotrade_v3.get_current_statuses."""
+        balances = {}
+        orderbooks = {}
+        for market, status in statuses.items():
+            status = json.loads(status) if isinstance(status, str) else status
+            balances["KRW"] = status['krw_balance']
+            balances[currency(market)] = status['btc_balance']
+            orderbooks[market] = status['orderbook']
+        return cls(balances, orderbooks, clock=clock)
+
+def best_price(orderbook, side):
+    # The touch: best ask for buys, best bid for sells
+    return float(orderbook['orderbook_units'][0]["ask_price" if side == "buy" else "bid_price"])
+
+def depth(orderbook, side, levels):
+    """Volume quoted on the side a buy or sell would take, over the top levels."""
+    key = "ask_size" if side == "buy" else "bid_size"
+    return sum(float(unit[key]) for unit in orderbook['orderbook_units'][:levels])
+
+def summarize_fills(orders):
+    """(executed volume, funds, fees) over the trades of several orders."""
+    volume = funds = fee = 0.0
+    for order in orders:
+        for trade in order.get('trades', []):
+            volume += float(trade['volume'])
+            funds += float(trade['funds'])
+        fee += float(order.get('paid_fee') or 0)
+    return volume, funds, fee
+
+class Executor:
+    """
+    Places the orders of a decision from a cycle's Snapshot, asking the exchange only for what is stale,
+    and records fill latency and slippage of each execution.
+    Parameters:
+    - exchange: pyupbit.Upbit, or fake_upbit.FakeUpbit offline.
+    - get_orderbook (callable): market -> orderbook, used when the snapshot's orderbook is older than max_orderbook_age.
+    - mode (str): 'market'; 'limit' at the touch with the rest sent at market after limit_timeout;
+      'twap' market slices every slice_interval seconds; 'iceberg' limit slices at the touch, one at a time.
+    - max_orderbook_age (float): Seconds an orderbook is trusted, by its exchange timestamp. Default is 5.
+    - max_balance_age (float): Seconds snapshot balances are trusted unless an order changed them. Default is 300.
+    - max_depth_share (float): A slice takes at most this share of the volume in the top depth_levels levels.
+    - db_path (str): Database the execution records are saved to, or None to keep them in memory only.
+    - stopping (threading.Event): Once set, orders already sent are still waited for, but no further slices or
+      market remainders are sent. Default is None.
+    """
+
+    def __init__(self, exchange, get_orderbook, mode="market", max_orderbook_age=5, max_balance_age=300,
+                 limit_timeout=10, slice_interval=10, max_slices=10, max_depth_share=0.5, depth_levels=5,
+                 poll_interval=0.2, fill_timeout=10, db_path=decision_store.DB_PATH, clock=time.time, sleep=time.sleep,
+                 stopping=None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}, got {mode!r}")
+        self.exchange = exchange
+        self.get_orderbook = get_orderbook
+        self.mode = mode
+        self.max_orderbook_age = max_orderbook_age
+        self.max_balance_age = max_balance_age
+        self.limit_timeout = limit_timeout
+        self.slice_interval = slice_interval
+        self.max_slices = max_slices
+        self.max_depth_share = max_depth_share
+        self.depth_levels = depth_levels
+        self.poll_interval = poll_interval
+        self.fill_timeout = fill_timeout
+        self.db_path = db_path
+        self.clock = clock
+        self.sleep = sleep
+        self.stopping = stopping
+        self.records = []
+
+    def _stopped(self):
+        return self.stopping is not None and self.stopping.is_set()
+
+    def balance(self, snapshot, name):
+        if (snapshot is None or name not in snapshot.balances or name in snapshot.changed
+                or self.clock() - snapshot.taken_at > self.max_balance_age):
+            value = float(self.exchange.get_balance(name) or 0)
+            if snapshot is not None:
+                snapshot.balances[name] = value
+                snapshot.changed.discard(name)
+            return value
+        return snapshot.balances[name]
+
+    def orderbook(self, snapshot, market):
+        orderbook = snapshot.orderbooks.get(market) if snapshot is not None else None
+        if orderbook is None or self.clock() * 1000 - orderbook['timestamp'] > self.max_orderbook_age * 1000:
+            orderbook = self.get_orderbook(market)
+            if snapshot is not None:
+                snapshot.orderbooks[market] = orderbook
+        return orderbook
+
+    def buy(self, market, percentage, snapshot=None):
+        """Spends a percentage of the KRW balance on market. Returns the execution record, or None if nothing was ordered."""
+        amount = self.balance(snapshot, "KRW") * (percentage / 100)
+        if amount <= MIN_ORDER_KRW:  # Ensure the order is above the minimum threshold
+            return None
+        return self._execute(market, "buy", amount, snapshot)
+
+    def sell(self, market, percentage, snapshot=None):
+        """Sells a percentage of the market's coin. Returns the execution record, or None if nothing was ordered."""
+        amount = self.balance(snapshot, currency(market)) * (percentage / 100)
+        orderbook = self.orderbook(snapshot, market)
+        if best_price(orderbook, "sell") * amount <= MIN_ORDER_KRW:
+            return None
+        return self._execute(market, "sell", amount, snapshot)
+
+    def _execute(self, market, side, amount, snapshot):
+        orderbook = self.orderbook(snapshot, market)
+        arrival_price = best_price(orderbook, side)
+        started = time.monotonic()
+        if self.mode == "market":
+            orders = self._market(market, side, amount)
+        elif self.mode == "limit":
+            orders = self._limit_then_market(market, side, amount, arrival_price)
+        else:
+            orders = self._sliced(market, side, amount, orderbook)
+        latency = time.monotonic() - started
+        if snapshot is not None:
+            snapshot.changed.update(("KRW", currency(market)))
+
+        volume, funds, fee = summarize_fills(orders)
+        average_price = funds / volume if volume else None
+        sign = 1 if side == "buy" else -1
+        record = {
+            "timestamp": int(self.clock() * 1000),
+            "market": market,
+            "side": side,
+            "mode": self.mode,
+            "requested": amount,
+            "volume": volume,
+            "average_price": average_price,
+            "arrival_price": arrival_price,
+            "slippage_bps": (average_price - arrival_price) / arrival_price * 10000 * sign if average_price else None,
+            "latency_ms": latency * 1000,
+            "orders": len(orders),
+            "fee": fee,
+        }
+        self.records.append(record)
+        if self.db_path is not None:
+            try:
+                decision_store.save_execution(record, self.db_path)
+            except Exception as e:
+                print(f"Error saving execution record: {e}")
+        return record
+
+    def _place(self, method, *args):
+        result = getattr(self.exchange, method)(*args)
+        if not isinstance(result, dict) or 'uuid' not in result:
+            print(f"Order {method} {args} failed: {result}")
+            return None
+        return result['uuid']
+
+    def _wait(self, uuid, timeout):
+        # Polls the order until it is over or the timeout passes, returning the last state seen
+        deadline = time.monotonic() + timeout
+        while True:
+            order = self.exchange.get_order(uuid)
+            if order.get('state') in FINAL_STATES or time.monotonic() >= deadline:
+                return order
+            self.sleep(self.poll_interval)
+
+    def _market(self, market, side, amount):
+        if side == "buy":
+            uuid = self._place("buy_market_order", market, amount * BUY_FEE_ADJUSTMENT)  # Adjust for fees
+        else:
+            uuid = self._place("sell_market_order", market, amount)
+        return [self._wait(uuid, self.fill_timeout)] if uuid else []
+
+    def _limit_then_market(self, market, side, amount, price):
+        # Rests at the touch for limit_timeout seconds; whatever hasn't filled by then is sent at market
+        volume = math.floor((amount * BUY_FEE_ADJUSTMENT / price if side == "buy" else amount) * 1e8) / 1e8
+        uuid = self._place("buy_limit_order" if side == "buy" else "sell_limit_order", market, price, volume)
+        if not uuid:
+            return []
+        order = self._wait(uuid, self.limit_timeout)
+        if order.get('state') not in FINAL_STATES:
+            self.exchange.cancel_order(uuid)
+            order = self._wait(uuid, self.fill_timeout)
+        orders = [order]
+        filled, funds, fee = summarize_fills(orders)
+        remaining = amount - funds - fee if side == "buy" else amount - filled
+        if remaining * (1 if side == "buy" else price) > MIN_ORDER_KRW and not self._stopped():
+            orders += self._market(market, side, remaining)
+        return orders
+
+    def slice_count(self, side, amount, orderbook):
+        """Number of slices so each takes at most max_depth_share of the quoted depth, keeping slices above the minimum."""
+        price = best_price(orderbook, side)
+        volume = amount / price if side == "buy" else amount
+        available = depth(orderbook, side, self.depth_levels) * self.max_depth_share
+        count = math.ceil(volume / available) if available > 0 else self.max_slices
+        # Buy slices are sent less the fee adjustment, which must still leave them at the minimum
+        minimum = MIN_ORDER_KRW / BUY_FEE_ADJUSTMENT if side == "buy" else MIN_ORDER_KRW
+        return max(1, min(count, self.max_slices, int(volume * price // minimum)))
+
+    def _sliced(self, market, side, amount, orderbook):
+        count = self.slice_count(side, amount, orderbook)
+        orders = []
+        for i in range(count):
+            if i:
+                self.sleep(self.slice_interval)
+            if self._stopped():
+                print(f"Stopping: {count - i} of {count} {market} {side} slices not sent")
+                break
+            if self.mode == "twap":
+                orders += self._market(market, side, amount / count)
+            else:
+                # Only one slice is shown at a time, priced at the touch when it is placed
+                price = best_price(self.get_orderbook(market) if i else orderbook, side)
+                orders += self._limit_then_market(market, side, amount / count, price)
+        return orders
+
+def print_records(records):
+    for r in records:
+        slippage = f"{r['slippage_bps']:+.1f} bps" if r['slippage_bps'] is not None else "no fill"
+        print(f"  {r['market']:<9} {r['side']:<4} {r['mode']:<7} {r['volume']:.8f} @ {r['average_price'] or 0:,.0f} "
+              f"(arrival {r['arrival_price']:,.0f}, {slippage}) in {r['latency_ms']:.0f} ms over {r['orders']} orders")
@@ -0,0 +1,110 @@
+import base64
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from prompt_payload import count_tokens
+from image_payload import image_tokens
+
+# A local stand-in for the OpenAI chat completions endpoint, for measuring retry behaviour offline.
+# Point a client at it with OpenAI(base_url=server.base_url, api_key="test").
+
+VALID_DECISION = '{"decision": "hold", "percentage": 0, "reason": "Stand-in response."}'
+
+def _prompt_tokens(messages):
+    # Text is counted as text and images as the API counts them, by size and detail
+    texts = []
+    tokens = 0
+    for message in messages:
+        parts = [message["content"]] if isinstance(message["content"], str) else message["content"]
+        for part in parts:
+            if isinstance(part, str):
+                texts.append(part)
+            elif part.get("type") == "image_url":
+                tokens += _image_tokens(part["image_url"])
+            else:
+                texts.append(part.get("text", ""))
+    return tokens + count_tokens("".join(texts))
+
+def _image_tokens(image_url):
+    from PIL import Image
+    data = base64.b64decode(image_url["url"].split(",", 1)[1])
+    width, height = Image.open(io.BytesIO(data)).size
+    detail = image_url.get("detail", "auto")
+    return image_tokens(width, height, "low" if detail == "low" else "high")
+
+class FakeOpenAIServer:
+    """
+    Parameters:
+    - script (list): One step per request, used in order; the last step repeats. Each step is a dict with
+      'content' (response text), 'status' (HTTP error code instead of a response) and/or 'delay' (seconds).
+    - upload_bytes_per_second (float): Delays each request by its size at this rate, like a slow uplink. Default is none.
+    """
+
+    def __init__(self, script=None, port=0, upload_bytes_per_second=None):
+        self.script = list(script or [{"content": VALID_DECISION}])
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                server._handle(self, body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def _next_step(self):
+        with self._lock:
+            return self.script.pop(0) if len(self.script) > 1 else self.script[0]
+
+    def _handle(self, handler, body):
+        request = json.loads(body)
+        prompt_tokens = _prompt_tokens(request["messages"])
+        step = self._next_step()
+        with self._lock:
+            self.requests.append({"bytes": len(body), "prompt_tokens": prompt_tokens, "step": step})
+        if self.upload_bytes_per_second:
+            time.sleep(len(body) / self.upload_bytes_per_second)
+        time.sleep(step.get("delay", 0))
+        if "status" in step:
+            payload = {"error": {"message": f"Stand-in error {step['status']}", "type": "server_error"}}
+            self._reply(handler, step["status"], payload)
+            return
+        content = step.get("content", VALID_DECISION)
+        self._reply(handler, 200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": count_tokens(content),
+                      "total_tokens": prompt_tokens + count_tokens(content),
+                      "prompt_tokens_details": {"cached_tokens": 0}},
+        })
+
+    def _reply(self, handler, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def total_prompt_tokens(self):
+        return sum(r["prompt_tokens"] for r in self.requests)
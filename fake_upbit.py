@@ -0,0 +1,179 @@
+import copy
+import itertools
+import threading
+import time
+
+# A local stand-in for the order and balance methods of pyupbit.Upbit, for exercising execution.Executor offline.
+# pyupbit calls fixed api.upbit.com URLs, so this replaces the Upbit object itself rather than serving HTTP.
+
+def make_orderbook(market="KRW-BTC", price=92_000_000, tick=1000, size=0.05, levels=15, timestamp=None):
+    """An evenly spaced orderbook in pyupbit.get_orderbook format with the same size at every level."""
+    units = [{"ask_price": price + tick * (i + 1), "bid_price": price - tick * i, "ask_size": size, "bid_size": size}
+             for i in range(levels)]
+    return {"market": market, "timestamp": timestamp or int(time.time() * 1000),
+            "total_ask_size": size * levels, "total_bid_size": size * levels, "orderbook_units": units}
+
+class FakeUpbit:
+    """
+    Parameters:
+    - balances (dict): currency -> balance. Default is 10,000,000 KRW.
+    - orderbooks (dict): market -> orderbook. Market orders walk the levels and take liquidity,
+      which comes back linearly over replenish_seconds.
+    - fee_rate (float): Fee on every fill. Default is 0.0005.
+    - latency (float): Seconds every call takes, like a REST round trip. Default is 0.
+    - limit_fill_seconds (float): A limit order resting at or behind the touch fills completely this long after
+      it was placed. None never fills it. Default is 1.
+    """
+
+    def __init__(self, balances=None, orderbooks=None, fee_rate=0.0005, latency=0.0, limit_fill_seconds=1.0,
+                 replenish_seconds=1.0):
+        self.balances = dict(balances or {"KRW": 10_000_000})
+        self.orderbooks = dict(orderbooks or {"KRW-BTC": make_orderbook()})
+        self.fee_rate = fee_rate
+        self.latency = latency
+        self.limit_fill_seconds = limit_fill_seconds
+        self.replenish_seconds = replenish_seconds
+        self.orders = {}
+        self.calls = []
+        self._taken = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def _call(self, name):
+        self.calls.append(name)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _available(self, market, key, index, now):
+        # Liquidity taken from a level comes back linearly over replenish_seconds
+        taken, at = self._taken.get((market, key, index), (0.0, now))
+        recovered = taken * max(0.0, 1 - (now - at) / self.replenish_seconds) if self.replenish_seconds else 0.0
+        self._taken[(market, key, index)] = (recovered, now)
+        return max(0.0, self.orderbooks[market]['orderbook_units'][index][key] - recovered)
+
+    def _take(self, market, key, index, volume, now):
+        taken, _ = self._taken.get((market, key, index), (0.0, now))
+        self._taken[(market, key, index)] = (taken + volume, now)
+
+    def get_orderbook(self, market):
+        self._call("get_orderbook")
+        with self._lock:
+            now = time.monotonic()
+            orderbook = copy.deepcopy(self.orderbooks[market])
+            for i, unit in enumerate(orderbook['orderbook_units']):
+                unit["ask_size"] = self._available(market, "ask_size", i, now)
+                unit["bid_size"] = self._available(market, "bid_size", i, now)
+            orderbook['timestamp'] = int(time.time() * 1000)
+            return orderbook
+
+    def get_balance(self, ticker="KRW"):
+        self._call("get_balance")
+        return self.balances.get(ticker.split("-")[-1], 0)
+
+    def get_balances(self):
+        self._call("get_balances")
+        return [{"currency": name, "balance": str(balance), "avg_buy_price": "0"} for name, balance in self.balances.items()]
+
+    def _new_order(self, market, side, ord_type, price=None, volume=None):
+        order = {"uuid": f"fake-{next(self._ids)}", "market": market, "side": side, "ord_type": ord_type, "state": "wait",
+                 "price": price, "volume": volume, "remaining_volume": volume, "executed_volume": 0.0, "paid_fee": 0.0,
+                 "trades": [], "created": time.monotonic()}
+        self.orders[order["uuid"]] = order
+        return order
+
+    def _fill(self, order, price, volume):
+        coin = order["market"].split("-")[1]
+        funds = price * volume
+        fee = funds * self.fee_rate
+        if order["side"] == "bid":
+            self.balances["KRW"] -= funds + fee
+            self.balances[coin] = self.balances.get(coin, 0) + volume
+        else:
+            self.balances[coin] -= volume
+            self.balances["KRW"] += funds - fee
+        order["trades"].append({"price": price, "volume": volume, "funds": funds})
+        order["executed_volume"] += volume
+        order["paid_fee"] += fee
+        if order["remaining_volume"] is not None:
+            order["remaining_volume"] -= volume
+
+    def _walk(self, order, funds=None, volume=None, limit=None):
+        # Fills against the book level by level until the funds or volume run out, or the price passes limit
+        market = order["market"]
+        buying = order["side"] == "bid"
+        price_key, size_key = ("ask_price", "ask_size") if buying else ("bid_price", "bid_size")
+        now = time.monotonic()
+        for i, unit in enumerate(self.orderbooks[market]['orderbook_units']):
+            price = unit[price_key]
+            if limit is not None and (price > limit if buying else price < limit):
+                break
+            available = self._available(market, size_key, i, now)
+            take = min(available, volume if volume is not None else funds / (price * (1 + self.fee_rate)))
+            if take <= 0:
+                continue
+            self._take(market, size_key, i, take, now)
+            self._fill(order, price, take)
+            if volume is not None:
+                volume -= take
+                if volume <= 1e-12:
+                    break
+            else:
+                funds -= take * price * (1 + self.fee_rate)
+                if funds <= 1:
+                    break
+
+    def buy_market_order(self, ticker, price):
+        self._call("buy_market_order")
+        with self._lock:
+            if price > self.balances.get("KRW", 0):
+                return {"error": {"name": "insufficient_funds_bid", "message": "주문가능한 금액(KRW)이 부족합니다."}}
+            order = self._new_order(ticker, "bid", "price", price=price)
+            self._walk(order, funds=price)
+            # Like Upbit, a market buy ends as 'cancel' once its leftover funds are returned
+            order["state"] = "cancel"
+            return {key: value for key, value in order.items() if key != "trades"}
+
+    def sell_market_order(self, ticker, volume):
+        self._call("sell_market_order")
+        with self._lock:
+            if volume > self.balances.get(ticker.split("-")[1], 0) + 1e-12:
+                return {"error": {"name": "insufficient_funds_ask", "message": "주문가능한 금액이 부족합니다."}}
+            order = self._new_order(ticker, "ask", "market", volume=volume)
+            self._walk(order, volume=volume)
+            order["state"] = "done"
+            return {key: value for key, value in order.items() if key != "trades"}
+
+    def _limit_order(self, ticker, side, price, volume):
+        with self._lock:
+            order = self._new_order(ticker, side, "limit", price=price, volume=volume)
+            # A limit order that crosses the book fills right away as far as the price allows
+            self._walk(order, volume=volume, limit=price)
+            if order["remaining_volume"] <= 1e-12:
+                order["state"] = "done"
+            return {key: value for key, value in order.items() if key != "trades"}
+
+    def buy_limit_order(self, ticker, price, volume):
+        self._call("buy_limit_order")
+        return self._limit_order(ticker, "bid", price, volume)
+
+    def sell_limit_order(self, ticker, price, volume):
+        self._call("sell_limit_order")
+        return self._limit_order(ticker, "ask", price, volume)
+
+    def get_order(self, uuid):
+        self._call("get_order")
+        with self._lock:
+            order = self.orders[uuid]
+            if (order["state"] == "wait" and self.limit_fill_seconds is not None
+                    and time.monotonic() - order["created"] >= self.limit_fill_seconds):
+                self._fill(order, order["price"], order["remaining_volume"])
+                order["state"] = "done"
+            return copy.deepcopy(order)
+
+    def cancel_order(self, uuid):
+        self._call("cancel_order")
+        with self._lock:
+            order = self.orders[uuid]
+            if order["state"] == "wait":
+                order["state"] = "cancel"
+            return {key: value for key, value in order.items() if key != "trades"}
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Per-host (connect, read) timeouts in seconds and retries of failed GETs; other hosts use DEFAULT_POLICY.
+# POSTs are never retried here, so an order is not placed twice.
+DEFAULT_POLICY = {"timeout": (3.05, 10), "retries": 2}
+HOST_POLICIES = {
+    "serpapi.com": {"timeout": (3.05, 15), "retries": 1},
+    "api.alternative.me": {"timeout": (3.05, 5), "retries": 2},
+    "api.upbit.com": {"timeout": (3.05, 5), "retries": 2},
+    # Retried by llm_response.request_decision, which knows which errors are worth another call
+    "api.openai.com": {"timeout": (5, 120), "retries": 0},
+}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+# HTTP/2 is only available to the OpenAI client (httpx with the h2 package); requests speaks HTTP/1.1
+HTTP2 = os.getenv("HTTP2", "0") == "1"
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf"))
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.total_ms = 0.0
+        self.errors = 0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def record(self, milliseconds, error=False):
+        for i, bound in enumerate(BUCKETS_MS):
+            if milliseconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total_ms += milliseconds
+        self.errors += error
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100), or None without samples."""
+        target = self.count * q / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return None
+
+_histograms = {}
+_lock = threading.Lock()
+
+def record(host, seconds, error=False):
+    with _lock:
+        _histograms.setdefault(host, LatencyHistogram()).record(seconds * 1000, error)
+
+def histograms():
+    with _lock:
+        return dict(_histograms)
+
+def reset_stats():
+    with _lock:
+        _histograms.clear()
+
+def print_stats():
+    for host, histogram in sorted(histograms().items()):
+        print(f"  {host:<20} {histogram.count:5d} requests  {histogram.errors:3d} failed  "
+              f"mean {histogram.total_ms / max(1, histogram.count):7.1f} ms  "
+              f"p50 <={histogram.percentile(50):g} ms  p99 <={histogram.percentile(99):g} ms")
+
+def policy(host):
+    return HOST_POLICIES.get(host, DEFAULT_POLICY)
+
+def _adapter(retries):
+    # A read timeout is not retried: the host already had its full timeout, and retrying would multiply the stall
+    retry = Retry(total=retries, read=0, backoff_factor=0.5, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset({"GET"}), respect_retry_after_header=True, raise_on_status=False)
+    return HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+_session = None
+
+def get_session():
+    """The process-wide session: keep-alive connections are reused across calls and decision cycles."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            session.mount("https://", _adapter(DEFAULT_POLICY["retries"]))
+            session.mount("http://", _adapter(DEFAULT_POLICY["retries"]))
+            for host, host_policy in HOST_POLICIES.items():
+                session.mount(f"https://{host}/", _adapter(host_policy["retries"]))
+            _session = session
+        return _session
+
+def request(method, url, **kwargs):
+    """requests.request through the shared session, with the host's timeout unless one is given, timed per host."""
+    host = urlsplit(url).hostname
+    kwargs.setdefault("timeout", policy(host)["timeout"])
+    started = time.perf_counter()
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except Exception:
+        record(host, time.perf_counter() - started, error=True)
+        raise
+    record(host, time.perf_counter() - started, error=response.status_code >= 400)
+    return response
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+def install_pyupbit():
+    """
+    Routes pyupbit's REST calls through the shared session. pyupbit calls the module-level requests.get/post/delete
+    and has no way to pass a session, so its reference to the requests module is swapped for these functions.
+    """
+    import pyupbit.request_api
+    pyupbit.request_api.requests = SimpleNamespace(get=get, post=post, delete=delete)
+
+def openai_timeout(host="api.openai.com"):
+    import openai
+    connect, read = policy(host)["timeout"]
+    return openai.Timeout(read, connect=connect)
+
+def openai_http_client(host="api.openai.com"):
+    """An httpx client for OpenAI(http_client=...), with pooled connections, optional HTTP/2 and latency recording."""
+    import openai
+    http2 = HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("HTTP2=1 needs the h2 package; using HTTP/1.1")
+            http2 = False
+
+    def on_request(request):
+        request.extensions["started"] = time.perf_counter()
+
+    def on_response(response):
+        # Time to the response headers; the body is streamed after this hook
+        started = response.request.extensions.get("started")
+        if started is not None:
+            record(response.request.url.host, time.perf_counter() - started, error=response.status_code >= 400)
+
+    return openai.DefaultHttpxClient(http2=http2, timeout=openai_timeout(host),
+                                     event_hooks={"request": [on_request], "response": [on_response]})
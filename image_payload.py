@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import io
+import math
+import threading
+import time
+
+# Image formats the vision models accept, by the name PIL saves them under
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+# 'low' is one 512x512 pass for a fixed 85 tokens; 'high' adds 512px tiles of the image scaled to the API's limits
+DETAILS = ("low", "high", "auto")
+
+def mime_type(data):
+    """The MIME type of encoded image bytes, by their signature."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    raise ValueError("Unknown image format")
+
+def model_size(width, height, detail):
+    """
+    The size the API scales an image to before the model sees it: within 512x512 for 'low', otherwise within
+    2048x2048 with the short side at most 768. Pixels beyond this are uploaded and thrown away.
+    """
+    if detail == "low":
+        limits = [512 / max(width, height)]
+    else:
+        limits = [2048 / max(width, height), 768 / min(width, height)]
+    scale = min([1.0] + limits)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def image_tokens(width, height, detail):
+    """Prompt tokens of an image: 85, plus 170 per 512px tile at the model size unless detail is 'low'."""
+    if detail == "low":
+        return 85
+    width, height = model_size(width, height, "high")
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+def trim_box(image, tolerance=8):
+    """The bounding box of the image without uniform margins of its corner colour, or None when there are none."""
+    from PIL import Image, ImageChops
+    rgb = image.convert("RGB")
+    difference = ImageChops.difference(rgb, Image.new("RGB", rgb.size, rgb.getpixel((0, 0))))
+    box = difference.convert("L").point(lambda value: 255 if value > tolerance else 0).getbbox()
+    return box if box and box != (0, 0) + rgb.size else None
+
+class ChartImage:
+    """
+    An encoded chart image with its message content part, built once and reused by every retry of a request.
+    Attributes: data (bytes), mime (str), width, height (int), detail (str), tokens (int), encode_seconds (float).
+    """
+
+    def __init__(self, data, width, height, detail, encode_seconds=0.0):
+        self.data = data
+        self.mime = mime_type(data)
+        self.width = width
+        self.height = height
+        self.detail = detail
+        self.tokens = image_tokens(width, height, detail)
+        self.encode_seconds = encode_seconds
+        self.content = {"type": "image_url", "image_url": {
+            "url": f"data:{self.mime};base64,{base64.b64encode(data).decode('ascii')}", "detail": detail}}
+
+    def __len__(self):
+        return len(self.data)
+
+def prepare(data, image_format="jpeg", quality=80, detail="high", crop=None, trim=True):
+    """
+    Crops, downsamples and encodes a chart image for the vision input.
+    Parameters:
+    - data (bytes): The captured or rendered image, in any format PIL reads.
+    - image_format (str): 'jpeg', 'webp' or 'png'. Default is 'jpeg'.
+    - quality (int): JPEG/WebP quality (1-100). Ignored for PNG.
+    - detail (str): 'low', 'high' or 'auto'; the image is scaled to what the model sees at that detail.
+    - crop (tuple): (left, top, right, bottom) box of the chart region. Default is the whole image.
+    - trim (bool): Also cut uniform margins around the chart. Default is True.
+    Returns:
+    - ChartImage
+    """
+    if image_format not in MIME_TYPES:
+        raise ValueError(f"image_format must be one of {', '.join(MIME_TYPES)}, got {image_format!r}")
+    if detail not in DETAILS:
+        raise ValueError(f"detail must be one of {', '.join(DETAILS)}, got {detail!r}")
+    from PIL import Image
+    started = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    box = crop or (trim_box(image) if trim else None)
+    if crop and trim:
+        inner = trim_box(image.crop(crop))
+        box = (crop[0] + inner[0], crop[1] + inner[1], crop[0] + inner[2], crop[1] + inner[3]) if inner else crop
+    if box:
+        image = image.crop(box)
+    size = model_size(*image.size, detail)
+    if size == image.size and not box and mime_type(data) == MIME_TYPES[image_format]:
+        # Already what would be sent; re-encoding would only lose quality
+        return ChartImage(data, *size, detail, time.perf_counter() - started)
+    if size != image.size:
+        # reducing_gap first shrinks by whole factors, which is much faster and looks the same at these scales
+        image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    if image_format != "png":
+        # Neither JPEG nor our WebP settings keep transparency, and screenshots have none worth keeping
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    if image_format == "jpeg":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    elif image_format == "webp":
+        # method 2 is within 10% of the smallest output at a fifth of the time of method 6
+        image.save(buffer, format="WEBP", quality=quality, method=2)
+    else:
+        image.save(buffer, format="PNG")
+    return ChartImage(buffer.getvalue(), *size, detail, time.perf_counter() - started)
+
+class ImageCache:
+    """
+    Prepared images by content and settings, so an image shared by several markets or requests in a cycle is
+    encoded once. Cleared at the start of every cycle.
+    """
+
+    def __init__(self):
+        self._images = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def prepare(self, data, **options):
+        key = (hashlib.sha1(data).hexdigest(), tuple(sorted(options.items())))
+        with self._lock:
+            image = self._images.get(key)
+            self.stats["hits" if image else "misses"] += 1
+        if image is None:
+            image = prepare(data, **options)
+            with self._lock:
+                self._images[key] = image
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
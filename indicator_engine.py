@@ -0,0 +1,303 @@
+import copy
+import json
+import math
+import os
+import threading
+from collections import deque
+import numpy as np
+
+STATE_DIR = 'indicator_state'
+NAN = float('nan')
+
+# Output columns in the same order add_indicators produced them
+COLUMNS = ['SMA_10', 'EMA_10', 'RSI_14', 'STOCHk_14_3_3', 'STOCHd_14_3_3',
+           'MACD', 'Signal_Line', 'MACD_Histogram', 'Middle_Band', 'Upper_Band', 'Lower_Band']
+
+class RollingStats:
+    """Rolling mean and sample variance over a fixed window, updated in O(1) (Welford)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        if len(self.values) < self.window:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values.popleft()
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+
+    def ready(self):
+        return len(self.values) == self.window
+
+    def sma(self):
+        return self.mean if self.ready() else NAN
+
+    def std(self):
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1)) if self.ready() else NAN
+
+    def to_state(self):
+        return {"values": list(self.values), "mean": self.mean, "m2": self.m2}
+
+    def load_state(self, state):
+        self.values = deque(state["values"])
+        self.mean = state["mean"]
+        self.m2 = state["m2"]
+
+class RollingExtreme:
+    """Rolling min or max over a fixed window using a monotonic deque (amortised O(1))."""
+
+    def __init__(self, window, is_max):
+        self.window = window
+        self.is_max = is_max
+        self.count = 0
+        self.candidates = deque()  # (position, value)
+
+    def update(self, x):
+        while self.candidates and (self.candidates[-1][1] <= x if self.is_max else self.candidates[-1][1] >= x):
+            self.candidates.pop()
+        self.candidates.append((self.count, x))
+        if self.candidates[0][0] <= self.count - self.window:
+            self.candidates.popleft()
+        self.count += 1
+
+    def value(self):
+        return self.candidates[0][1] if self.count >= self.window else NAN
+
+    def to_state(self):
+        return {"count": self.count, "candidates": [list(c) for c in self.candidates]}
+
+    def load_state(self, state):
+        self.count = state["count"]
+        self.candidates = deque(tuple(c) for c in state["candidates"])
+
+class Ewm:
+    """
+    Exponentially weighted mean matching pandas' ewm().mean().
+    - adjust=False seeds with the first value, like Series.ewm(span=..., adjust=False).
+    - adjust=True keeps weighted sums, like Series.ewm(alpha=..., min_periods=...) used by pandas_ta's RSI.
+    - presma seeds with the SMA of the first `length` values, like pandas_ta.ema.
+    """
+
+    def __init__(self, alpha, adjust=False, min_periods=1, presma_length=None):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = min_periods
+        self.presma_length = presma_length
+        self.count = 0
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.mean = NAN
+
+    def update(self, x):
+        if math.isnan(x):
+            return
+        self.count += 1
+        if self.presma_length and self.count <= self.presma_length:
+            # Accumulate the seed average; the EMA starts once it's complete
+            self.numerator += x
+            if self.count == self.presma_length:
+                self.mean = self.numerator / self.presma_length
+            return
+        if self.adjust:
+            decay = 1 - self.alpha
+            self.numerator = x + decay * self.numerator
+            self.denominator = 1 + decay * self.denominator
+            self.mean = self.numerator / self.denominator
+        elif math.isnan(self.mean):
+            self.mean = x
+        else:
+            self.mean = self.alpha * x + (1 - self.alpha) * self.mean
+
+    def value(self):
+        return self.mean if self.count >= self.min_periods else NAN
+
+    def to_state(self):
+        return {"count": self.count, "numerator": self.numerator, "denominator": self.denominator, "mean": self.mean}
+
+    def load_state(self, state):
+        self.count = state["count"]
+        self.numerator = state["numerator"]
+        self.denominator = state["denominator"]
+        self.mean = state["mean"]
+
+class IndicatorEngine:
+    """
+    Keeps running state for the indicators in add_indicators and updates them in constant time per candle.
+    Parameters:
+    - history (int): Number of output rows to keep for building prompts. Default is 200.
+    """
+
+    def __init__(self, history=200):
+        self.last_ts = None
+        self.prev_close = NAN
+        self.sma_10 = RollingStats(10)
+        self.ema_10 = Ewm(2 / 11, min_periods=10, presma_length=10)
+        self.rsi_gain = Ewm(1 / 14, adjust=True, min_periods=14)
+        self.rsi_loss = Ewm(1 / 14, adjust=True, min_periods=14)
+        self.stoch_low = RollingExtreme(14, is_max=False)
+        self.stoch_high = RollingExtreme(14, is_max=True)
+        self.stoch_k = RollingStats(3)
+        self.stoch_d = RollingStats(3)
+        self.macd_fast = Ewm(2 / 13)
+        self.macd_slow = Ewm(2 / 27)
+        self.macd_signal = Ewm(2 / 10)
+        self.bollinger = RollingStats(20)
+        self.history = deque(maxlen=history)
+
+    def _parts(self):
+        return {
+            "sma_10": self.sma_10, "ema_10": self.ema_10, "rsi_gain": self.rsi_gain, "rsi_loss": self.rsi_loss,
+            "stoch_low": self.stoch_low, "stoch_high": self.stoch_high, "stoch_k": self.stoch_k,
+            "stoch_d": self.stoch_d, "macd_fast": self.macd_fast, "macd_slow": self.macd_slow,
+            "macd_signal": self.macd_signal, "bollinger": self.bollinger,
+        }
+
+    def update(self, ts, high, low, close):
+        """Adds a closed candle and returns its indicator values in COLUMNS order."""
+        self.sma_10.update(close)
+        self.ema_10.update(close)
+
+        # RSI (Wilder smoothing of gains and losses, as pandas_ta.rsi)
+        change = close - self.prev_close
+        self.rsi_gain.update(max(change, 0.0) if not math.isnan(change) else NAN)
+        self.rsi_loss.update(max(-change, 0.0) if not math.isnan(change) else NAN)
+        gain, loss = self.rsi_gain.value(), self.rsi_loss.value()
+        rsi = 100 * gain / (gain + loss) if gain + loss > 0 else NAN
+        self.prev_close = close
+
+        # Stochastic Oscillator (14, 3, 3)
+        self.stoch_low.update(low)
+        self.stoch_high.update(high)
+        lowest, highest = self.stoch_low.value(), self.stoch_high.value()
+        stoch_k = stoch_d = NAN
+        if not math.isnan(lowest):
+            price_range = highest - lowest
+            raw = 100 * (close - lowest) / (price_range if price_range != 0 else 2.220446049250313e-16)
+            self.stoch_k.update(raw)
+            stoch_k = self.stoch_k.sma()
+            if not math.isnan(stoch_k):
+                self.stoch_d.update(stoch_k)
+                stoch_d = self.stoch_d.sma()
+
+        # MACD
+        self.macd_fast.update(close)
+        self.macd_slow.update(close)
+        macd = self.macd_fast.value() - self.macd_slow.value()
+        self.macd_signal.update(macd)
+        signal = self.macd_signal.value()
+
+        # Bollinger Bands
+        self.bollinger.update(close)
+        middle = self.bollinger.sma()
+        std_dev = self.bollinger.std()
+
+        row = (self.sma_10.sma(), self.ema_10.value(), rsi, stoch_k, stoch_d,
+               macd, signal, macd - signal, middle, middle + std_dev * 2, middle - std_dev * 2)
+        self.last_ts = ts
+        self.history.append((ts, row))
+        return row
+
+    def preview(self, ts, high, low, close):
+        """Indicator values for a candle that is still forming, without changing the state."""
+        # Copy only the running state; the output history isn't needed for one update
+        history, self.history = self.history, deque(maxlen=1)
+        try:
+            scratch = copy.deepcopy(self)
+        finally:
+            self.history = history
+        return scratch.update(ts, high, low, close)
+
+    def to_state(self):
+        state = {name: part.to_state() for name, part in self._parts().items()}
+        state.update({"last_ts": self.last_ts, "prev_close": self.prev_close,
+                      "history_size": self.history.maxlen, "history": [[ts, list(row)] for ts, row in self.history]})
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        engine = cls(history=state["history_size"])
+        for name, part in engine._parts().items():
+            part.load_state(state[name])
+        engine.last_ts = state["last_ts"]
+        engine.prev_close = state["prev_close"]
+        engine.history.extend((ts, tuple(row)) for ts, row in state["history"])
+        return engine
+
+    def run(self, df):
+        """Feeds every row of an OHLCV frame and returns the indicator columns for them."""
+        import pandas as pd
+        ts = df.index.values.astype('datetime64[s]').astype(np.int64)
+        rows = [self.update(t, h, l, c) for t, h, l, c in
+                zip(ts.tolist(), df['high'].tolist(), df['low'].tolist(), df['close'].tolist())]
+        return pd.DataFrame(rows, index=df.index, columns=COLUMNS)
+
+def _state_path(ticker, interval, state_dir):
+    return os.path.join(state_dir, f"{ticker}_{interval}.json")
+
+def load_engine(ticker, interval, state_dir=STATE_DIR):
+    try:
+        with open(_state_path(ticker, interval, state_dir), "r", encoding="utf-8") as file:
+            return IndicatorEngine.from_state(json.load(file))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error loading indicator state, rebuilding: {e}")
+        return None
+
+def save_engine(engine, ticker, interval, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    path = _state_path(ticker, interval, state_dir)
+    # Write to a temporary file first so a crash never leaves a half-written state
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(engine.to_state(), file)
+    os.replace(path + ".tmp", path)
+
+# Engines by (ticker, interval, state directory), so steady-state cycles don't read their state back from disk
+_engines = {}
+_engines_lock = threading.Lock()
+
+def add_indicators(df, ticker, interval, state_dir=STATE_DIR):
+    """
+    Returns df with the add_indicators columns, updating the saved engine state with any newly closed candles.
+    The last row is treated as the forming candle: it is previewed but not committed to the state.
+    """
+    import pandas as pd
+    key = (ticker, interval, os.path.abspath(state_dir))
+    ts = df.index.values.astype('datetime64[s]').astype(np.int64).tolist()
+    with _engines_lock:
+        engine = _engines.pop(key, None)
+    if engine is None:
+        engine = load_engine(ticker, interval, state_dir)
+    known = dict(engine.history) if engine else {}
+    changed = False
+    # Rebuild from this frame when there is no state, or when the saved state doesn't line up with it
+    # (e.g. the bot was stopped for longer than the frame covers)
+    if engine is None or engine.last_ts not in ts[:-1] or any(t not in known for t in ts[:-1] if t <= engine.last_ts):
+        engine = IndicatorEngine(history=max(200, len(df)))
+        known = {}
+
+    highs, lows, closes = df['high'].tolist(), df['low'].tolist(), df['close'].tolist()
+    rows = []
+    for i, t in enumerate(ts):
+        if i == len(ts) - 1:
+            rows.append(engine.preview(t, highs[i], lows[i], closes[i]))
+        elif engine.last_ts is not None and t <= engine.last_ts:
+            rows.append(known[t])
+        else:
+            rows.append(engine.update(t, highs[i], lows[i], closes[i]))
+            changed = True
+    # The file only changes when a candle closed; the forming one isn't part of the state
+    if changed or not os.path.exists(_state_path(ticker, interval, state_dir)):
+        save_engine(engine, ticker, interval, state_dir)
+    with _engines_lock:
+        _engines[key] = engine
+    return df.join(pd.DataFrame(rows, index=df.index, columns=COLUMNS))
@@ -0,0 +1,141 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Vectorised NumPy versions of the indicators in add_indicators, matching pandas_ta and pandas' ewm/rolling.
+# Only NumPy is imported so processes that don't need pandas_ta stay light.
+
+# Largest growth factor allowed inside one chunk of the exponential filters
+_MAX_GROWTH = 1e10
+
+def _decay_filter(values, decay, initial=0.0):
+    """s[t] = decay * s[t-1] + values[t], with s[-1] = initial, solved in closed form chunk by chunk."""
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    if count == 0:
+        return values.copy()
+    chunk = min(count, max(1, int(np.log(_MAX_GROWTH) / -np.log(decay)))) if 0 < decay < 1 else count
+    chunks = -(-count // chunk)
+    padded = np.zeros(chunks * chunk)
+    padded[:count] = values
+    powers = decay ** np.arange(1, chunk + 1)
+    # Within a chunk: s[j] = decay^(j+1) * (carry + sum_{i<=j} values[i] / decay^(i+1))
+    sums = np.cumsum(padded.reshape(chunks, chunk) / powers, axis=1)
+    # Only the carry between chunks is sequential
+    carries = np.empty(chunks)
+    carry = initial
+    for i, total in enumerate(sums[:, -1].tolist()):
+        carries[i] = carry
+        carry = powers[-1] * (carry + total)
+    return (powers * (carries[:, None] + sums)).ravel()[:count]
+
+def _first_valid(values):
+    valid = np.flatnonzero(~np.isnan(values))
+    return valid[0] if len(valid) else len(values)
+
+def ewm_mean(values, alpha, adjust=False, min_periods=0):
+    """Same as pd.Series(values).ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean() for series whose NaNs are all leading."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    start = _first_valid(values)
+    valid = values[start:]
+    if len(valid) == 0:
+        return result
+    decay = 1 - alpha
+    if adjust:
+        weights = _decay_filter(np.ones(len(valid)), decay)
+        result[start:] = _decay_filter(valid, decay) / weights
+    else:
+        result[start:] = _decay_filter(alpha * valid, decay, initial=valid[0])
+    result[start:start + max(min_periods, 1) - 1] = np.nan
+    return result
+
+def _rolling(values, length, reducer):
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if len(values) >= length:
+        result[length - 1:] = reducer(sliding_window_view(values, length), axis=1)
+    return result
+
+def rolling_mean(values, length):
+    return _rolling(values, length, np.mean)
+
+def rolling_std(values, length):
+    return _rolling(values, length, lambda windows, axis: windows.std(axis=axis, ddof=1))
+
+def rolling_min(values, length):
+    return _rolling(values, length, np.min)
+
+def rolling_max(values, length):
+    return _rolling(values, length, np.max)
+
+def sma(close, length=10):
+    return rolling_mean(close, length)
+
+def ema(close, length=10):
+    """pandas_ta.ema: seeded with the SMA of the first `length` closes."""
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) < length:
+        return np.full(len(close), np.nan)
+    seeded = close.copy()
+    seeded[:length - 1] = np.nan
+    seeded[length - 1] = close[:length].mean()
+    return ewm_mean(seeded, 2 / (length + 1))
+
+def rsi(close, length=14):
+    """pandas_ta.rsi: Wilder's smoothing of gains and losses."""
+    close = np.asarray(close, dtype=np.float64)
+    change = np.concatenate([[np.nan], np.diff(close)])
+    gain = ewm_mean(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), 1 / length, adjust=True, min_periods=length)
+    loss = ewm_mean(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), 1 / length, adjust=True, min_periods=length)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100 * gain / (gain + loss)
+
+def stoch(high, low, close, k=14, d=3, smooth_k=3):
+    """pandas_ta.stoch: returns (STOCHk, STOCHd)."""
+    lowest = rolling_min(low, k)
+    highest = rolling_max(high, k)
+    price_range = highest - lowest
+    if np.any(price_range == 0):
+        price_range = price_range + np.finfo(float).eps
+    raw = 100 * (np.asarray(close, dtype=np.float64) - lowest) / price_range
+    stoch_k = np.full(len(raw), np.nan)
+    start = _first_valid(raw)
+    stoch_k[start:] = rolling_mean(raw[start:], smooth_k)
+    stoch_d = np.full(len(raw), np.nan)
+    start = _first_valid(stoch_k)
+    stoch_d[start:] = rolling_mean(stoch_k[start:], d)
+    return stoch_k, stoch_d
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD from pandas ewm(span=..., adjust=False): returns (MACD, Signal_Line, MACD_Histogram)."""
+    line = ewm_mean(close, 2 / (fast + 1)) - ewm_mean(close, 2 / (slow + 1))
+    signal_line = ewm_mean(line, 2 / (signal + 1))
+    return line, signal_line, line - signal_line
+
+def bollinger_bands(close, length=20, num_std=2):
+    """Returns (Middle_Band, Upper_Band, Lower_Band)."""
+    middle = rolling_mean(close, length)
+    std_dev = rolling_std(close, length)
+    return middle, middle + std_dev * num_std, middle - std_dev * num_std
+
+def add_indicators(df, sma_length=10, ema_length=10, rsi_length=14, bb_length=20):
+    """Returns a copy of an OHLCV DataFrame with the same indicator columns add_indicators used to add."""
+    close = df['close'].to_numpy(dtype=np.float64)
+    high = df['high'].to_numpy(dtype=np.float64)
+    low = df['low'].to_numpy(dtype=np.float64)
+    stoch_k, stoch_d = stoch(high, low, close)
+    macd_line, signal_line, histogram = macd(close)
+    middle, upper, lower = bollinger_bands(close, bb_length)
+    return df.assign(**{
+        f'SMA_{sma_length}': sma(close, sma_length),
+        f'EMA_{ema_length}': ema(close, ema_length),
+        f'RSI_{rsi_length}': rsi(close, rsi_length),
+        'STOCHk_14_3_3': stoch_k,
+        'STOCHd_14_3_3': stoch_d,
+        'MACD': macd_line,
+        'Signal_Line': signal_line,
+        'MACD_Histogram': histogram,
+        'Middle_Band': middle,
+        'Upper_Band': upper,
+        'Lower_Band': lower,
+    })
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# 'record' returns cached responses and stores new ones, 'replay' only reads the cache (a miss is an error),
+# 'passthrough' always calls the model and stores nothing
+MODES = ("record", "replay", "passthrough")
+
+class CacheMiss(LookupError):
+    pass
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def cache_key(model, messages, **options):
+    """
+    Content address of a request: a hash of the model, the request options and the hash of each message,
+    so the instructions, every prompt section and the chart image all take part.
+    """
+    return _digest({"model": model, "options": options, "messages": [_digest(message) for message in messages]})
+
+class LLMCache:
+    """
+    On-disk cache of model responses keyed by request content.
+    Parameters:
+    - path (str): Directory of the cache. One JSON file per response.
+    - mode (str): 'record', 'replay' or 'passthrough'. Default is 'record'.
+    - max_bytes (int): Least recently used responses are evicted beyond this size. Default is 100 MB.
+    """
+
+    def __init__(self, path="llm_cache", mode="record", max_bytes=100 * 1024 * 1024):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._sizes = None
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key + ".json")
+
+    def _index(self):
+        # Sizes of the stored responses, read from disk the first time they are needed
+        if self._sizes is None:
+            self._sizes = {}
+            if os.path.isdir(self.path):
+                for directory in os.scandir(self.path):
+                    if directory.is_dir():
+                        for entry in os.scandir(directory.path):
+                            if entry.name.endswith(".json"):
+                                self._sizes[entry.name[:-5]] = entry.stat().st_size
+        return self._sizes
+
+    def get(self, key):
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # The modification time doubles as the last-used time for eviction
+        try:
+            os.utime(self._file(key))
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        file_path = self._file(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False)
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temp_path, file_path)
+        with self._lock:
+            self._index()[key] = len(data.encode("utf-8"))
+            self.stats["stores"] += 1
+            self._evict()
+
+    def _evict(self):
+        sizes = self._index()
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        def last_used(key):
+            try:
+                return os.stat(self._file(key)).st_mtime
+            except OSError:
+                return 0
+        for key in sorted(sizes, key=last_used):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._file(key))
+            except OSError:
+                pass
+            total -= sizes.pop(key)
+            self.stats["evictions"] += 1
+
+    def complete(self, model, messages, call, **options):
+        """
+        Returns the response content for a request, from the cache or from call() depending on the mode.
+        Parameters:
+        - model (str), messages (list), options: The request, used for the key.
+        - call (callable): Sends the request and returns the response content.
+        Raises:
+        - CacheMiss: in replay mode when the request has not been recorded.
+        """
+        if self.mode == "passthrough":
+            return call()
+        key = cache_key(model, messages, **options)
+        entry = self.get(key)
+        with self._lock:
+            self.stats["hits" if entry else "misses"] += 1
+        if entry:
+            return entry["content"]
+        if self.mode == "replay":
+            raise CacheMiss(f"No recorded response for request {key[:12]}")
+        content = call()
+        self.put(key, {"model": model, "created": int(time.time()), "content": content})
+        return content
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def print_stats(self):
+        print(f"LLM cache ({self.mode}): {self.stats['hits']} hits, {self.stats['misses']} misses "
+              f"({self.hit_rate():.0%}), {self.stats['stores']} stored, {self.stats['evictions']} evicted")
@@ -0,0 +1,112 @@
+import json
+import random
+import time
+import openai
+import tracing
+
+DECISIONS = ("buy", "sell", "hold")
+
+# Short system prompt for repair requests; the full instructions and data are not resent
+REPAIR_INSTRUCTIONS = (
+    "Fix the following trading decision so it is a single JSON object with exactly these keys: "
+    '"decision" ("buy", "sell" or "hold"), "percentage" (number from 0 to 100) and "reason" (non-empty string). '
+    "Keep the original intent. Respond with the JSON object only."
+)
+
+class DecisionValidationError(ValueError):
+    pass
+
+def validate_decision(content):
+    """
+    Parses and checks a model response against the decision schema.
+    Returns:
+    - dict: {'decision': str, 'percentage': float, 'reason': str}
+    Raises:
+    - DecisionValidationError: if the response is not valid JSON or doesn't match the schema.
+    """
+    try:
+        data = json.loads(content) if isinstance(content, str) else content
+    except (TypeError, json.JSONDecodeError) as e:
+        raise DecisionValidationError(f"Response is not valid JSON: {e}")
+    if not isinstance(data, dict):
+        raise DecisionValidationError("Response is not a JSON object")
+    decision = str(data.get("decision", "")).strip().lower()
+    if decision not in DECISIONS:
+        raise DecisionValidationError(f"'decision' must be one of {', '.join(DECISIONS)}, got {data.get('decision')!r}")
+    percentage = data.get("percentage", 0 if decision == "hold" else None)
+    try:
+        percentage = float(str(percentage).rstrip("%"))
+    except (TypeError, ValueError):
+        raise DecisionValidationError(f"'percentage' must be a number, got {data.get('percentage')!r}")
+    if not 0 <= percentage <= 100:
+        raise DecisionValidationError(f"'percentage' must be between 0 and 100, got {percentage}")
+    reason = data.get("reason")
+    if not isinstance(reason, str) or not reason.strip():
+        raise DecisionValidationError("'reason' must be a non-empty string")
+    return {"decision": decision, "percentage": percentage, "reason": reason}
+
+def is_transient_error(error):
+    """Errors worth retrying: network problems, timeouts, rate limits and server errors."""
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+def backoff_delay(attempt, base_seconds=0.5, max_seconds=8.0):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+def request_decision(call, repair=None, max_attempts=5, max_repairs=2, deadline_seconds=60, sleep=time.sleep):
+    """
+    Gets a validated decision from the model.
+    Parameters:
+    - call (callable): Sends the full prompt and returns the response content. Errors are raised, not swallowed.
+    - repair (callable): (content, error_message) -> content. Sends a short repair request for a malformed response.
+    - max_attempts (int): Maximum full requests. Only transient errors are retried.
+    - max_repairs (int): Maximum repair requests per full request.
+    - deadline_seconds (float): Stop retrying once this much time has passed, so a decision isn't held back.
+    - sleep (callable): Used for backoff; replaceable in tests.
+    Returns:
+    - dict or None: The validated decision, or None if none could be obtained.
+    """
+    started = time.monotonic()
+    for attempt in range(max_attempts):
+        try:
+            content = call()
+        except Exception as e:
+            if not is_transient_error(e):
+                print(f"Model request failed and is not retryable: {e}")
+                return None
+            delay = backoff_delay(attempt)
+            if attempt + 1 >= max_attempts or time.monotonic() - started + delay > deadline_seconds:
+                print(f"Model request failed: {e}. No time left to retry.")
+                return None
+            print(f"Model request failed: {e}. Retrying in {delay:.1f} seconds...")
+            sleep(delay)
+            continue
+
+        for repair_attempt in range(max_repairs + 1):
+            try:
+                with tracing.span("parse", attempt=attempt, repair=repair_attempt):
+                    return validate_decision(content)
+            except DecisionValidationError as e:
+                if repair is None or repair_attempt == max_repairs or time.monotonic() - started > deadline_seconds:
+                    print(f"Invalid decision from model: {e}")
+                    break
+                print(f"Invalid decision from model: {e}. Asking for a repair...")
+                try:
+                    content = repair(content, str(e))
+                except Exception as repair_error:
+                    print(f"Repair request failed: {repair_error}")
+                    break
+        # A fresh full request can still produce a valid answer when repairs didn't help
+        if time.monotonic() - started > deadline_seconds:
+            return None
+    return None
+
+def repair_messages(content, error_message):
+    return [
+        {"role": "system", "content": REPAIR_INSTRUCTIONS},
+        {"role": "user", "content": f"Problem: {error_message}\nResponse to fix:\n{content}"},
+    ]
@@ -0,0 +1,217 @@
+import json
+import threading
+import time
+from collections import deque
+import pyupbit
+
+STREAM_TYPES = ("ticker", "orderbook", "trade")
+
+class ReplaySource:
+    """
+    Plays back messages recorded with record_messages, with the same get/terminate interface as
+    pyupbit.WebSocketManager, so the feed can run offline.
+    Parameters:
+    - path (str): JSON Lines file of recorded messages.
+    - stream_type (str): Only replay messages of this type.
+    - speed (float): Playback speed relative to the recorded timing. 0 replays as fast as possible.
+    """
+
+    def __init__(self, path, stream_type, speed=0):
+        with open(path, "r", encoding="utf-8") as file:
+            self.messages = [m for m in map(json.loads, file) if m.get("type") == stream_type]
+        self.speed = speed
+        self.position = 0
+        self.finished = threading.Event()
+
+    def get(self):
+        if self.position >= len(self.messages):
+            self.finished.set()
+            # Block like a quiet socket would, until terminated
+            while True:
+                time.sleep(3600)
+        message = self.messages[self.position]
+        if self.speed and self.position > 0:
+            gap = (message["timestamp"] - self.messages[self.position - 1]["timestamp"]) / 1000
+            time.sleep(max(0, gap / self.speed))
+        self.position += 1
+        return message
+
+    def terminate(self):
+        pass
+
+def websocket_source(stream_type, codes):
+    return pyupbit.WebSocketManager(stream_type, codes)
+
+def to_rest_orderbook(message):
+    """Converts a WebSocket orderbook message to the format returned by pyupbit.get_orderbook."""
+    return {
+        "market": message["code"],
+        "timestamp": message["timestamp"],
+        "total_ask_size": message["total_ask_size"],
+        "total_bid_size": message["total_bid_size"],
+        "orderbook_units": message["orderbook_units"],
+    }
+
+class MarketFeed:
+    """
+    Background service that keeps the latest ticker/orderbook/trade messages and rolling candles in memory.
+    Parameters:
+    - codes (list): Markets to subscribe to, e.g. ["KRW-BTC"].
+    - source_factory (callable): (stream_type, codes) -> object with get() and terminate().
+      Default opens pyupbit WebSocket streams.
+    - candle_seconds (int): Candle length built from trades. Default is 60.
+    - max_candles (int): Number of candles kept per market. Default is 1440 (one day of minutes).
+    """
+
+    def __init__(self, codes, source_factory=websocket_source, candle_seconds=60, max_candles=1440):
+        self.codes = list(codes)
+        self.source_factory = source_factory
+        self.candle_seconds = candle_seconds
+        self.max_candles = max_candles
+        self._lock = threading.Lock()
+        self._latest = {stream_type: {} for stream_type in STREAM_TYPES}
+        self._candles = {code: deque(maxlen=max_candles) for code in self.codes}
+        self._listeners = []
+        self._sources = []
+        self._running = False
+        self.message_count = 0
+
+    def start(self):
+        self._running = True
+        for stream_type in STREAM_TYPES:
+            source = self.source_factory(stream_type, self.codes)
+            self._sources.append(source)
+            threading.Thread(target=self._read, args=(source,), name=f"feed-{stream_type}", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        for source in self._sources:
+            try:
+                source.terminate()
+            except Exception as e:
+                print(f"Error stopping market feed: {e}")
+        self._sources = []
+
+    def _read(self, source):
+        while self._running:
+            try:
+                message = source.get()
+            except Exception as e:
+                print(f"Market feed error: {e}")
+                time.sleep(1)
+                continue
+            if not isinstance(message, dict):
+                # pyupbit puts 'ConnectionClosedError' on the queue and reconnects by itself
+                print(f"Market feed message: {message}")
+                continue
+            self._handle(message)
+
+    def _handle(self, message):
+        stream_type = message.get("type")
+        code = message.get("code")
+        with self._lock:
+            self._latest[stream_type][code] = (time.monotonic(), message)
+            if stream_type == "trade" and code in self._candles:
+                self._add_trade(self._candles[code], message)
+            self.message_count += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(stream_type, message)
+            except Exception as e:
+                print(f"Market feed listener error: {e}")
+
+    def _add_trade(self, candles, trade):
+        price = trade["trade_price"]
+        volume = trade["trade_volume"]
+        start = trade["trade_timestamp"] // 1000 // self.candle_seconds * self.candle_seconds
+        if candles and candles[-1]["ts"] == start:
+            candle = candles[-1]
+            candle["high"] = max(candle["high"], price)
+            candle["low"] = min(candle["low"], price)
+            candle["close"] = price
+            candle["volume"] += volume
+        elif not candles or candles[-1]["ts"] < start:
+            candles.append({"ts": start, "open": price, "high": price, "low": price, "close": price, "volume": volume})
+
+    def seed_candles(self, code, candles):
+        """
+        Adds historical candles (dicts with ts/open/high/low/close/volume, oldest first) before the ones built
+        from trades, so triggers have their full lookback as soon as the feed starts.
+        """
+        with self._lock:
+            live = self._candles[code]
+            first = live[0]["ts"] if live else None
+            older = [dict(candle) for candle in candles if first is None or candle["ts"] < first]
+            room = self.max_candles - len(live)
+            if room > 0:
+                live.extendleft(reversed(older[-room:]))
+
+    def add_listener(self, callback):
+        """callback(stream_type, message) runs on the feed thread after each message."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def latest(self, stream_type, code, max_age=None):
+        """The latest message of a type for a market, or None if there is none newer than max_age seconds."""
+        with self._lock:
+            entry = self._latest[stream_type].get(code)
+        if entry is None or (max_age is not None and time.monotonic() - entry[0] > max_age):
+            return None
+        return entry[1]
+
+    def get_orderbook(self, code, max_age=5):
+        message = self.latest("orderbook", code, max_age)
+        return to_rest_orderbook(message) if message else None
+
+    def get_price(self, code, max_age=5):
+        message = self.latest("ticker", code, max_age)
+        return message["trade_price"] if message else None
+
+    def get_candles(self, code):
+        """Copies of the rolling candles built from trades, oldest first."""
+        with self._lock:
+            return [dict(candle) for candle in self._candles[code]]
+
+def get_orderbook(ticker, feed=None, max_age=5):
+    """Reads the orderbook from a running feed, falling back to a REST call when it is missing or stale."""
+    if feed is not None:
+        orderbook = feed.get_orderbook(ticker, max_age)
+        if orderbook is not None:
+            return orderbook
+    return pyupbit.get_orderbook(ticker=ticker)
+
+def get_orderbooks(tickers, feed=None, max_age=5):
+    """Orderbooks by ticker, from the feed where fresh; the rest come from a single REST call for all of them."""
+    orderbooks = {}
+    if feed is not None:
+        for ticker in tickers:
+            orderbook = feed.get_orderbook(ticker, max_age)
+            if orderbook is not None:
+                orderbooks[ticker] = orderbook
+    missing = [ticker for ticker in tickers if ticker not in orderbooks]
+    if missing:
+        fetched = pyupbit.get_orderbook(ticker=missing)
+        # pyupbit returns a dict for one ticker and a list for several
+        for orderbook in fetched if isinstance(fetched, list) else [fetched]:
+            orderbooks[orderbook["market"]] = orderbook
+    return orderbooks
+
+def record_messages(path, codes, seconds):
+    """Records live WebSocket messages to a JSON Lines file for ReplaySource."""
+    feed = MarketFeed(codes)
+    with open(path, "w", encoding="utf-8") as file:
+        lock = threading.Lock()
+        def write(stream_type, message):
+            with lock:
+                file.write(json.dumps(message) + "\n")
+        feed.add_listener(write)
+        feed.start()
+        time.sleep(seconds)
+        feed.stop()
+
+if __name__ == "__main__":
+    # Record a sample for offline runs: python market_feed.py feed_sample.jsonl 60
+    import sys
+    record_messages(sys.argv[1], ["KRW-BTC"], int(sys.argv[2]) if len(sys.argv) > 2 else 60)
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pyupbit
+
+DB_PATH = 'ohlcv.sqlite'
+# Upbit candle times are in Korea Standard Time, whatever the host's timezone
+KST = timezone(timedelta(hours=9))
+COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'value']
+
+INTERVAL_SECONDS = {
+    "minute1": 60,
+    "minute3": 180,
+    "minute5": 300,
+    "minute10": 600,
+    "minute15": 900,
+    "minute30": 1800,
+    "minute60": 3600,
+    "minute240": 14400,
+    "day": 86400,
+    "week": 604800,
+}
+
+# One connection per process and database file, shared by the threads of that process, as in decision_store
+_connections = {}
+_lock = threading.RLock()
+
+def _create_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candles (
+            ticker TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            value REAL,
+            PRIMARY KEY (ticker, interval, ts)
+        ) WITHOUT ROWID;
+    ''')
+
+def get_connection(db_path=DB_PATH):
+    """The process-wide connection to a candle store, opened in WAL mode with the table created on first use."""
+    key = (os.getpid(), db_path)
+    with _lock:
+        conn = _connections.get(key)
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            # WAL lets backtests and sweeps read the candles while the bot adds to them
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            _create_table(conn)
+            _connections[key] = conn
+        return conn
+
+def close(db_path=DB_PATH):
+    with _lock:
+        conn = _connections.pop((os.getpid(), db_path), None)
+        if conn is not None:
+            conn.close()
+
+def initialize_store(db_path=DB_PATH):
+    get_connection(db_path)
+
+def _to_ts(index):
+    # Upbit candle times are naive KST; store them as seconds without any timezone conversion
+    return (index.values.astype('datetime64[s]').astype(np.int64)).tolist()
+
+def save_candles(df, ticker, interval, db_path=DB_PATH):
+    if df is None or df.empty:
+        return 0
+    rows = zip([ticker] * len(df), [interval] * len(df), _to_ts(df.index), *(df[c].tolist() for c in COLUMNS))
+    with _lock:
+        conn = get_connection(db_path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany('''
+                INSERT OR REPLACE INTO candles (ticker, interval, ts, open, high, low, close, volume, value)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return len(df)
+
+def load_candles(ticker, interval, count=None, since=None, db_path=DB_PATH):
+    """
+    Reads stored candles, oldest first.
+    Parameters:
+    - count (int): Return only the latest `count` candles. Default is all of them.
+    - since (datetime): Return only candles at or after this time.
+    Returns:
+    - DataFrame: Indexed by candle time with the same columns as pyupbit.get_ohlcv.
+    """
+    query = "SELECT ts, open, high, low, close, volume, value FROM candles WHERE ticker = ? AND interval = ?"
+    params = [ticker, interval]
+    if since is not None:
+        query += " AND ts >= ?"
+        params.append(int(np.datetime64(since, 's').astype(np.int64)))
+    query += " ORDER BY ts DESC"
+    if count is not None:
+        query += " LIMIT ?"
+        params.append(count)
+    with _lock:
+        rows = get_connection(db_path).execute(query, params).fetchall()
+    import pandas as pd
+    # Build the frame from one contiguous array instead of row by row
+    data = np.array(rows[::-1], dtype=np.float64).reshape(-1, len(COLUMNS) + 1)
+    index = pd.DatetimeIndex(data[:, 0].astype('int64').astype('datetime64[s]').astype('datetime64[ns]'))
+    return pd.DataFrame(data[:, 1:], index=index, columns=COLUMNS)
+
+def _last_ts(ticker, interval, db_path):
+    with _lock:
+        row = get_connection(db_path).execute("SELECT MAX(ts), COUNT(*) FROM candles WHERE ticker = ? AND interval = ?",
+                                              (ticker, interval)).fetchone()
+    return row[0], row[1]
+
+def get_ohlcv(ticker="KRW-BTC", interval="day", count=200, db_path=DB_PATH):
+    """
+    Drop-in replacement for pyupbit.get_ohlcv that only downloads candles newer than the stored ones.
+    The latest stored candle is always refetched because it may still have been forming.
+    """
+    last_ts, stored = _last_ts(ticker, interval, db_path)
+    if last_ts is None or stored < count:
+        # Empty or too short: fetch the full window once
+        fetch_count = count
+    else:
+        # Naive KST like the stored candle times, not the host's local time
+        now_ts = int(np.datetime64(datetime.now(KST).replace(tzinfo=None), 's').astype(np.int64))
+        fetch_count = max(1, (now_ts - last_ts) // INTERVAL_SECONDS[interval] + 1)
+    started = time.perf_counter()
+    df = pyupbit.get_ohlcv(ticker, interval=interval, count=fetch_count)
+    if df is None:
+        if stored == 0:
+            return None
+        print(f"Failed to fetch {ticker} {interval} candles, using stored data")
+    else:
+        save_candles(df, ticker, interval, db_path)
+        print(f"Fetched {len(df)} new {ticker} {interval} candles in {time.perf_counter() - started:.3f}s")
+    return load_candles(ticker, interval, count=count, db_path=db_path)
@@ -0,0 +1,136 @@
+import json
+import numpy as np
+import decision_store
+
+# One row per decision cycle, valuing the whole account from the balances and prices saved with its decisions:
+# equity = krw_balance + the coin balance * price of every traded market, each market's holding carried forward
+# from its latest decision. pnl is the change since the previous cycle, in_market marks PnL earned while holding
+# coins, and exposure is the share of equity in coins.
+FIELDS = ['decision_id', 'timestamp', 'equity', 'peak', 'drawdown_pct', 'pnl', 'return_pct', 'exposure_pct', 'in_market']
+
+def compute(rows, previous=None, start=None, holdings=None):
+    """
+    Vectorised performance series for decision rows of every market, continuing from the last summarised cycle.
+    The decisions of one cycle share a timestamp and the KRW balance; each cycle gets the row of its last decision.
+    Parameters:
+    - rows (list): Tuples of (id, *decision_store.FIELDS), oldest first.
+    - previous (dict): The last summary row, or None to start from the first decision.
+    - start (float): Equity returns are measured from. Default is the equity of the first cycle.
+    - holdings (dict): market -> (coin balance, price) at the last summarised cycle.
+    Returns:
+    - (list, dict): Tuples in FIELDS order, and the holdings after the last row.
+    """
+    holdings = dict(holdings or {})
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    timestamps = np.array([row[1] for row in rows], dtype=np.int64)
+    coins = np.array([row[5] or 0 for row in rows], dtype=np.float64)
+    krw = np.array([row[6] or 0 for row in rows], dtype=np.float64)
+    prices = np.array([row[8] or 0 for row in rows], dtype=np.float64)
+    markets = np.array([row[9] or decision_store.DEFAULT_MARKET for row in rows])
+    positions = np.arange(len(rows))
+    coin_value = np.zeros(len(rows))
+    for market in set(markets.tolist()) | set(holdings):
+        # Position of the market's latest row at or before each row, -1 before its first one
+        latest = np.maximum.accumulate(np.where(markets == market, positions, -1))
+        balance, price = holdings.get(market, (0.0, 0.0))
+        coin_value += np.where(latest >= 0, coins[latest] * prices[latest], balance * price)
+        if latest[-1] >= 0:
+            holdings[market] = (float(coins[latest[-1]]), float(prices[latest[-1]]))
+    # Only the last row of a cycle has every market's balance from the same snapshot
+    last = np.concatenate([timestamps[1:] != timestamps[:-1], [True]])
+    ids, timestamps, coin_value = ids[last], timestamps[last], coin_value[last]
+    equity = coin_value + krw[last]
+    start = equity[0] if start is None else start
+    if previous is None:
+        last_equity, last_peak, last_exposure = equity[0], equity[0], 0.0
+    else:
+        last_equity, last_peak, last_exposure = previous['equity'], previous['peak'], previous['exposure_pct']
+    peak = np.maximum.accumulate(np.concatenate([[last_peak], equity]))[1:]
+    drawdown = np.where(peak > 0, (equity - peak) / np.where(peak > 0, peak, 1) * 100, 0.0)
+    pnl = np.diff(np.concatenate([[last_equity], equity]))
+    exposure = np.where(equity > 0, coin_value / np.where(equity > 0, equity, 1) * 100, 0.0)
+    in_market = np.concatenate([[last_exposure], exposure[:-1]]) > 0
+    return_pct = (equity - start) / start * 100 if start else np.zeros(len(equity))
+    return list(zip(ids.tolist(), timestamps.tolist(), equity.tolist(), peak.tolist(), drawdown.tolist(),
+                    pnl.tolist(), return_pct.tolist(), exposure.tolist(), in_market.astype(int).tolist())), holdings
+
+def last_summary(db_path=decision_store.DB_PATH):
+    """The last summary row as a dict, with the holdings it was valued with, or None before the first update."""
+    rows = decision_store.query(f"SELECT {', '.join(FIELDS)}, holdings FROM performance ORDER BY decision_id DESC LIMIT 1",
+                                db_path=db_path)
+    if not rows:
+        return None
+    summary = dict(zip(FIELDS, rows[0]))
+    summary['holdings'] = {market: tuple(holding) for market, holding in json.loads(rows[0][-1] or "{}").items()}
+    return summary
+
+def start_value(db_path=decision_store.DB_PATH):
+    rows = decision_store.query("SELECT equity FROM performance ORDER BY decision_id LIMIT 1", db_path=db_path)
+    return rows[0][0] if rows else None
+
+def update(db_path=decision_store.DB_PATH, batch_size=100_000):
+    """
+    Summarises the decisions added since the last update into the performance table. Returns the number of new rows.
+    All markets are summarised together, as they share the KRW balance.
+    """
+    previous = last_summary(db_path)
+    start = start_value(db_path)
+    added = 0
+    while True:
+        rows = decision_store.load_decisions(previous['decision_id'] if previous else 0, batch_size, db_path)
+        if len(rows) == batch_size and rows[0][1] != rows[-1][1]:
+            # Leave a cycle cut off by the batch for the next one, so its row sees all of its decisions
+            rows = [row for row in rows if row[1] != rows[-1][1]]
+        if not rows:
+            return added
+        summary, holdings = compute(rows, previous, start, previous['holdings'] if previous else None)
+        with decision_store.transaction(db_path) as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO performance ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                             summary)
+            # Only the last row carries the holdings, which is all the next update needs
+            conn.execute("UPDATE performance SET holdings = ? WHERE decision_id = ?", (json.dumps(holdings), summary[-1][0]))
+        previous = {**dict(zip(FIELDS, summary[-1])), 'holdings': holdings}
+        start = summary[0][2] if start is None else start
+        added += len(summary)
+
+def totals(db_path=decision_store.DB_PATH):
+    """Whole-history figures: start and current equity, return, max drawdown, win rate, average exposure and holdings."""
+    row = decision_store.query('''
+        SELECT COUNT(*), MIN(drawdown_pct), SUM(in_market), SUM(in_market AND pnl > 0), AVG(exposure_pct),
+               SUM(CASE WHEN in_market THEN pnl ELSE 0 END)
+        FROM performance
+    ''', db_path=db_path)[0]
+    last = last_summary(db_path)
+    if not last:
+        return None
+    count, max_drawdown, in_market, wins, exposure, market_pnl = row
+    return {
+        "decisions": count,
+        "start_value": start_value(db_path),
+        "equity": last['equity'],
+        "return_pct": last['return_pct'],
+        "max_drawdown_pct": max_drawdown,
+        "win_rate_pct": wins / in_market * 100 if in_market else None,
+        "average_exposure_pct": exposure,
+        "market_pnl": market_pnl,
+        "holdings": last['holdings'],
+    }
+
+DAILY_FIELDS = ['day', 'last_id', 'equity', 'peak', 'drawdown_pct', 'pnl', 'exposure_pct', 'in_market', 'wins']
+
+def aggregate_daily(after_id=0, utc_offset_ms=0, db_path=decision_store.DB_PATH):
+    """
+    Per-day closing equity, peak and exposure, worst drawdown, summed PnL, and counts of in-market and winning
+    intervals of the summary rows after after_id, so the dashboard can chart and total them without reading every row.
+    """
+    # As in decision_store.aggregate_daily, bare columns come from each day's last row
+    return decision_store.query('''
+        SELECT (timestamp + ?) / 86400000 AS day, MAX(decision_id), equity, peak, MIN(drawdown_pct), SUM(pnl), exposure_pct,
+               SUM(in_market), SUM(in_market AND pnl > 0)
+        FROM performance WHERE decision_id > ?
+        GROUP BY day ORDER BY day
+    ''', (utc_offset_ms, after_id), db_path)
+
+if __name__ == "__main__":
+    # Builds the summary for decisions saved while the bot wasn't updating it, e.g. right after an upgrade
+    print(f"Added {update()} performance rows")
@@ -0,0 +1,170 @@
+import json
+import math
+import re
+
+# Sections in the order they are sent, and the order they are trimmed in when over budget (first = least important)
+SECTIONS = ["news", "market_data", "last_decisions", "fear_and_greed", "current_status"]
+TRIM_ORDER = ["news", "fear_and_greed", "last_decisions", "current_status", "market_data"]
+# Order the sections are sent to the model in, from slowest- to fastest-changing after the static instructions,
+# so the longest possible prefix is byte-identical between calls: the index changes daily, news every NEWS_TTL,
+# last_decisions every cycle. Each message starts with its heading in instructions_v3.md
+PROMPT_ORDER = ["fear_and_greed", "news", "last_decisions", "market_data", "current_status"]
+LABELS = {"news": "Data 1: Crypto News", "market_data": "Data 2: Market Analysis",
+          "last_decisions": "Data 3: Previous Decisions", "fear_and_greed": "Data 4: Fear and Greed Index",
+          "current_status": "Data 5: Current Investment State", "chart_image": "Data 6: Current Chart Image"}
+
+# Decimal places kept per column; KRW amounts don't need fractions of a won
+DECIMALS = {
+    "open": 0, "high": 0, "low": 0, "close": 0, "value": 0, "volume": 4,
+    "SMA_10": 0, "EMA_10": 0, "RSI_14": 2, "STOCHk_14_3_3": 2, "STOCHd_14_3_3": 2,
+    "MACD": 0, "Signal_Line": 0, "MACD_Histogram": 0,
+    "Middle_Band": 0, "Upper_Band": 0, "Lower_Band": 0,
+}
+DEFAULT_DECIMALS = 4
+# Market data columns kept by the last trim step: the candle, volume and one line from each indicator family
+COMPACT_COLUMNS = ["open", "high", "low", "close", "volume", "EMA_10", "RSI_14", "STOCHk_14_3_3", "MACD_Histogram",
+                   "Upper_Band", "Lower_Band"]
+
+_encoder = None
+
+def count_tokens(text):
+    """Counts tokens with tiktoken's gpt-4o encoding when available, otherwise estimates them."""
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text))
+    # Rough BPE estimate: words, up to 3 digits per number token, and one token per symbol
+    return len(re.findall(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]", text))
+
+_NUMBER = re.compile(r"-?\d+(\.\d+)?")
+
+def _number(value):
+    # Upbit balances and Fear and Greed values arrive as strings; send them as JSON numbers
+    if isinstance(value, str) and _NUMBER.fullmatch(value):
+        return float(value) if "." in value else int(value)
+    return value
+
+def _round(value, decimals):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    value = round(float(value), decimals)
+    return int(value) if decimals == 0 else value
+
+def _dumps(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def encode_frame(df, rows=None, columns=None):
+    """Column-oriented encoding of an indicator DataFrame: timestamps in ms and one rounded array per column."""
+    if rows is not None:
+        df = df.iloc[-rows:]
+    if columns is not None:
+        df = df[[column for column in df.columns if column in columns]]
+    encoded = {"timestamp": (df.index.values.astype('datetime64[ms]').astype('int64')).tolist()}
+    for column in df.columns:
+        decimals = DECIMALS.get(column, DEFAULT_DECIMALS)
+        encoded[column] = [_round(v, decimals) for v in df[column].tolist()]
+    return encoded
+
+def encode_market_data(df_daily, df_hourly, daily_rows=None, hourly_rows=None, columns=None):
+    return _dumps({"daily": encode_frame(df_daily, daily_rows, columns),
+                   "hourly": encode_frame(df_hourly, hourly_rows, columns)})
+
+def encode_news(news, limit=None):
+    # Newest first so trimming drops the oldest articles
+    items = sorted(news, key=lambda item: item[2] if isinstance(item[2], int) else 0, reverse=True)
+    return [list(item) for item in items[:limit]]
+
+def encode_records(records, fields, limit=None, text_limit=None):
+    """Column-oriented encoding of a list of dicts, keeping only the latest `limit` records."""
+    records = records[:limit] if limit is not None else records
+    encoded = {}
+    for field in fields:
+        values = [record.get(field) for record in records]
+        if text_limit is not None:
+            values = [v[:text_limit] if isinstance(v, str) else v for v in values]
+        values = [_number(v) for v in values]
+        encoded[field] = [_round(v, DEFAULT_DECIMALS) if isinstance(v, float) else v for v in values]
+    return encoded
+
+def encode_status(status, orderbook_levels=None):
+    orderbook = dict(status["orderbook"])
+    units = orderbook["orderbook_units"][:orderbook_levels]
+    orderbook["orderbook_units"] = {key: [unit[key] for unit in units] for key in ("ask_price", "bid_price", "ask_size", "bid_size")}
+    return {
+        "current_time": status["current_time"],
+        "orderbook": orderbook,
+        "btc_balance": _number(status["btc_balance"]),
+        "krw_balance": _number(status["krw_balance"]),
+        "btc_avg_buy_price": _number(status["btc_avg_buy_price"]),
+    }
+
+# Each trim step makes one section smaller; steps for the same section go from mild to aggressive
+TRIM_STEPS = {
+    "news": [{"news_limit": 10}, {"news_limit": 5}, {"news_limit": 0}],
+    "fear_and_greed": [{"fear_and_greed_limit": 14}, {"fear_and_greed_limit": 7}],
+    "last_decisions": [{"reason_limit": 200}, {"decisions_limit": 5}, {"decisions_limit": 3, "reason_limit": 100}],
+    "current_status": [{"orderbook_levels": 5}, {"orderbook_levels": 2}],
+    "market_data": [{"hourly_rows": 12}, {"daily_rows": 14}, {"hourly_rows": 6, "daily_rows": 7},
+                    {"market_columns": COMPACT_COLUMNS}, {"hourly_rows": 3, "daily_rows": 3}],
+}
+
+DECISION_FIELDS = ["timestamp", "decision", "percentage", "reason", "btc_balance", "krw_balance", "btc_avg_buy_price"]
+FEAR_AND_GREED_FIELDS = ["timestamp", "value", "value_classification"]
+
+def _encode_sections(data, options):
+    return {
+        "news": _dumps(encode_news(data["news"], options.get("news_limit"))),
+        "market_data": encode_market_data(data["df_daily"], data["df_hourly"],
+                                          options.get("daily_rows"), options.get("hourly_rows"),
+                                          options.get("market_columns")),
+        "last_decisions": _dumps(encode_records(data["last_decisions"], DECISION_FIELDS,
+                                                options.get("decisions_limit"), options.get("reason_limit"))),
+        "fear_and_greed": _dumps(encode_records(data["fear_and_greed"], FEAR_AND_GREED_FIELDS,
+                                                options.get("fear_and_greed_limit"))),
+        "current_status": _dumps(encode_status(data["current_status"], options.get("orderbook_levels"))),
+    }
+
+def build_payload(news, df_daily, df_hourly, last_decisions, fear_and_greed, current_status, token_budget=None):
+    """
+    Encodes the prompt sections compactly and trims the least important ones until they fit the token budget.
+    Parameters:
+    - news (list): (title, source, timestamp) tuples.
+    - df_daily, df_hourly (DataFrame): OHLCV with indicators.
+    - last_decisions (list): Decision dicts, newest first.
+    - fear_and_greed (list): Fear and Greed Index entries, newest first.
+    - current_status (dict): Balances and orderbook.
+    - token_budget (int): Maximum total tokens for all sections. Default is no limit.
+    Returns:
+    - (dict, dict): encoded sections by name in SECTIONS order, and token counts by name.
+    """
+    data = {"news": news, "df_daily": df_daily, "df_hourly": df_hourly, "last_decisions": last_decisions,
+            "fear_and_greed": fear_and_greed, "current_status": current_status}
+    options = {}
+    sections = _encode_sections(data, options)
+    tokens = {name: count_tokens(text) for name, text in sections.items()}
+    # Apply the mildest step of every section before the more aggressive ones
+    levels = max(len(steps) for steps in TRIM_STEPS.values())
+    steps = [TRIM_STEPS[name][level] for level in range(levels) for name in TRIM_ORDER if level < len(TRIM_STEPS[name])]
+    while token_budget and sum(tokens.values()) > token_budget and steps:
+        options.update(steps.pop(0))
+        sections = _encode_sections(data, options)
+        tokens = {name: count_tokens(text) for name, text in sections.items()}
+    if token_budget and sum(tokens.values()) > token_budget:
+        print(f"Prompt sections can't be trimmed below {sum(tokens.values())} tokens; "
+              f"the budget of {token_budget} is too small and the smallest payload is sent")
+    return sections, tokens
+
+def prompt_messages(instructions, sections):
+    """The system and user messages for the encoded sections, in PROMPT_ORDER and each labelled with its heading."""
+    return [{"role": "system", "content": instructions}] + \
+           [{"role": "user", "content": f"{LABELS[name]}\n{sections[name]}"} for name in PROMPT_ORDER]
+
+def print_token_report(tokens):
+    for name in SECTIONS:
+        print(f"  {name:<16} {tokens[name]:6d} tokens")
+    print(f"  {'total':<16} {sum(tokens.values()):6d} tokens")
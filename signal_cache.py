@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+
+class SignalCache:
+    """
+    Disk-backed TTL cache for slow-changing external data such as news and the Fear and Greed Index,
+    with stale-while-revalidate: an expired value is still returned for a while and refreshed in the background.
+    Parameters:
+    - path (str): Directory of the cache. One JSON file per source.
+    - clock (callable): Returns the current time in seconds. Default is time.time.
+    """
+
+    def __init__(self, path="signal_cache", clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._memory = {}
+
+    def _file(self, name):
+        return os.path.join(self.path, name + ".json")
+
+    def _count(self, name, outcome):
+        with self._lock:
+            counts = self.stats.setdefault(name, {"hits": 0, "stale": 0, "misses": 0, "fetches": 0, "errors": 0})
+            counts[outcome] += 1
+
+    def load(self, name):
+        """The stored entry ({'fetched_at', 'expires_at', 'value'}) or None."""
+        with self._lock:
+            if name in self._memory:
+                return self._memory[name]
+        try:
+            with open(self._file(name), "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._memory[name] = entry
+        return entry
+
+    def store(self, name, value, ttl):
+        now = self.clock()
+        entry = {"fetched_at": now, "expires_at": now + ttl, "value": value}
+        os.makedirs(self.path, exist_ok=True)
+        file_path = self._file(name)
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(entry, file, ensure_ascii=False)
+        os.replace(temp_path, file_path)
+        with self._lock:
+            self._memory[name] = entry
+        return entry
+
+    def _fetch(self, name, fetch, ttl, previous):
+        self._count(name, "fetches")
+        value = fetch(previous["value"] if previous else None)
+        return self.store(name, value, ttl(value) if callable(ttl) else ttl)["value"]
+
+    def _refresh(self, name, fetch, ttl, previous):
+        try:
+            self._fetch(name, fetch, ttl, previous)
+        except Exception as e:
+            self._count(name, "errors")
+            print(f"Error refreshing {name}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def get(self, name, fetch, ttl, max_stale=0, background=True):
+        """
+        The cached value of a source, fetching it when there is none or it is too old.
+        Parameters:
+        - name (str): Source name, also the cache file name.
+        - fetch (callable): previous value or None -> new value. Gets the cached value so it can fetch only what changed.
+        - ttl (float or callable): Seconds a fetched value stays fresh, or value -> seconds.
+        - max_stale (float): Seconds past expiry a value is still returned while a refresh runs in the background.
+        - background (bool): Refresh stale values on a background thread. False refreshes before returning.
+        Returns:
+        - The value. A failed fetch falls back to any stored value, however old, and raises only when there is none.
+        """
+        entry = self.load(name)
+        now = self.clock()
+        if entry is not None and now < entry["expires_at"]:
+            self._count(name, "hits")
+            return entry["value"]
+        if entry is not None and now < entry["expires_at"] + max_stale and background:
+            self._count(name, "stale")
+            with self._lock:
+                start = name not in self._refreshing
+                self._refreshing.add(name)
+            if start:
+                threading.Thread(target=self._refresh, args=(name, fetch, ttl, entry), name=f"refresh-{name}",
+                                 daemon=True).start()
+            return entry["value"]
+        self._count(name, "misses")
+        try:
+            return self._fetch(name, fetch, ttl, entry)
+        except Exception as e:
+            if entry is None:
+                raise
+            self._count(name, "errors")
+            print(f"Error fetching {name}, using the value from {now - entry['fetched_at']:.0f} seconds ago: {e}")
+            return entry["value"]
+
+    def wait_for_refreshes(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while self._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def hit_rate(self, name=None):
+        """Share of lookups answered from the cache, fresh or stale, for one source or all of them."""
+        counts = [self.stats[name]] if name else list(self.stats.values())
+        served = sum(c["hits"] + c["stale"] for c in counts)
+        lookups = served + sum(c["misses"] for c in counts)
+        return served / lookups if lookups else 0.0
+
+    def print_stats(self):
+        for name, counts in sorted(self.stats.items()):
+            print(f"Signal cache {name}: {counts['hits']} fresh, {counts['stale']} stale, {counts['misses']} misses "
+                  f"({self.hit_rate(name):.0%}), {counts['fetches']} fetches, {counts['errors']} errors")
@@ -1,38 +1,120 @@
+import os
 import streamlit as st
-import sqlite3
+import threading
+import decision_store
+import performance
+import tracing
 import pandas as pd
 from datetime import datetime
 import pyupbit
 
-def load_data():
-    db_path = 'trading_decisions.sqlite'
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT timestamp, decision, percentage, reason, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price FROM decisions ORDER BY timestamp")
-        decisions = cursor.fetchall()
-        df = pd.DataFrame(decisions, columns=['timestamp', 'decision', 'percentage', 'reason', 'btc_balance', 'krw_balance', 'btc_avg_buy_price', 'btc_krw_price'])
-        return df
+PAGE_SIZES = [20, 50, 100]
+# Seconds a fetched BTC price is reused across reruns
+PRICE_TTL_SECONDS = 10
+# Spans written by autotrade_v3, and the budgets they are held to
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+tracing.configure(budgets=tracing.parse_budgets(os.getenv("STAGE_BUDGETS")))
+
+def to_local_datetime(millis):
+    # Stored as epoch milliseconds; show local time like datetime.now()
+    local_timezone = datetime.now().astimezone().tzinfo
+    return pd.to_datetime(millis, unit='ms', utc=True).dt.tz_convert(local_timezone).dt.tz_localize(None)
+
+def utc_offset_ms():
+    return int(datetime.now().astimezone().utcoffset().total_seconds() * 1000)
+
+@st.cache_data(ttl=PRICE_TTL_SECONDS)
+def get_current_prices(markets=("KRW-BTC",)):
+    # One request for every market; pyupbit returns a single dict for one market
+    orderbooks = pyupbit.get_orderbook(ticker=list(markets))
+    orderbooks = [orderbooks] if isinstance(orderbooks, dict) else orderbooks
+    return {orderbook['market']: orderbook['orderbook_units'][0]["ask_price"] for orderbook in orderbooks}
+
+@st.cache_resource
+def daily_cache(name, db_path=decision_store.DB_PATH):
+    # Shared by every rerun and session of this server process
+    return {"last_id": 0, "daily": None, "lock": threading.Lock()}
+
+def load_daily(name, aggregate, fields, sums, minimums=(), db_path=decision_store.DB_PATH):
+    """
+    A per-day summary aggregated in SQL, kept in memory and extended with only the rows added since the last call.
+    Parameters:
+    - aggregate (callable): (after_id, utc_offset_ms, db_path) -> rows in fields order, starting with day and last_id.
+    - sums, minimums (list): Columns combined by adding up or taking the minimum when the last cached day gets more rows.
+      Other columns are closing values and are taken from the newer rows.
+    """
+    cache = daily_cache(name, db_path)
+    with cache["lock"]:
+        rows = aggregate(cache["last_id"], utc_offset_ms(), db_path)
+        if rows:
+            new = pd.DataFrame(rows, columns=fields).set_index('day')
+            daily = cache["daily"]
+            if daily is not None and daily.index[-1] == new.index[0]:
+                first, last = new.index[0], daily.index[-1]
+                new.loc[first, sums] += daily.loc[last, sums]
+                for column in minimums:
+                    new.loc[first, column] = min(new.loc[first, column], daily.loc[last, column])
+                daily = daily.iloc[:-1]
+            cache["daily"] = new if daily is None else pd.concat([daily, new])
+            cache["last_id"] = int(new['last_id'].max())
+        return cache["daily"]
+
+def load_daily_summary(db_path=decision_store.DB_PATH):
+    """Per-day decision counts and closing balances."""
+    return load_daily("decisions", decision_store.aggregate_daily, decision_store.DAILY_FIELDS,
+                      ['decisions', 'buys', 'sells', 'holds'], db_path=db_path)
+
+def load_daily_performance(db_path=decision_store.DB_PATH):
+    """
+    Per-day equity, drawdown and PnL from the performance table.
+    The bot extends the table after each cycle; the dashboard only reads it, so it never takes the write lock.
+    """
+    return load_daily("performance", performance.aggregate_daily, performance.DAILY_FIELDS,
+                      ['pnl', 'in_market', 'wins'], ['drawdown_pct'], db_path=db_path)
+
+@st.cache_data(ttl=30)
+def load_stage_summary(path=TRACE_FILE):
+    """Per-stage latency over the spans at the end of the trace file."""
+    return pd.DataFrame(tracing.summarize(tracing.read_spans(path)))
+
+def load_page(page, page_size, db_path=decision_store.DB_PATH):
+    rows = decision_store.load_decision_page(page, page_size, db_path)
+    df = pd.DataFrame([row[1:] for row in rows], columns=decision_store.FIELDS)
+    df['timestamp'] = to_local_datetime(df['timestamp'])
+    return df
 
 def main():
     st.set_page_config(layout="wide")
     st.title("실시간 비트코인 GPT 자동매매 기록")
     st.write("by 유튜버 [조코딩](https://youtu.be/MgatVqXXoeA) - [Github](https://github.com/youtube-jocoding/gpt-bitcoin)")
     st.write("---")
-    df = load_data()
-    if not df.empty:
-        start_value = 2000000
-        current_price = pyupbit.get_orderbook(ticker="KRW-BTC")['orderbook_units'][0]["ask_price"]
-        latest_row = df.iloc[-1]
+    daily = load_daily_summary()
+    summary = performance.last_summary()
+    if daily is not None and summary is None:
+        st.info("성과 요약이 아직 없습니다. 봇이 다음 판단을 저장하면 표시됩니다. (바로 만들려면: python performance.py)")
+    elif daily is not None:
+        daily_performance = load_daily_performance()
+        # Returns are measured from the equity at the first decision instead of a fixed amount
+        start_value = int(performance.start_value())
+        # KRW is shared by every traded market, so the account is valued with the coins of all of them
+        holdings = summary['holdings']
+        prices = get_current_prices(tuple(sorted(set(holdings) | {decision_store.DEFAULT_MARKET})))
+        current_price = prices[decision_store.DEFAULT_MARKET]
+        first_row = decision_store.load_decisions(0, limit=1)[0]
+        latest_row = dict(zip(decision_store.FIELDS, decision_store.load_decision_page(0, 1)[0][1:]))
         btc_balance = latest_row['btc_balance']
-        krw_balance = latest_row['krw_balance']
+        krw_balance = decision_store.query("SELECT krw_balance FROM decisions ORDER BY id DESC LIMIT 1")[0][0]
         btc_avg_buy_price = latest_row['btc_avg_buy_price']
-        current_value = int(btc_balance * current_price + krw_balance)
+        current_value = int(krw_balance + sum(balance * prices[market] for market, (balance, _) in holdings.items()))
 
-        time_diff = datetime.now() - pd.to_datetime(df.iloc[0]['timestamp'])
+        time_diff = datetime.now() - datetime.fromtimestamp(first_row[1] / 1000)
         days = time_diff.days
         hours = time_diff.seconds // 3600
         minutes = (time_diff.seconds % 3600) // 60
 
+        in_market = daily_performance['in_market'].sum()
+        win_rate = round(daily_performance['wins'].sum() / in_market * 100, 1) if in_market else "-"
+
         st.header("수익률:"+str(round((current_value-start_value)/start_value*100, 2))+"%")
         st.write("현재 시각:"+str(datetime.now()))
         st.write("투자기간:", days, "일", hours, "시간", minutes, "분")
@@ -42,8 +124,26 @@ def main():
         st.write("현재 보유 비트코인:", btc_balance, "BTC")
         st.write("BTC 매수 평균가격:", btc_avg_buy_price, "원")
         st.write("현재 원화 가치 평가:", current_value, "원")
+        st.write("최대 낙폭:", round(daily_performance['drawdown_pct'].min(), 2), "%")
+        st.write("승률 (BTC 보유 구간):", win_rate, "%")
+        st.write("평균 BTC 비중:", round(daily_performance['exposure_pct'].mean(), 1), "%")
+
+        index = pd.to_datetime(daily_performance.index, unit='D')
+        st.line_chart(pd.DataFrame({"평가 금액": daily_performance['equity'].to_numpy()}, index=index))
+        st.area_chart(pd.DataFrame({"낙폭 (%)": daily_performance['drawdown_pct'].to_numpy()}, index=index))
+        st.bar_chart(daily[['buys', 'sells', 'holds']].set_axis(pd.to_datetime(daily.index, unit='D')))
+
+        stages = load_stage_summary()
+        if not stages.empty:
+            st.subheader("단계별 지연 시간 (초)")
+            st.dataframe(stages.round(3), use_container_width=True, hide_index=True)
 
-        st.dataframe(df, use_container_width=True)
+        # The daily summary already counts the rows, so the table isn't scanned for the page count
+        total = int(daily['decisions'].sum())
+        page_size = st.selectbox("페이지당 기록 수", PAGE_SIZES)
+        pages = (total + page_size - 1) // page_size
+        page = st.number_input(f"페이지 (총 {pages})", min_value=1, max_value=pages, value=1) - 1
+        st.dataframe(load_page(page, page_size), use_container_width=True)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,143 @@
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from backtest import band_rsi_strategy, daily_from_hourly, run_backtest
+
+# Values tried for each parameter; every combination is one backtest
+GRID = {
+    "sma_length": [5, 10, 20],
+    "ema_length": [5, 10, 20],
+    "rsi_length": [7, 14, 21],
+    "bb_length": [14, 20, 30],
+    "decision_hours": ["0,8,16", "0,6,12,18", "9"],
+    "buy_percentage": [30, 50, 100],
+    "sell_percentage": [30, 50, 100],
+}
+METRICS = ["return_pct", "buy_and_hold_pct", "max_drawdown_pct", "trades", "win_rate_pct", "fees_paid", "final_value"]
+CANDLE_COLUMNS = ["ts", "open", "high", "low", "close", "volume", "value"]
+
+def make_configs(grid=GRID):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def config_key(config):
+    return json.dumps(config, sort_keys=True)
+
+# Candles shared with the workers: the parent copies them into one shared memory block and
+# each worker maps it once in its initializer, so nothing is pickled per configuration.
+
+def share_candles(df):
+    """Copies OHLCV into shared memory as a float64 (rows, 7) array. Returns the SharedMemory; the caller unlinks it."""
+    times = df.index.values.astype('datetime64[s]').astype(np.int64)
+    data = np.column_stack([times.astype(np.float64)] + [df[c].to_numpy(dtype=np.float64) for c in CANDLE_COLUMNS[1:]])
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+    return shm, data.shape
+
+_worker = {}
+
+def _attach(name, shape):
+    import pandas as pd
+    shm = shared_memory.SharedMemory(name=name)
+    data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    index = pd.to_datetime(data[:, 0].astype(np.int64), unit="s")
+    df = pd.DataFrame({column: data[:, i] for i, column in enumerate(CANDLE_COLUMNS) if i > 0}, index=index, copy=False)
+    _worker.update(shm=shm, df_hourly=df, df_daily=daily_from_hourly(df))
+
+def run_config(config):
+    """Runs one backtest in a worker. Returns the config with its metrics and run time."""
+    started = time.perf_counter()
+    decide = band_rsi_strategy(config["sma_length"], config["ema_length"], config["rsi_length"],
+                               buy_percentage=config["buy_percentage"], sell_percentage=config["sell_percentage"])
+    options = {name: config[name] for name in ("sma_length", "ema_length", "rsi_length", "bb_length")}
+    hours = tuple(int(hour) for hour in config["decision_hours"].split(","))
+    result = run_backtest(_worker["df_hourly"], decide, _worker["df_daily"], decision_hours=hours, indicator_options=options)
+    metrics = result["metrics"]
+    return {**config, **{name: metrics[name] for name in METRICS}, "seconds": time.perf_counter() - started}
+
+def completed_keys(path, template):
+    """Keys of the configurations already in a results file, read back with the types of the template config."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        return {config_key({name: type(value)(row[name]) for name, value in template.items()}) for row in csv.DictReader(file)}
+
+def run_sweep(df, results_path, configs=None, workers=None, chunksize=4, progress=True):
+    """
+    Backtests every configuration on a process pool and appends one row per configuration to a CSV file.
+    Parameters:
+    - df (DataFrame): Hourly OHLCV.
+    - results_path (str): CSV file. Configurations already in it are skipped, so an interrupted sweep resumes.
+    - configs (list): Parameter dicts. Default is every combination in GRID.
+    - workers (int): Worker processes. Default is the number of CPUs.
+    - chunksize (int): Configurations per task, to amortise the task overhead.
+    - progress (bool): Print progress every 10%.
+    Returns:
+    - dict: 'done' (configurations run), 'skipped', 'seconds' and 'per_second'.
+    """
+    configs = configs or make_configs()
+    names = list(configs[0])
+    done = completed_keys(results_path, configs[0])
+    pending = [config for config in configs if config_key(config) not in done]
+    workers = workers or os.cpu_count()
+    started = time.perf_counter()
+    shm, shape = share_candles(df)
+    try:
+        write_header = not os.path.exists(results_path) or os.path.getsize(results_path) == 0
+        with open(results_path, "a", newline="", encoding="utf-8") as file, \
+                ProcessPoolExecutor(workers, initializer=_attach, initargs=(shm.name, shape)) as pool:
+            writer = csv.DictWriter(file, fieldnames=names + METRICS + ["seconds"])
+            if write_header:
+                writer.writeheader()
+            chunks = [pending[i:i + chunksize] for i in range(0, len(pending), chunksize)]
+            futures = [pool.submit(_run_chunk, chunk) for chunk in chunks]
+            for count, future in enumerate(as_completed(futures), 1):
+                writer.writerows(future.result())
+                # Flush per chunk so an interrupted sweep keeps everything finished so far
+                file.flush()
+                if progress and count % max(1, len(chunks) // 10) == 0:
+                    print(f"{min(count * chunksize, len(pending))}/{len(pending)} configurations done")
+    finally:
+        shm.close()
+        shm.unlink()
+    seconds = time.perf_counter() - started
+    return {"done": len(pending), "skipped": len(configs) - len(pending), "seconds": seconds,
+            "per_second": len(pending) / seconds if seconds else 0}
+
+def _run_chunk(chunk):
+    return [run_config(config) for config in chunk]
+
+def measure_scaling(df, configs, worker_counts=None):
+    """Runs the same configurations with increasing worker counts. Returns [(workers, per_second, efficiency)]."""
+    import tempfile
+    worker_counts = worker_counts or sorted({1, 2, 4, os.cpu_count()})
+    rows = []
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            stats = run_sweep(df, os.path.join(directory, "scaling.csv"), configs, workers, progress=False)
+        base = rows[0][1] if rows else stats["per_second"]
+        rows.append((workers, stats["per_second"], stats["per_second"] / (base * workers)))
+    return rows
+
+def print_scaling(rows):
+    print(f"{'workers':>7} {'configs/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for workers, per_second, efficiency in rows:
+        print(f"{workers:>7} {per_second:10.2f} {per_second / rows[0][1]:8.2f} {efficiency:10.0%}")
+
+if __name__ == "__main__":
+    # Sweep over the stored hourly candles: python sweep.py [results.csv] [workers]
+    import sys
+    import ohlcv_store
+    df = ohlcv_store.load_candles("KRW-BTC", "minute60")
+    if df.empty:
+        print("No stored hourly candles; run autotrade_v3 or ohlcv_store.get_ohlcv first.")
+        sys.exit(1)
+    path = sys.argv[1] if len(sys.argv) > 1 else "sweep_results.csv"
+    stats = run_sweep(df, path, workers=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print(f"{stats['done']} configurations in {stats['seconds']:.1f} s ({stats['per_second']:.1f}/s), "
+          f"{stats['skipped']} already in {path}")
@@ -0,0 +1,29 @@
+import pytest
+from backtest import SimulatedExchange, rsi_strategy, run_backtest
+from execution import FEE_RATE, MIN_ORDER_KRW
+from benchmarks.synthetic import make_ohlcv
+
+def test_orders_follow_the_executor_rules():
+    exchange = SimulatedExchange(krw_balance=1_000_000)
+    # At or below the minimum order nothing is sent
+    assert exchange.buy(MIN_ORDER_KRW / 1_000_000 * 100, 50_000_000) is None
+    trade = exchange.buy(50, 50_000_000)
+    assert exchange.exchange.calls.count("buy_market_order") == 1
+    assert trade["price"] == 50_000_000 and trade["fee"] == pytest.approx(trade["krw"] * FEE_RATE)
+    assert exchange.btc_avg_buy_price == 50_000_000
+    assert exchange.krw_balance == pytest.approx(1_000_000 - trade["krw"] - trade["fee"])
+
+    trade = exchange.sell(100, 60_000_000)
+    assert exchange.btc_balance == 0 and exchange.btc_avg_buy_price == 0
+    assert trade["pnl"] == pytest.approx(10_000_000 * trade["volume"] - trade["fee"])
+
+def test_backtest_metrics():
+    df = make_ohlcv(2000)
+    result = run_backtest(df, rsi_strategy())
+    metrics = result["metrics"]
+    assert len(result["equity"]) == len(df)
+    assert metrics["trades"] == len(result["trades"]) > 0
+    assert metrics["final_value"] == pytest.approx(result["equity"].iloc[-1])
+    assert metrics["fees_paid"] == pytest.approx(sum(trade["fee"] for trade in result["trades"]))
+    # Decisions are only made at the 00/08/16 slots
+    assert {(decision["time"] // 3600) % 24 for decision in result["decisions"]} <= {0, 8, 16}
@@ -0,0 +1,19 @@
+import pytest
+from benchmarks.synthetic import add_chart_indicators, make_ohlcv
+
+pytest.importorskip("matplotlib")
+
+def test_render_pool():
+    import chart_renderer
+    df = add_chart_indicators(make_ohlcv(48))
+    pool = chart_renderer.start_pool(2)
+    try:
+        futures = [pool.submit(df, width=640, height=360, title="KRW-ETH 1H") for _ in range(3)]
+        for future in futures:
+            assert future.result(timeout=60)[:8] == b"\x89PNG\r\n\x1a\n"
+        # Errors in a worker come back on the future and leave the worker serving
+        with pytest.raises(RuntimeError, match="KeyError"):
+            pool.submit(df.drop(columns=["open"])).result(timeout=60)
+        assert pool.submit(df, width=320, height=180).result(timeout=60)[:4] == b"\x89PNG"
+    finally:
+        pool.shutdown()
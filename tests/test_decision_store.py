@@ -0,0 +1,39 @@
+import sqlite3
+import decision_store
+
+class StaleVersion:
+    """A connection whose first user_version read happened before another process migrated the database."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.stale = True
+
+    def execute(self, sql, *parameters):
+        if self.stale and sql == "PRAGMA user_version":
+            self.stale = False
+            return self.conn.execute("SELECT 0")
+        return self.conn.execute(sql, *parameters)
+
+def connect(path):
+    return sqlite3.connect(path, isolation_level=None)
+
+def test_concurrent_migration_is_applied_once(tmp_path):
+    path = str(tmp_path / "decisions.sqlite")
+    decision_store.migrate(connect(path))
+    # The second process read version 0 before the first one migrated, and must not run the steps again
+    late = connect(path)
+    decision_store.migrate(StaleVersion(late))
+    assert late.execute("PRAGMA user_version").fetchone()[0] == len(decision_store.MIGRATIONS)
+    columns = [row[1] for row in late.execute("PRAGMA table_info(decisions)")]
+    assert columns.count("market") == 1
+
+def test_save_and_query(tmp_path):
+    path = str(tmp_path / "decisions.sqlite")
+    try:
+        decision_store.save_decision({"decision": "buy", "percentage": 20, "reason": "test"},
+                                     {"btc_balance": 0.1, "krw_balance": 1_000_000, "btc_avg_buy_price": 90_000_000},
+                                     91_000_000, timestamp=1_700_000_000_000, db_path=path, market="KRW-ETH")
+        assert decision_store.query("SELECT market, decision, timestamp FROM decisions", db_path=path) == [
+            ("KRW-ETH", "buy", 1_700_000_000_000)]
+    finally:
+        decision_store.close(path)
@@ -0,0 +1,63 @@
+import event_scheduler
+from event_scheduler import EventScheduler, SimulatedClock, simulate
+
+HOUR = 3600
+
+def always(candles):
+    return "always"
+
+def candles(count, start=1_700_000_000):
+    return [{"ts": start + HOUR * i, "open": 100, "high": 101, "low": 99, "close": 100} for i in range(count)]
+
+def test_cooldown_and_budget():
+    scheduler = simulate(candles(48), triggers=[always], cooldown_seconds=2 * HOUR, max_cycles_per_day=6)
+    runs = scheduler.runs
+    assert all(b - a >= 2 * HOUR for a, b in zip(runs, runs[1:]))
+    for run in runs:
+        assert sum(run - 86400 < other <= run for other in runs) <= 6
+    skipped = {entry.get("skipped") for entry in scheduler.log if not entry["ran"]}
+    assert skipped == {"cooldown", "budget"}
+
+def test_idle_run_without_triggers():
+    scheduler = simulate(candles(30), triggers=[], max_idle_seconds=8 * HOUR)
+    assert len(scheduler.runs) == 3
+    assert all(entry["reasons"] == ["no trigger for max_idle_seconds"] for entry in scheduler.log)
+
+def test_volatility_breakout():
+    trigger = event_scheduler.volatility_breakout(k=0.5)
+    previous = {"ts": 0, "open": 100, "high": 110, "low": 90, "close": 100}
+    assert trigger([previous, {"ts": HOUR, "open": 100, "high": 112, "low": 100, "close": 111}])
+    assert trigger([previous, {"ts": HOUR, "open": 100, "high": 110, "low": 100, "close": 110}]) is None
+
+def test_rejected_action_is_not_counted():
+    clock = SimulatedClock(start=0)
+    visible = candles(2, start=0)
+    accepted = []
+    scheduler = EventScheduler(lambda code: visible, lambda: bool(accepted), triggers=[always], clock=clock,
+                               cooldown_seconds=0, max_cycles_per_day=1)
+    entry = scheduler.step()
+    assert not entry["ran"] and entry["skipped"] == "not accepted"
+    assert not scheduler.cycles and scheduler.last_run is None
+
+    accepted.append(True)
+    visible.append(candles(3, start=0)[-1])
+    clock.advance_to(2 * HOUR)
+    assert scheduler.step()["ran"]
+    assert len(scheduler.cycles) == 1
+
+def test_triggers_on_every_market():
+    clock = SimulatedClock(start=0)
+    visible = {"KRW-BTC": candles(3, start=0), "KRW-ETH": candles(3, start=0)}
+    # Only ETH breaks out on its last closed candle
+    visible["KRW-ETH"][1].update(open=100, high=102, low=100, close=102)
+    runs = []
+    scheduler = EventScheduler(visible.__getitem__, lambda: runs.append(clock.now()), codes=["KRW-BTC", "KRW-ETH"],
+                               triggers=[event_scheduler.volatility_breakout()], clock=clock)
+    entry = scheduler.step()
+    assert entry["ran"] and len(runs) == 1
+    assert [reason.split(":")[0] for reason in entry["reasons"]] == ["KRW-ETH"]
+
+    # A trade opening a new ETH candle wakes the scheduler even though BTC is quiet
+    visible["KRW-ETH"].append(candles(4, start=0)[-1])
+    scheduler.on_message("trade", {"code": "KRW-ETH"})
+    assert scheduler._candle_closed.is_set()
@@ -0,0 +1,56 @@
+import threading
+import pytest
+from execution import Executor, Snapshot, MIN_ORDER_KRW, BUY_FEE_ADJUSTMENT
+from fake_upbit import FakeUpbit, make_orderbook
+
+def executor(exchange, **options):
+    options.setdefault("poll_interval", 0)
+    return Executor(exchange, exchange.get_orderbook, db_path=None, sleep=lambda seconds: None, **options)
+
+def test_market_buy_and_sell():
+    exchange = FakeUpbit({"KRW": 10_000_000, "BTC": 0.1})
+    orders = executor(exchange)
+    record = orders.buy("KRW-BTC", 50)
+    assert record["side"] == "buy" and record["orders"] == 1
+    assert record["requested"] == 5_000_000
+    assert exchange.balances["KRW"] == pytest.approx(5_000_000, rel=1e-3)
+    assert record["volume"] > 0 and record["slippage_bps"] >= 0
+    record = orders.sell("KRW-BTC", 100)
+    assert record["requested"] == pytest.approx(0.1 + orders.records[0]["volume"])
+    assert exchange.balances["BTC"] == pytest.approx(0)
+
+def test_below_minimum_sends_nothing():
+    exchange = FakeUpbit({"KRW": MIN_ORDER_KRW * 2})
+    assert executor(exchange).buy("KRW-BTC", 10) is None
+    assert "buy_market_order" not in exchange.calls
+
+def test_snapshot_is_reused_until_an_order_changes_it():
+    exchange = FakeUpbit({"KRW": 10_000_000, "BTC": 0.1})
+    snapshot = Snapshot({"KRW": 10_000_000, "BTC": 0.1}, {"KRW-BTC": make_orderbook()})
+    orders = executor(exchange)
+    orders.buy("KRW-BTC", 10, snapshot)
+    # The snapshot's balance and orderbook were fresh, so only the order itself went to the exchange
+    assert "get_balance" not in exchange.calls and "get_orderbook" not in exchange.calls
+    orders.buy("KRW-BTC", 10, snapshot)
+    assert exchange.calls.count("get_balance") == 1
+
+def test_slices_stay_above_the_minimum():
+    orderbook = make_orderbook(size=0.0001)
+    orders = executor(FakeUpbit(), mode="twap", max_slices=50)
+    for amount in (MIN_ORDER_KRW * 1.01, MIN_ORDER_KRW * 3.5, 200_000):
+        count = orders.slice_count("buy", amount, orderbook)
+        assert amount / count * BUY_FEE_ADJUSTMENT >= MIN_ORDER_KRW
+    count = orders.slice_count("sell", 0.01, orderbook)
+    assert 0.01 / count * 92_000_000 >= MIN_ORDER_KRW
+
+def test_twap_stops_sending_slices():
+    exchange = FakeUpbit({"KRW": 100_000_000}, {"KRW-BTC": make_orderbook(size=0.01)})
+    stopping = threading.Event()
+    def sleep(seconds):
+        stopping.set()
+    orders = Executor(exchange, exchange.get_orderbook, mode="twap", db_path=None, sleep=sleep, poll_interval=0,
+                      stopping=stopping)
+    record = orders.buy("KRW-BTC", 50)
+    # The first slice went out; the rest were dropped once the stop flag was set
+    assert record["orders"] == 1
+    assert exchange.calls.count("buy_market_order") == 1
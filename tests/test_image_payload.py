@@ -0,0 +1,46 @@
+import io
+import pytest
+import image_payload
+from image_payload import image_tokens, mime_type, model_size
+
+def test_model_size():
+    assert model_size(1024, 1024, "high") == (768, 768)
+    assert model_size(2048, 4096, "high") == (768, 1536)
+    assert model_size(4096, 1024, "high") == (2048, 512)
+    assert model_size(1024, 768, "low") == (512, 384)
+    # Small images are never scaled up
+    assert model_size(300, 200, "high") == (300, 200)
+
+def test_image_tokens():
+    assert image_tokens(1024, 1024, "high") == 765
+    assert image_tokens(2048, 4096, "high") == 1105
+    assert image_tokens(512, 512, "high") == 255
+    assert image_tokens(4096, 4096, "low") == 85
+
+def encode(image, image_format):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def test_mime_type():
+    pytest.importorskip("PIL")
+    from PIL import Image
+    image = Image.new("RGB", (8, 8))
+    assert mime_type(encode(image, "PNG")) == "image/png"
+    assert mime_type(encode(image, "JPEG")) == "image/jpeg"
+    assert mime_type(encode(image, "WEBP")) == "image/webp"
+    with pytest.raises(ValueError):
+        mime_type(b"GIF89a")
+
+def test_prepare_crops_and_scales():
+    pytest.importorskip("PIL")
+    from PIL import Image, ImageDraw
+    # A 1600x1200 chart with a 100px white margin around it
+    image = Image.new("RGB", (1800, 1400), "white")
+    ImageDraw.Draw(image).rectangle((100, 100, 1699, 1299), fill="navy")
+    chart = image_payload.prepare(encode(image, "PNG"), image_format="webp", detail="high")
+    assert chart.mime == "image/webp"
+    assert (chart.width, chart.height) == model_size(1600, 1200, "high") == (1024, 768)
+    assert chart.tokens == image_tokens(1600, 1200, "high")
+    assert Image.open(io.BytesIO(chart.data)).size == (1024, 768)
+    assert chart.content["image_url"]["url"].startswith("data:image/webp;base64,")
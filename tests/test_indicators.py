@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+import indicators
+import indicator_engine
+from indicator_engine import COLUMNS, IndicatorEngine
+from benchmarks.synthetic import make_ohlcv, reference_indicators
+
+TOLERANCE = 1e-6
+
+def assert_matches(result, reference):
+    assert (result.isna() == reference.isna()).all().all()
+    error = ((result - reference).abs() / reference.abs().clip(lower=1e-9)).max()
+    assert error.max() < TOLERANCE, f"{error.idxmax()} off by {error.max():.1e}"
+
+@pytest.mark.parametrize("count", [24, 30, 1000, 50000])
+def test_kernels_match_reference(count):
+    df = make_ohlcv(count)
+    assert_matches(indicators.add_indicators(df)[COLUMNS], reference_indicators(df)[COLUMNS])
+
+def test_kernels_match_pandas_ta():
+    ta = pytest.importorskip("pandas_ta", reason="pandas_ta is in requirements-dev.txt")
+    df = make_ohlcv(1000)
+    close = df['close'].to_numpy()
+    np.testing.assert_allclose(indicators.sma(close), ta.sma(df['close'], length=10), rtol=TOLERANCE)
+    np.testing.assert_allclose(indicators.ema(close), ta.ema(df['close'], length=10), rtol=TOLERANCE)
+    np.testing.assert_allclose(indicators.rsi(close), ta.rsi(df['close'], length=14), rtol=TOLERANCE)
+    stoch_k, stoch_d = indicators.stoch(df['high'], df['low'], close)
+    expected = ta.stoch(df['high'], df['low'], df['close'], k=14, d=3, smooth_k=3)
+    np.testing.assert_allclose(stoch_k, expected['STOCHk_14_3_3'].reindex(df.index), rtol=TOLERANCE)
+    np.testing.assert_allclose(stoch_d, expected['STOCHd_14_3_3'].reindex(df.index), rtol=TOLERANCE)
+
+@pytest.mark.parametrize("adjust", [False, True])
+def test_ewm_mean_matches_pandas(adjust):
+    # Long enough for the decay filter to split into several chunks
+    values = np.concatenate([[np.nan] * 3, np.random.default_rng(0).normal(100, 5, 20000)])
+    expected = pd.Series(values).ewm(alpha=0.01, adjust=adjust, min_periods=5).mean()
+    np.testing.assert_allclose(indicators.ewm_mean(values, 0.01, adjust=adjust, min_periods=5), expected, rtol=1e-9)
+
+def test_known_values():
+    ramp = np.arange(1.0, 41.0)
+    sma = indicators.sma(ramp)
+    assert np.isnan(sma[:9]).all()
+    assert sma[9] == 5.5 and sma[-1] == 35.5
+    # pandas_ta seeds the EMA with the SMA of the first closes
+    ema = indicators.ema(ramp)
+    assert np.isnan(ema[:9]).all()
+    assert ema[9] == 5.5
+    assert ema[10] == pytest.approx(5.5 + 2 / 11 * (11 - 5.5))
+
+    rsi = indicators.rsi(ramp)
+    assert np.isnan(rsi[:14]).all()
+    assert (rsi[14:] == 100).all()
+    assert (indicators.rsi(ramp[::-1])[14:] == 0).all()
+
+    flat = np.full(40, 1000.0)
+    middle, upper, lower = indicators.bollinger_bands(flat)
+    assert (upper[19:] == middle[19:]).all() and (lower[19:] == middle[19:]).all()
+    line, signal, histogram = indicators.macd(flat)
+    # The closed-form filter rounds at the scale of the price, not exactly to zero
+    for values in (line, signal, histogram):
+        np.testing.assert_allclose(values, 0, atol=1e-9)
+
+def test_stoch_at_the_high():
+    high = np.arange(100.0, 140.0)
+    stoch_k, stoch_d = indicators.stoch(high, high - 5, high)
+    # %K needs 14 candles for the range plus 3 for smoothing, %D another 3
+    assert np.isnan(stoch_k[:15]).all() and np.isnan(stoch_d[:17]).all()
+    np.testing.assert_allclose(stoch_k[15:], 100)
+    np.testing.assert_allclose(stoch_d[17:], 100)
+
+def test_engine_matches_kernels():
+    df = make_ohlcv(500)
+    streamed = IndicatorEngine().run(df)
+    assert_matches(streamed, indicators.add_indicators(df)[COLUMNS])
+
+def test_engine_state_resumes(tmp_path):
+    df = make_ohlcv(300)
+    expected = indicators.add_indicators(df)[COLUMNS]
+    state_dir = str(tmp_path)
+    indicator_engine.add_indicators(df.iloc[:250], "KRW-BTC", "minute60", state_dir)
+    # Drop the in-memory engine so the next call has to load the saved state
+    indicator_engine._engines.clear()
+    result = indicator_engine.add_indicators(df.iloc[50:], "KRW-BTC", "minute60", state_dir)[COLUMNS]
+    # Rows from the saved state and the newly streamed ones all match a full recompute
+    assert_matches(result.iloc[200:], expected.iloc[250:])
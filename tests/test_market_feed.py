@@ -0,0 +1,56 @@
+import json
+from market_feed import MarketFeed, ReplaySource, to_rest_orderbook
+from benchmarks.bench_market_feed import write_synthetic_recording
+
+def replay_feed(path, **options):
+    sources = []
+    def replay(stream_type, codes):
+        source = ReplaySource(path, stream_type)
+        sources.append(source)
+        return source
+    feed = MarketFeed(["KRW-BTC"], source_factory=replay, **options).start()
+    for source in sources:
+        assert source.finished.wait(10)
+    return feed
+
+def test_replay_builds_candles_and_keeps_latest(tmp_path):
+    path = str(tmp_path / "feed.jsonl")
+    write_synthetic_recording(path, count=3000)
+    with open(path, encoding="utf-8") as file:
+        messages = [json.loads(line) for line in file]
+    feed = replay_feed(path)
+    try:
+        assert feed.message_count == len(messages)
+        orderbooks = [m for m in messages if m["type"] == "orderbook"]
+        assert feed.get_orderbook("KRW-BTC", max_age=None) == to_rest_orderbook(orderbooks[-1])
+        tickers = [m for m in messages if m["type"] == "ticker"]
+        assert feed.get_price("KRW-BTC", max_age=None) == tickers[-1]["trade_price"]
+
+        trades = [m for m in messages if m["type"] == "trade"]
+        candles = feed.get_candles("KRW-BTC")
+        assert [c["ts"] for c in candles] == sorted({t["trade_timestamp"] // 1000 // 60 * 60 for t in trades})
+        last = [t for t in trades if t["trade_timestamp"] // 1000 // 60 * 60 == candles[-1]["ts"]]
+        assert candles[-1]["open"] == last[0]["trade_price"]
+        assert candles[-1]["close"] == last[-1]["trade_price"]
+        assert candles[-1]["high"] == max(t["trade_price"] for t in last)
+        assert candles[-1]["low"] == min(t["trade_price"] for t in last)
+    finally:
+        feed.stop()
+
+def test_seed_candles_go_before_live_ones(tmp_path):
+    path = str(tmp_path / "feed.jsonl")
+    write_synthetic_recording(path, count=500)
+    feed = replay_feed(path, max_candles=20)
+    try:
+        live = feed.get_candles("KRW-BTC")
+        first = live[0]["ts"]
+        history = [{"ts": first + 60 * i, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 0}
+                   for i in range(-30, 2)]
+        feed.seed_candles("KRW-BTC", history)
+        candles = feed.get_candles("KRW-BTC")
+        # Overlapping history is ignored and only as much as fits is kept, newest first
+        assert len(candles) == 20
+        assert candles[len(candles) - len(live):] == live
+        assert [c["ts"] for c in candles] == sorted(c["ts"] for c in candles)
+    finally:
+        feed.stop()
@@ -0,0 +1,27 @@
+import sqlite3
+from datetime import datetime, timedelta
+import ohlcv_store
+from benchmarks.synthetic import make_ohlcv
+
+def test_get_ohlcv_reuses_one_connection(tmp_path, monkeypatch):
+    path = str(tmp_path / "ohlcv.sqlite")
+    # Hourly candles up to the current one, in naive KST like Upbit's
+    now = datetime.now(ohlcv_store.KST).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    candles = make_ohlcv(50, start=now - timedelta(hours=49))
+    requested = []
+    def get_ohlcv(ticker, interval, count):
+        requested.append(count)
+        return candles.iloc[-count:]
+    monkeypatch.setattr(ohlcv_store.pyupbit, "get_ohlcv", get_ohlcv)
+    connects = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(ohlcv_store.sqlite3, "connect", lambda *args, **kwargs: connects.append(args) or connect(*args, **kwargs))
+    try:
+        first = ohlcv_store.get_ohlcv("KRW-BTC", "minute60", count=24, db_path=path)
+        second = ohlcv_store.get_ohlcv("KRW-BTC", "minute60", count=24, db_path=path)
+        assert len(connects) == 1
+        # The second call only refetches the latest stored candle, which may still have been forming
+        assert requested[0] == 24 and requested[1] <= 2
+        assert (first.values == candles.values[-24:]).all() and (second.values == first.values).all()
+    finally:
+        ohlcv_store.close(path)
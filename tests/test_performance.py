@@ -0,0 +1,39 @@
+import decision_store
+import performance
+
+def save_cycle(path, timestamp, krw, holdings):
+    # holdings: market -> (coin balance, price); every market of a cycle shares the timestamp and KRW balance
+    decision_store.save_decisions([
+        (timestamp, "hold", 0, "", balance, krw, price, price, market) for market, (balance, price) in holdings.items()
+    ], path)
+
+def test_update_values_the_whole_account(tmp_path):
+    path = str(tmp_path / "decisions.sqlite")
+    try:
+        save_cycle(path, 1_000, 1_000_000, {"KRW-BTC": (0.01, 100_000_000), "KRW-ETH": (1.0, 4_000_000)})
+        save_cycle(path, 2_000, 1_000_000, {"KRW-BTC": (0.01, 110_000_000), "KRW-ETH": (1.0, 4_000_000)})
+        assert performance.update(path) == 2
+        # Only BTC has a decision in this cycle; the ETH holding is carried forward rather than dropping out
+        save_cycle(path, 3_000, 1_000_000, {"KRW-BTC": (0.01, 110_000_000)})
+        assert performance.update(path) == 1
+        rows = decision_store.query("SELECT equity, drawdown_pct, pnl FROM performance ORDER BY decision_id",
+                                    db_path=path)
+        assert [row[0] for row in rows] == [6_000_000, 6_100_000, 6_100_000]
+        assert all(row[1] == 0 for row in rows)
+        assert [row[2] for row in rows] == [0, 100_000, 0]
+        assert performance.last_summary(path)['holdings'] == {"KRW-BTC": (0.01, 110_000_000), "KRW-ETH": (1.0, 4_000_000)}
+        assert performance.update(path) == 0
+    finally:
+        decision_store.close(path)
+
+def test_dashboard_does_not_write(tmp_path):
+    import streamlit_app
+    path = str(tmp_path / "decisions.sqlite")
+    try:
+        save_cycle(path, 1_000, 1_000_000, {"KRW-BTC": (0.01, 100_000_000)})
+        assert streamlit_app.load_daily_performance(path) is None
+        assert decision_store.query("SELECT COUNT(*) FROM performance", db_path=path) == [(0,)]
+        performance.update(path)
+        assert len(streamlit_app.load_daily_performance(path)) == 1
+    finally:
+        decision_store.close(path)
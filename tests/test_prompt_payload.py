@@ -0,0 +1,21 @@
+import json
+import pytest
+from prompt_payload import COMPACT_COLUMNS, build_payload
+from benchmarks.synthetic import make_prompt_inputs
+
+@pytest.mark.parametrize("budget", [4000, 2500, 1500, 1000])
+def test_budget_is_met(budget):
+    _, tokens = build_payload(*make_prompt_inputs(), token_budget=budget)
+    assert sum(tokens.values()) <= budget
+
+def test_last_steps_keep_compact_columns():
+    sections, _ = build_payload(*make_prompt_inputs(), token_budget=100)
+    market_data = json.loads(sections["market_data"])
+    assert set(market_data["hourly"]) == {"timestamp", *COMPACT_COLUMNS}
+    assert len(market_data["hourly"]["close"]) == 3
+
+def test_unreachable_budget_sends_the_smallest_payload(capsys):
+    _, smallest = build_payload(*make_prompt_inputs(), token_budget=1)
+    _, tokens = build_payload(*make_prompt_inputs(), token_budget=100)
+    assert tokens == smallest
+    assert "too small" in capsys.readouterr().out
@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency budget of each pipeline stage in seconds. Spans over budget are counted and reported, and the data
+# sources of a cycle use them as their gather timeouts. Override with STAGE_BUDGETS, e.g. 'news=5,llm=60'.
+BUDGETS = {
+    "news": 20, "ohlcv": 15, "indicators": 5, "fear_and_greed": 10, "status": 10, "screenshot": 60, "image": 5,
+    "last_decisions": 5, "llm": 90, "parse": 1, "order": 30, "db": 5, "cycle": 300,
+}
+# Upper bounds of the duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+
+_lock = threading.Lock()
+_stages = {}
+# Spans of the current trace; bounded for long runs that never start a new trace, like backtests
+_spans = deque(maxlen=10_000)
+_trace_id = None
+_trace_file = None
+# Past this size the trace file is moved to <trace_file>.1, replacing the previous one
+_trace_max_bytes = 8 * 1024 * 1024
+
+def parse_budgets(text):
+    """'news=5,llm=60' -> {'news': 5.0, 'llm': 60.0}"""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        name, seconds = item.split("=")
+        budgets[name.strip()] = float(seconds)
+    return budgets
+
+def budget(stage):
+    return BUDGETS.get(stage)
+
+def configure(trace_file=None, budgets=None, max_bytes=None):
+    """
+    Parameters:
+    - trace_file (str): JSON Lines file every finished span is appended to. None keeps spans in memory only.
+    - budgets (dict): Stage budgets in seconds, merged into BUDGETS.
+    - max_bytes (int): Size at which the trace file is rotated to <trace_file>.1, so at most about twice this is
+      kept on disk. Default is 8 MB, twice what read_spans reads.
+    """
+    global _trace_file, _trace_max_bytes
+    _trace_file = trace_file or None
+    if max_bytes:
+        _trace_max_bytes = max_bytes
+    BUDGETS.update(budgets or {})
+
+def _write_trace(record):
+    # Called with _lock held, so rotation never races another span's write
+    with open(_trace_file, "a", encoding="utf-8") as file:
+        file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        size = file.tell()
+    if size > _trace_max_bytes:
+        os.replace(_trace_file, _trace_file + ".1")
+
+def start_trace():
+    """Starts the trace of a new decision cycle; spans from any thread are attached to it until the next one."""
+    global _trace_id
+    with _lock:
+        _trace_id = uuid.uuid4().hex
+        _spans.clear()
+        return _trace_id
+
+def current_spans():
+    with _lock:
+        return list(_spans)
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times a stage of the pipeline. Yields the attribute dict, so the block can add payload sizes and token counts:
+    with span("news") as attributes: attributes["bytes"] = ...
+    """
+    attributes = dict(attributes)
+    started_at = time.time()
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield attributes
+    except BaseException as e:
+        status = "error"
+        attributes["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        _finish(name, started_at, time.perf_counter() - started, attributes, status)
+
+def _stage(name):
+    if name not in _stages:
+        _stages[name] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0, "errors": 0, "over_budget": 0,
+                         "bytes": 0, "tokens": 0}
+    return _stages[name]
+
+def _finish(name, started_at, duration, attributes, status):
+    limit = budget(name)
+    over_budget = limit is not None and duration > limit
+    record = {"trace_id": _trace_id, "span_id": uuid.uuid4().hex[:16], "name": name,
+              "start_time_unix_nano": int(started_at * 1e9), "end_time_unix_nano": int((started_at + duration) * 1e9),
+              "duration_seconds": duration, "status": status, "over_budget": over_budget, "attributes": attributes}
+    with _lock:
+        stage = _stage(name)
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                stage["buckets"][i] += 1
+                break
+        stage["sum"] += duration
+        stage["count"] += 1
+        stage["errors"] += status == "error"
+        stage["over_budget"] += over_budget
+        stage["bytes"] += int(attributes.get("bytes") or 0)
+        stage["tokens"] += int(attributes.get("tokens") or 0)
+        _spans.append(record)
+        if _trace_file:
+            try:
+                _write_trace(record)
+            except OSError as e:
+                print(f"Error writing trace: {e}")
+    if over_budget:
+        print(f"Stage {name} took {duration:.2f}s, over its {limit:g}s budget")
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+def prometheus_text():
+    """All stage metrics in the Prometheus text exposition format."""
+    with _lock:
+        stages = {name: {**stage, "buckets": list(stage["buckets"])} for name, stage in sorted(_stages.items())}
+    lines = ["# HELP autotrade_stage_duration_seconds Duration of decision pipeline stages.",
+             "# TYPE autotrade_stage_duration_seconds histogram"]
+    for name, stage in stages.items():
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stage["buckets"]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"autotrade_stage_duration_seconds_bucket{_labels(stage=name, le=le)} {cumulative}")
+        lines.append(f"autotrade_stage_duration_seconds_sum{_labels(stage=name)} {stage['sum']:.6f}")
+        lines.append(f"autotrade_stage_duration_seconds_count{_labels(stage=name)} {stage['count']}")
+    counters = [("errors", "autotrade_stage_errors_total", "Stage runs that raised."),
+                ("over_budget", "autotrade_stage_over_budget_total", "Stage runs that took longer than their budget."),
+                ("bytes", "autotrade_stage_payload_bytes_total", "Payload bytes handled by each stage."),
+                ("tokens", "autotrade_stage_tokens_total", "Model tokens used by each stage.")]
+    for key, metric, description in counters:
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+        lines += [f"{metric}{_labels(stage=name)} {stage[key]}" for name, stage in stages.items()]
+    lines += ["# HELP autotrade_stage_budget_seconds Latency budget of each stage.",
+              "# TYPE autotrade_stage_budget_seconds gauge"]
+    lines += [f"autotrade_stage_budget_seconds{_labels(stage=name)} {seconds:g}" for name, seconds in sorted(BUDGETS.items())]
+    return "\n".join(lines) + "\n"
+
+def write_metrics(path):
+    """Writes prometheus_text to a file, e.g. for the node_exporter textfile collector."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(prometheus_text())
+    os.replace(temp_path, path)
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serves prometheus_text at /metrics from a background thread. Returns the server."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+def print_spans(spans):
+    for record in sorted(spans, key=lambda record: record["start_time_unix_nano"]):
+        details = ", ".join(f"{key}={value}" for key, value in record["attributes"].items())
+        flag = "  OVER BUDGET" if record["over_budget"] else ""
+        print(f"  {record['name']:<16} {record['duration_seconds']:7.3f}s  {record['status']:<5} {details}{flag}")
+
+def _tail(path, max_bytes):
+    # The last max_bytes of a file, starting at a whole line, and the file's size
+    with open(path, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(max(0, size - max_bytes))
+        data = file.read()
+    if size > max_bytes:
+        data = data[data.find(b"\n") + 1:]  # The first line is probably cut off
+    return data, size
+
+def read_spans(path, max_bytes=4 * 1024 * 1024):
+    """
+    The spans in the last max_bytes of a trace file, oldest first, without reading the whole file.
+    When the file was rotated recently, the rest comes from the end of the rotated file.
+    """
+    try:
+        data, size = _tail(path, max_bytes)
+    except OSError:
+        data, size = b"", 0
+    if size < max_bytes:
+        try:
+            data = _tail(path + ".1", max_bytes - size)[0] + data
+        except OSError:
+            pass
+    spans = []
+    for line in data.split(b"\n"):
+        try:
+            spans.append(json.loads(line))
+        except ValueError:
+            continue
+    return spans
+
+def summarize(spans):
+    """Per-stage count, p50/p95/max duration, budget and runs over budget, as a list of dicts sorted by p95."""
+    durations = {}
+    over = {}
+    for record in spans:
+        durations.setdefault(record["name"], []).append(record["duration_seconds"])
+        over[record["name"]] = over.get(record["name"], 0) + bool(record.get("over_budget"))
+    summary = []
+    for name, values in durations.items():
+        values.sort()
+        at = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+        summary.append({"stage": name, "count": len(values), "p50": at(0.5), "p95": at(0.95), "max": values[-1],
+                        "budget": budget(name), "over_budget": over[name]})
+    return sorted(summary, key=lambda row: -row["p95"])